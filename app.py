@@ -4,6 +4,17 @@
 #   • Web-Sockets via Flask-SocketIO + eventlet
 #   • Single-reservation guard
 #   • 120-s hold window (enableSig=true)
+#   • write-through mintBlocks cache + ETag/304 reads
+#   • hold expiry driven by an in-process timer heap
+#   • range/status rooms + coalesced `block_updates` frames
+#   • sequence-numbered diffs with `resume` on reconnect
+#   • multi-worker safe: diffs + cache writes ride a shared bus
+#   • bulk reserve / release / status via TransactWriteItems
+#   • batched announces (/api/announce-blocks) from the watchers' spool
+#   • warm looper job runner with queue, dedup + progress
+#   • Prometheus /metrics (routes, DynamoDB, sockets)
+#   • tables on DynamoDB or local SQLite (STORAGE_BACKEND, scripts/storage.py)
+#   • per-block latency traces, mined → client ack (/api/traces)
 # ---------------------------------------------------
 from __future__ import annotations
 
@@ -11,36 +22,52 @@ from __future__ import annotations
 import eventlet
 eventlet.monkey_patch()
 
-import os, sys, time, subprocess
+import os, json, time, threading
 from pathlib import Path
 from decimal import Decimal
 
-from flask import Flask, jsonify, request, abort
+from flask import Flask, Response, g, jsonify, request, abort, stream_with_context
 from flask_cors import CORS
-from flask_socketio import SocketIO
-import boto3
+from flask_socketio import SocketIO, join_room
 from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from block_cache import BlockCache
+from bulk_writes import transact_updates
+from bus import make_bus
+from hold_scheduler import HoldScheduler
+from fanout import Fanout, LEGACY_ROOM
+from jobs import JobRunner
+from scripts import metrics, storage
+from tracing import Tracer
 
 # ─── constants ──────────────────────────────────────
-REGION       = "us-east-1"
 INDEX_TABLE  = "dynamicIndex1"
 BLOCKS_TABLE = "mintBlocks"
 HOLD_MS      = 120_000                             # 120 s
+CACHE_RECONCILE_SECS = int(os.getenv("CACHE_RECONCILE_SECS", 300))
+MAX_PAGE     = 5_000                               # blocks per /api/blocks page
+STREAM_CHUNK = 256                                 # blocks per streamed chunk
+ROOM_SPAN    = int(os.getenv("ROOM_SPAN", 1_000))  # blocks per range room
+COALESCE_MS  = int(os.getenv("COALESCE_MS", 50))   # block_updates batching window
+DIFF_LOG_SIZE= int(os.getenv("DIFF_LOG_SIZE", 10_000))  # diffs kept for `resume`
+BUS_URL      = os.getenv("BUS_URL", "local://")    # unix:///run/…/bus.sock | redis://…
+BULK_MAX     = 1_000                               # blocks per bulk request
+METRICS_DIR  = os.getenv("METRICS_DIR")            # set with >1 worker: shared snapshots
+PENDING_CONFIRM = "1"                              # sparse-index marker, cleared by ingest.py
+TRACE_KEEP   = int(os.getenv("TRACE_KEEP", 1_000))  # traces kept for /api/traces
+TRACE_LOG    = os.getenv("TRACE_LOG")              # JSONL dump of emitted / acked traces
 
 BASE_DIR    = Path(__file__).parent
-AUTH_SCRIPT = BASE_DIR / "scripts" / "authLooperBackend.py"
-INDEX_SCRIPT= BASE_DIR / "scripts" / "indexLooper.py"
-BOTH_SCRIPT = BASE_DIR / "scripts" / "run_both.py"
-
-AUTH_LOCK = "/tmp/authscript.lock"
-INDEX_LOCK= "/tmp/indexscript.lock"
-BOTH_LOCK = "/tmp/runboth.lock"
+JOB_WORKER  = BASE_DIR / "scripts" / "job_worker.py"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))     # warm looper processes
 
 _now_ms = lambda: int(time.time() * 1000)
 
 # ─── app + WS server ────────────────────────────────
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+CORS(app, resources={r"/api/*": {"origins": "*"}},
+     expose_headers=["ETag", "X-Next-Cursor", "X-Epoch", "X-Seq"])
 
 socketio = SocketIO(
     app,
@@ -58,105 +85,387 @@ def pid():
 @socketio.on("whoami")
 def whoami():
     socketio.emit("iam", {"pid": os.getpid()}, to=request.sid)
-dynamo        = boto3.resource("dynamodb", region_name=REGION)
+
+@socketio.on("connect")
+def on_connect():
+    """Until a client subscribes it gets every diff, one frame each."""
+    _startup()
+    WS_CLIENTS.inc()
+    join_room(LEGACY_ROOM)
+
+@socketio.on("disconnect")
+def on_disconnect(*_):
+    WS_CLIENTS.dec()
+
+@socketio.on("subscribe")
+def on_subscribe(spec):
+    """
+    spec: {"from_block": <int>, "to_block": <int>, "statuses": [...], "all": bool}
+    Any combination; ack carries the joined rooms or an error.
+    """
+    try:
+        return {"rooms": fanout.subscribe(request.sid, spec or {})}
+    except (TypeError, ValueError) as exc:
+        return {"error": str(exc)}
+
+@socketio.on("resume")
+def on_resume(msg):
+    """
+    msg: {"epoch": <str>, "seq": <int>, ...optional subscribe spec...}
+    Ack: {"epoch", "seq", "updates": [...]}  – everything missed since seq
+      or {"epoch", "seq", "resync": true}    – refetch /api/blocks instead
+    """
+    msg  = msg or {}
+    spec = {k: v for k, v in msg.items() if k not in ("epoch", "seq")}
+    try:
+        seq = int(msg["seq"]) if msg.get("seq") is not None else None
+        return fanout.resume(request.sid, msg.get("epoch"), seq, spec)
+    except (TypeError, ValueError) as exc:
+        return {"error": str(exc)}
+
+@socketio.on("unsubscribe")
+def on_unsubscribe(spec):
+    try:
+        return {"rooms": fanout.unsubscribe(request.sid, spec or {})}
+    except (TypeError, ValueError) as exc:
+        return {"error": str(exc)}
+
+@socketio.on("trace_ack")
+def on_trace_ack(msg):
+    """
+    msg: {"traces": ["<id>", ...]} – the `trace` ids of diffs just applied.
+    Optional; the first ack per trace is its `acked` hop.
+    """
+    ids = (msg or {}).get("traces")
+    if not isinstance(ids, list):
+        return {"error": "traces must be an array"}
+    return {"acked": sum(tracer.ack(i) for i in ids[:BULK_MAX] if isinstance(i, str))}
+HTTP_SECONDS = metrics.REGISTRY.histogram(
+    "http_request_seconds", "API latency to first byte", ("route", "method"))
+HTTP_TOTAL   = metrics.REGISTRY.counter(
+    "http_requests_total", "API requests", ("route", "method", "status"))
+WS_CLIENTS   = metrics.REGISTRY.gauge("socketio_connected_clients", "Connected sockets")
+WS_EMITS     = metrics.REGISTRY.counter("socketio_emits_total", "Socket.IO emits", ("event",))
+TRACE_GAP    = metrics.REGISTRY.histogram(
+    "block_trace_hop_seconds", "Block latency from the previous hop to this one", ("hop",),
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+TRACE_AGE    = metrics.REGISTRY.histogram(
+    "block_trace_age_seconds", "Block latency from mined to this hop", ("hop",),
+    buckets=(1, 5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+
+dynamo        = storage.resource()                 # DynamoDB, or SQLite for one box
+metrics.instrument_dynamodb(dynamo)
 index_table   = dynamo.Table(INDEX_TABLE)
 blocks_table  = dynamo.Table(BLOCKS_TABLE)
+block_cache   = BlockCache(blocks_table)
+fanout        = Fanout(socketio, span=ROOM_SPAN, window=COALESCE_MS / 1000,
+                       log_size=DIFF_LOG_SIZE,
+                       on_emit=lambda event, n: WS_EMITS.inc(n, event=event))
+bus           = make_bus(BUS_URL)
+tracer        = Tracer(keep=TRACE_KEEP, dump_path=TRACE_LOG,
+                       observe=lambda hop, gap, age: _observe_hop(hop, gap, age))
+jobs          = JobRunner(JOB_WORKER, size=JOB_WORKERS,
+                          spawn=socketio.start_background_task,
+                          on_event=lambda job: bus.publish("job", job))
 
 
 # ── helpers ─────────────────────────────────────────
-def _broadcast(block: int, payload: dict):
+def _observe_hop(hop: str, gap: float, age: float):
+    TRACE_GAP.observe(gap, hop=hop)
+    TRACE_AGE.observe(age, hop=hop)
+
+def _broadcast(block: int, payload: dict, item: dict | None = None):
+    """
+    Record a change in this worker's cache, then publish it on the bus so
+    every worker (this one included) fans it out to its own sockets.
+    `item` is the full record DynamoDB returned (ALL_NEW); without it
+    the diff is merged into whatever the cache holds.
     """
-    Emit a JSON-safe diff to every connected Web-Socket client.
+    _broadcast_many([(block, payload, item)])
+
+def _broadcast_many(changes: list[tuple[int, dict, dict | None]],
+                    traces: dict[int, dict] | None = None):
+    """
+    Same as _broadcast() for a batch of (block, diff, item) – one bus
+    message, one sequence number. `traces` (announced blocks, by index
+    into `changes`) ride along, each change naming its own trace id –
+    one block can be announced by several sinks in a batch – and get
+    their published / emitted hops in every worker.
     Any Decimal values coming from DynamoDB are coerced to int so
     socketio.emit() never trips over “Decimal is not JSON serializable”.
     """
     def _clean(v):
         return int(v) if isinstance(v, Decimal) else v
 
-    safe_payload = {k: _clean(v) for k, v in payload.items()}
-    socketio.emit("block_update", {"block": int(block), **safe_payload})
+    traces = traces or {}
+    out = []
+    for i, (block, payload, item) in enumerate(changes):
+        safe_payload = {k: _clean(v) for k, v in payload.items()}
+        if item is not None:
+            item = block_cache.put(item)
+        elif "table" not in safe_payload:     # other tables' announces aren't mintBlocks rows
+            block_cache.merge(int(block), safe_payload)
+        out.append({"block": int(block), "diff": safe_payload, "item": item,
+                    **({"trace": traces[i]["id"]} if i in traces else {})})
+    if out:
+        bus.publish("blocks", {"changes": out,
+                               **({"traces": list(traces.values())} if traces else {})})
+
+def _on_bus(msg: dict):
+    """Apply a peer's writes to our cache, then fan the diffs out locally."""
+    if msg["topic"] == "job":
+        if msg["origin"] != bus.origin:
+            jobs.peer(msg["data"])
+        socketio.emit("job_progress", msg["data"])
+        WS_EMITS.inc(event="job_progress")
+        return
+    if msg["topic"] != "blocks":
+        return
+    changes = msg["data"]["changes"]
+    if msg["origin"] != bus.origin:           # our own writes are already cached
+        for ch in changes:
+            if ch["item"] is not None:
+                block_cache.put(ch["item"])
+                hold_timer.seed([ch["item"]])
+            elif "table" not in ch["diff"]:
+                block_cache.merge(ch["block"], ch["diff"])
+    traces = msg["data"].get("traces") or []
+    for tr in traces:
+        tracer.record(tr, "published")
+    # clients ack a diff by its trace id
+    fanout.deliver(msg["epoch"], msg["seq"],
+                   [{"block": ch["block"], **ch["diff"],
+                     **({"trace": ch["trace"]} if ch.get("trace") else {})}
+                    for ch in changes])
+    for tr in traces:
+        tracer.record(tr, "emitted")
+
+def _reconcile_loop():
+    """Background green-thread: patch cache drift every CACHE_RECONCILE_SECS."""
+    while True:
+        socketio.sleep(CACHE_RECONCILE_SECS)
+        try:
+            changed = block_cache.reconcile()
+            if changed:
+                app.logger.info("block cache reconciled: %d block(s) drifted", changed)
+        except Exception as exc:
+            app.logger.warning("block cache reconcile failed: %s", exc)
+        # picks up holds granted elsewhere + retries any failed expiry
+        hold_timer.seed(block_cache.find(lambda it: True))
+
+_started    = False
+_start_lock = threading.Lock()
+
+@app.before_request
+def _startup():
+    """
+    First request (or socket) in each worker pays for the initial scan
+    and starts the background tasks.
+    """
+    global _started
+    if _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+        block_cache.ensure_loaded()
+        hold_timer.seed(block_cache.find(lambda it: True))
+        fanout.seed(block_cache.find(lambda it: True))
+        fanout.epoch = bus.epoch
+        bus.start(_on_bus, spawn=socketio.start_background_task)
+        socketio.start_background_task(hold_timer.run)
+        socketio.start_background_task(_reconcile_loop)
+        jobs.start()                           # one worker wins the runner lock
+        if METRICS_DIR:
+            socketio.start_background_task(_metrics_dump_loop)
+        _started = True
+
+@app.before_request
+def _start_timer():
+    g.t0 = time.perf_counter()
+
+@app.after_request
+def _observe(resp):
+    route  = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_SECONDS.observe(time.perf_counter() - g.get("t0", time.perf_counter()),
+                         route=route, method=request.method)
+    HTTP_TOTAL.inc(route=route, method=request.method, status=resp.status_code)
+    return resp
+
+def _metrics_dump_loop():
+    """With several workers each one drops a snapshot that /metrics merges."""
+    path = Path(METRICS_DIR) / f"api-{os.getpid()}.json"
+    while True:
+        try:
+            metrics.dump_snapshot(path)
+        except OSError as exc:
+            app.logger.warning("metrics snapshot failed: %s", exc)
+        socketio.sleep(5)
 
-def _running(lock: str) -> bool:
-    """Is the helper script already running?"""
-    p = Path(lock)
-    if not p.exists():
-        return False
+def _seq_headers() -> dict:
+    """
+    Diff-log position a snapshot corresponds to. Read it *before* the
+    cache: a diff landing in between is then replayed, never skipped.
+    """
+    return {"X-Epoch": fanout.epoch, "X-Seq": str(fanout.seq)}
+
+def _cached_response(body: bytes, etag: str, headers: dict | None = None):
+    """200 with a pre-encoded JSON body, or 304 on a matching If-None-Match."""
+    headers = {**(headers or {}), "ETag": etag}
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+def _stream_blocks(blocks: list[int], fields: set[str] | None):
+    """Yield a JSON array of cached blocks a chunk at a time."""
+    yield b"["
+    sep = b""
+    for i in range(0, len(blocks), STREAM_CHUNK):
+        parts = [block_cache.body(b, fields) for b in blocks[i:i + STREAM_CHUNK]]
+        parts = [p for p in parts if p is not None]      # dropped mid-stream
+        if parts:
+            yield sep + b",".join(parts)
+            sep = b","
+    yield b"]"
+
+def _int_arg(name: str) -> int | None:
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return None
     try:
-        pid = int(p.read_text())
-        proc = Path(f"/proc/{pid}")
-        if not proc.exists() or "State:\tZ" in (proc / "status").read_text():
-            raise RuntimeError
-        return True
-    except Exception:
-        p.unlink(missing_ok=True)
-        return False
-
-def _spawn(script: Path, lock: str, env_var: str):
-    if _running(lock):
-        return jsonify({"status": "busy"}), 409
-    proc = subprocess.Popen(
-        [sys.executable, str(script)],
-        env={**os.environ, env_var: lock},
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
-    Path(lock).write_text(str(proc.pid))
-    return jsonify({"status": "started"}), 202
+        return int(raw)
+    except ValueError:
+        abort(400, f"{name} must be an integer")
+
+def _set_arg(name: str) -> set[str] | None:
+    raw = request.args.get(name, "")
+    vals = {v.strip() for v in raw.split(",") if v.strip()}
+    return vals or None
 
 def _active_reservation(wallet: str, now_ms: int) -> int | None:
     """Return block # still held by this wallet (or None)."""
-    resp = blocks_table.scan(
-        ProjectionExpression="#b, reserved_until, #s",
-        ExpressionAttributeNames={"#b": "block", "#s": "status"},
-        FilterExpression=Attr("reserved_by").eq(wallet) & Attr("status").eq("reserved"),
+    held = block_cache.find(
+        lambda it: it.get("reserved_by") == wallet and it.get("status") == "reserved"
     )
-    for it in resp.get("Items", []):
+    for it in held:
         until = int(it.get("reserved_until", 0))
         if until == 0 or until > now_ms:
             return int(it["block"])
     return None
 
-def _release_expired_holds(now_ms: int):
-    """Flip status -> available for holds whose timer ran out."""
-    resp = blocks_table.scan(
-        ProjectionExpression="#b, reserved_until",
-        ExpressionAttributeNames={"#b": "block"},
-        FilterExpression=(
-            Attr("status").eq("reserved")
-            & Attr("reserved_until").exists()
-            & Attr("reserved_until").lt(Decimal(now_ms))
-        ),
-    )
-    for it in resp["Items"]:
+def _expire_hold(block: int, until: int):
+    """
+    HoldScheduler callback: flip one timed-out hold back to available.
+    Conditional on the exact reserved_until we scheduled, so a hold that
+    was released, minted or re-granted since is left alone.
+    """
+    try:
+        resp = blocks_table.update_item(
+            Key={"block": block},
+            ConditionExpression=(
+                Attr("status").eq("reserved")
+                & Attr("reserved_until").eq(Decimal(until))
+            ),
+            UpdateExpression="""
+                REMOVE reserved_by, reserved_until
+                SET #s = :a, added_at = :at
+            """,
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":a": "available",
+                ":at": Decimal(_now_ms()),
+            },
+            ReturnValues="ALL_NEW",
+        )
+    except blocks_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return
+    _broadcast(block, {"status": "available"}, item=resp["Attributes"])
+
+hold_timer = HoldScheduler(_expire_hold)
+
+def _transact_updates(ops: list[dict]) -> dict[int, str]:
+    """{block: "ok" | "conflict" | "error:<code>"} – see bulk_writes.transact_updates."""
+    return transact_updates(dynamo.meta.client, BLOCKS_TABLE, ops)
+
+def _bulk_blocks(body: dict) -> list[dict]:
+    """Normalise body["blocks"] to [{"block": int, ...}] (ints or dicts accepted)."""
+    raw = body.get("blocks")
+    if not isinstance(raw, list) or not raw:
+        abort(400, "blocks must be a non-empty array")
+    if len(raw) > BULK_MAX:
+        abort(400, f"at most {BULK_MAX} blocks per request")
+    out, seen = [], set()
+    for entry in raw:
+        entry = dict(entry) if isinstance(entry, dict) else {"block": entry}
         try:
-            blocks_table.update_item(
-                Key={"block": it["block"]},
-                ConditionExpression=Attr("status").eq("reserved"),
-                UpdateExpression="""
-                    REMOVE reserved_by, reserved_until
-                    SET #s = :a, added_at = :at
-                """,
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={
-                    ":a": "available",
-                    ":at": Decimal(now_ms),
-                },
-            )
-            _broadcast(it["block"], {"status": "available"})
-        except blocks_table.meta.client.exceptions.ConditionalCheckFailedException:
-            pass
+            entry["block"] = int(entry["block"])
+        except (KeyError, TypeError, ValueError):
+            abort(400, f"bad block entry: {entry}")
+        if entry["block"] in seen:
+            abort(400, f"duplicate block {entry['block']}")
+        seen.add(entry["block"])
+        out.append(entry)
+    return out
+
+def _after(block: int, set_: dict, remove: tuple = ()) -> dict:
+    """The record a successful bulk update leaves behind (transactions return none)."""
+    it = block_cache.get(block) or {"block": block}
+    it.update(set_)
+    for k in remove:
+        it.pop(k, None)
+    return it
+
+def _bulk_reply(results: dict[int, str], changes: list):
+    _broadcast_many(changes)
+    return jsonify({"results": [
+        {"block": b, "result": r} for b, r in sorted(results.items())
+    ]}), 200
 
 # ─── misc endpoints ─────────────────────────────────
 @app.get("/api/ping")
 def ping():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus text format. With METRICS_DIR set, every worker's recent
+    snapshot is merged in, labelled worker=<pid>.
+    """
+    if not METRICS_DIR:
+        body = metrics.REGISTRY.render()
+    else:
+        snaps = {str(os.getpid()): metrics.REGISTRY.collect()}
+        for f in Path(METRICS_DIR).glob("api-*.json"):
+            pid = f.stem[4:]
+            if pid == str(os.getpid()) or time.time() - f.stat().st_mtime > 60:
+                continue
+            try:
+                snaps[pid] = json.loads(f.read_text())
+            except (OSError, ValueError):
+                continue
+        body = metrics.render(metrics.merge(snaps))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 # ─── push-style “announce-block” endpoint ──────────────────────────────
+def _announced(entry: dict) -> dict:
+    """
+    An announce's diff. Only mintBlocks announces (no "table", or
+    BLOCKS_TABLE) are merged into the cache; the others keep their
+    "table" so the cache and the front-ends can tell them apart.
+    """
+    table = entry.get("table", BLOCKS_TABLE)
+    diff = {k: v for k, v in entry.items() if k not in ("block", "trace", "table")}
+    if table != BLOCKS_TABLE:
+        diff["table"] = table
+    return diff
+
 @app.post("/api/announce-block")
 def announce_block():
     """
     Body: {
       "block"   : <int>,                     # REQUIRED
+      "table"   : <str>,                     # optional, default mintBlocks
       ...any other fields to merge...
     }
     Simply re-emits the payload via Web-Sockets so every connected
@@ -167,33 +476,136 @@ def announce_block():
     if blk is None:
         abort(400, "missing block")
 
-    # Broadcast the diff exactly as it came in
-    _broadcast(int(blk), {k: v for k, v in body.items() if k != "block"})
+    # Broadcast the diff as it came in (its trace, if any, rides beside it)
+    tr = body.get("trace")
+    traces = {0: tracer.start({**tr, "block": int(blk)})} if Tracer.valid(tr) else None
+    _broadcast_many([(int(blk), _announced(body), None)], traces)
+    return "", 204
+
+@app.post("/api/announce-blocks")
+def announce_blocks():
+    """
+    Body: { "blocks": [{"block": <int>, "table": <str>?, ...fields to merge...}, ...] }
+    Batched /api/announce-block (what the watchers' spool sends): the
+    whole array goes out as one bus message / one broadcast. Diffs are
+    merges, so a redelivered batch is harmless.
+    """
+    body = request.get_json(force=True) or {}
+    raw  = body.get("blocks")
+    if not isinstance(raw, list) or not raw:
+        abort(400, "blocks must be a non-empty array")
+    if len(raw) > BULK_MAX:
+        abort(400, f"at most {BULK_MAX} blocks per request")
+    changes, traces = [], {}
+    for entry in raw:
+        try:
+            blk = int(entry["block"])
+        except (KeyError, TypeError, ValueError):
+            abort(400, f"bad block entry: {entry}")
+        if Tracer.valid(entry.get("trace")):
+            traces[len(changes)] = tracer.start({**entry["trace"], "block": blk})
+        changes.append((blk, _announced(entry), None))
+    _broadcast_many(changes, traces)
     return "", 204
 
+@app.get("/api/traces")
+def list_traces():
+    """
+    Recent block traces, newest first: ?block=<n> narrows to one block,
+    ?limit=<n> (default 100). Each is {"id", "block", "hops": [[hop, unix secs]]}.
+    """
+    try:
+        block = int(request.args["block"]) if "block" in request.args else None
+        limit = min(int(request.args.get("limit", 100)), TRACE_KEEP)
+    except ValueError:
+        abort(400, "block and limit must be integers")
+    return jsonify({"traces": tracer.find(block, limit)})
+
+@app.get("/api/traces/<trace_id>")
+def get_trace(trace_id: str):
+    tr = tracer.get(trace_id)
+    if tr is None:
+        abort(404)
+    return jsonify(tr)
+
+
 
+# ─── looper jobs ────────────────────────────────────
+def _submit(kind: str):
+    """Queue a looper run; a run already waiting is reused, never refused."""
+    job, dedup = jobs.submit(kind)
+    return jsonify({"status": job["state"], "job_id": job["id"],
+                    "deduplicated": dedup}), 202
 
 @app.post("/api/run-authscript")
 def run_auth():
-    return _spawn(AUTH_SCRIPT, AUTH_LOCK, "AUTH_LOCK_FILE")
+    return _submit("auth")
 
 @app.post("/api/run-inscriptionscript")
 def run_index():
-    return _spawn(INDEX_SCRIPT, INDEX_LOCK, "INDEX_LOCK_FILE")
+    return _submit("index")
 
 @app.post("/api/run-both")
 def run_both():
-    return _spawn(BOTH_SCRIPT, BOTH_LOCK, "RUN_BOTH_LOCK_FILE")
+    return _submit("both")
+
+@app.get("/api/jobs")
+def list_jobs():
+    return jsonify(jobs.recent())
+
+@app.get("/api/jobs/<job_id>")
+def get_job(job_id: str):
+    """state, stage, current_block, blocks_done (+ done_by_stage), rate (blocks/s), timings."""
+    job = jobs.get(job_id)
+    if not job:
+        abort(404, "job not found")
+    return jsonify(job)
 
 # ─── public data endpoints ──────────────────────────
 @app.get("/api/blocks")
 def all_blocks():
-    now = _now_ms()
-    _release_expired_holds(now)
-    resp = blocks_table.scan()
-    items = resp.get("Items", [])
-    items.sort(key=lambda x: int(x["block"]))
-    return jsonify(items)
+    """
+    Query params (all optional):
+      from_block / to_block   inclusive block range
+      status=a,b              only these statuses
+      fields=f1,f2            project each record ("block" always kept)
+      limit=<n> / cursor=<c>  paginate; next cursor comes back in X-Next-Cursor
+    No params → the full list, streamed from the cached bodies, with an ETag.
+    """
+    seq_hdrs = _seq_headers()
+    if not request.args:                       # streamed: no joined copy of the table
+        blocks, tag = block_cache.listing()
+        etag = f'W/"{tag}"'
+        if request.if_none_match.contains_weak(tag):
+            return Response(status=304, headers={**seq_hdrs, "ETag": etag})
+        return Response(stream_with_context(_stream_blocks(blocks, None)),
+                        mimetype="application/json", headers={**seq_hdrs, "ETag": etag})
+
+    limit = _int_arg("limit")
+    if limit is not None and not 0 < limit <= MAX_PAGE:
+        abort(400, f"limit must be 1..{MAX_PAGE}")
+
+    blocks, nxt = block_cache.select(
+        lo=_int_arg("from_block"),
+        hi=_int_arg("to_block"),
+        statuses=_set_arg("status"),
+        after=_int_arg("cursor"),
+        limit=limit,
+    )
+    # from the rows themselves, so every worker (and a restart) agrees
+    tag  = block_cache.digest(blocks, request.query_string + f"|{nxt}".encode())
+    etag = f'W/"{tag}"'
+    if request.if_none_match.contains_weak(tag):
+        return Response(status=304, headers={**seq_hdrs, "ETag": etag})
+
+    headers = {**seq_hdrs, "ETag": etag}
+    if nxt is not None:
+        headers["X-Next-Cursor"] = str(nxt)
+    return Response(
+        stream_with_context(_stream_blocks(blocks, _set_arg("fields"))),
+        mimetype="application/json",
+        headers=headers,
+    )
 
 @app.get("/api/blocks/<int:block>")
 def get_block(block: int):
@@ -201,25 +613,19 @@ def get_block(block: int):
     Return a single block record so /broadcast/package can
     verify the reservation still belongs to the caller.
     """
-    now = _now_ms()
-    _release_expired_holds(now)                # keep timers honest
-
-    rec = blocks_table.get_item(Key={"block": block}).get("Item")
-    if not rec:                                # nonexistent block → 404
-        abort(404, "block not found")
-
-    # DynamoDB numbers arrive as Decimal → coerce to int for JSON
-    clean = {
-        k: int(v) if isinstance(v, Decimal) else v
-        for k, v in rec.items()
-    }
-    return jsonify(clean), 200
+    entry = block_cache.entry(block)
+    if entry is None:                          # not cached yet → ask DynamoDB once
+        rec = blocks_table.get_item(Key={"block": block}).get("Item")
+        if not rec:                            # nonexistent block → 404
+            abort(404, "block not found")
+        block_cache.put(rec)
+        entry = block_cache.entry(block)
+    return _cached_response(*entry)
 
 # ─── reservation endpoints ──────────────────────────
 @app.post("/api/blocks/<int:block>/mint")
 def reserve_block(block: int):
     now = _now_ms()
-    _release_expired_holds(now)
 
     body    = request.get_json(force=True) or {}
     wallet  = body.get("wallet")
@@ -247,7 +653,7 @@ def reserve_block(block: int):
             )
         )
         try:
-            blocks_table.update_item(
+            resp = blocks_table.update_item(
                 Key={"block": block},
                 ConditionExpression=cond,
                 UpdateExpression="""
@@ -261,12 +667,14 @@ def reserve_block(block: int):
                     ":ru": Decimal(expires),
                     ":at": Decimal(now),
                 },
+                ReturnValues="ALL_NEW",
             )
+            hold_timer.schedule(block, expires)
             _broadcast(block, {
                 "status": "reserved",
                 "reserved_by": wallet,
                 "reserved_until": expires,
-            })
+            }, item=resp["Attributes"])
         except blocks_table.meta.client.exceptions.ConditionalCheckFailedException:
             abort(400, "Block not available")
         return {"reserved_until": expires}, 200
@@ -276,7 +684,7 @@ def reserve_block(block: int):
     if existing.get("status") not in (None, "available"):
         abort(400, "Block not available")
 
-    blocks_table.update_item(
+    resp = blocks_table.update_item(
         Key={"block": block},
         UpdateExpression="""
             SET #s=:r,
@@ -289,11 +697,12 @@ def reserve_block(block: int):
             ":wb": wallet,
             ":at": Decimal(now),
         },
+        ReturnValues="ALL_NEW",
     )
     _broadcast(block, {
         "status": "reserved",
         "reserved_by": wallet,
-    })
+    }, item=resp["Attributes"])
     return "", 204
 
 @app.delete("/api/blocks/<int:block>/mint")
@@ -302,7 +711,7 @@ def release_block(block: int):
     wallet = body.get("wallet") or ""
     cond = Attr("reserved_by").eq(wallet) & Attr("status").eq("reserved")
     try:
-        blocks_table.update_item(
+        resp = blocks_table.update_item(
             Key={"block": block},
             ConditionExpression=cond,
             UpdateExpression="""
@@ -311,8 +720,9 @@ def release_block(block: int):
             """,
             ExpressionAttributeNames={"#s": "status"},
             ExpressionAttributeValues={":a": "available", ":at": Decimal(_now_ms())},
+            ReturnValues="ALL_NEW",
         )
-        _broadcast(block, {"status": "available"})
+        _broadcast(block, {"status": "available"}, item=resp["Attributes"])
     except blocks_table.meta.client.exceptions.ConditionalCheckFailedException:
         abort(409, "reservation not held by this wallet")
     return "", 204
@@ -345,23 +755,114 @@ def update_status(block: int):
     if insc_id:
         expr_names["#i"] = "inscription_id"
         expr_values[":iid"] = insc_id
-        update_expr += ", #i = :iid"
+        expr_values[":pc"]  = PENDING_CONFIRM
+        update_expr += ", #i = :iid, pending_confirm = :pc"
 
-    blocks_table.update_item(
+    resp = blocks_table.update_item(
         Key={"block": block},
         UpdateExpression=update_expr,
         ExpressionAttributeNames=expr_names,
         ExpressionAttributeValues=expr_values,
+        ReturnValues="ALL_NEW",
     )
 
     diff = {"status": new_status}
     if insc_id:
         diff["inscription_id"] = insc_id
-    _broadcast(block, diff)
+    _broadcast(block, diff, item=resp["Attributes"])
 
     return "", 204
 
 
+# ─── bulk endpoints (admin / minting backend) ──────────────────────
+@app.post("/api/blocks/mint")
+def reserve_blocks():
+    """
+    Body: { "wallet": "<addr>", "blocks": [<int>, ...] }
+    Indefinite holds (enableSig false semantics) for admin tooling; each
+    block must be available. No single-reservation guard.
+    """
+    body   = request.get_json(force=True) or {}
+    wallet = body.get("wallet")
+    if not wallet:
+        abort(400, "wallet required")
+    entries = _bulk_blocks(body)
+    now     = _now_ms()
+    ops = [{
+        "block" : e["block"],
+        "update": "SET #s=:r, reserved_by=:wb, added_at=:at",
+        "cond"  : "attribute_not_exists(#s) OR #s = :a",
+        "names" : {"#s": "status"},
+        "values": {":r": "reserved", ":wb": wallet, ":at": Decimal(now),
+                   ":a": "available"},
+    } for e in entries]
+    results = _transact_updates(ops)
+    diff    = {"status": "reserved", "reserved_by": wallet}
+    changes = [(b, diff, _after(b, {**diff, "added_at": now}))
+               for b, r in results.items() if r == "ok"]
+    return _bulk_reply(results, changes)
+
+@app.delete("/api/blocks/mint")
+def release_blocks():
+    """
+    Body: { "wallet": "<addr>", "blocks": [<int> | {"block", "wallet"}, ...] }
+    Per-entry wallet overrides the top-level one.
+    """
+    body    = request.get_json(force=True) or {}
+    entries = _bulk_blocks(body)
+    now     = _now_ms()
+    ops = [{
+        "block" : e["block"],
+        "update": "REMOVE reserved_by, reserved_until SET #s=:a, added_at=:at",
+        "cond"  : "reserved_by = :wb AND #s = :r",
+        "names" : {"#s": "status"},
+        "values": {":a": "available", ":at": Decimal(now), ":r": "reserved",
+                   ":wb": e.get("wallet") or body.get("wallet") or ""},
+    } for e in entries]
+    results = _transact_updates(ops)
+    changes = [(b, {"status": "available"},
+                _after(b, {"status": "available", "added_at": now},
+                       remove=("reserved_by", "reserved_until")))
+               for b, r in results.items() if r == "ok"]
+    return _bulk_reply(results, changes)
+
+@app.patch("/api/blocks/status")
+def update_statuses():
+    """
+    Body: { "blocks": [{"block", "status", "inscription_id" (optional)}, ...] }
+    Same rules as PATCH /api/blocks/<n>/status, one transaction per 100.
+    """
+    body    = request.get_json(force=True) or {}
+    entries = _bulk_blocks(body)
+    now     = _now_ms()
+    ops, diffs = [], {}
+    for e in entries:
+        new_status = e.get("status")
+        if new_status not in ("minted", "complete", "reserved", "available"):
+            abort(400, f"bad status for block {e['block']}")
+        if new_status == "complete":
+            new_status = "minted"
+        op = {
+            "block" : e["block"],
+            "update": "SET #s = :ns, added_at = :at",
+            "names" : {"#s": "status"},
+            "values": {":ns": new_status, ":at": Decimal(now)},
+        }
+        diff = {"status": new_status}
+        if e.get("inscription_id"):
+            op["names"]["#i"]    = "inscription_id"
+            op["values"][":iid"] = e["inscription_id"]
+            op["values"][":pc"]  = PENDING_CONFIRM
+            op["update"]        += ", #i = :iid, pending_confirm = :pc"
+            diff["inscription_id"] = e["inscription_id"]
+        ops.append(op)
+        diffs[e["block"]] = diff
+    results = _transact_updates(ops)
+    changes = [(b, diffs[b], _after(b, {**diffs[b], "added_at": now}))
+               for b, r in results.items() if r == "ok"]
+    return _bulk_reply(results, changes)
+
+
 # ─── run ────────────────────────────────────────────
 if __name__ == "__main__":
-    socketio.run(app, host="0.0.0.0", port=8080)
+    socketio.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8080)))
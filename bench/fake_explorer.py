@@ -0,0 +1,210 @@
+# ---------------------------------------------------
+# fake_explorer.py – offline stand-in for every external
+# service the watchers and loopers talk to
+#   • Blockstream   /api/…            (tip, blocks, txs)
+#   • bitcoind REST /rest/…           (chaininfo, blockhashbyheight,
+#                                      block/notxdetails) + optional
+#                                      ZMQ hashblock publisher (pyzmq)
+#   • Hiro          /hiro/inscriptions/<id>
+#   • ordinals.com  /inscription/<id> + /preview/<id> widget
+#
+# Everything is derived from the height, so two runs see the
+# same chain. `latency` adds a fixed delay per request to
+# stand in for the WAN round-trip; mine() extends the chain.
+# ---------------------------------------------------
+from __future__ import annotations
+
+import hashlib, json, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENESIS_TS = 1_700_000_000                       # timestamp of height 0
+
+
+def block_hash(h: int) -> str:
+    return hashlib.sha256(f"block:{h}".encode()).hexdigest()
+
+
+def txid(h: int, i: int = 0) -> str:
+    return hashlib.sha256(f"tx:{h}:{i}".encode()).hexdigest()
+
+
+def block(h: int) -> dict:
+    # every other block matches blockWatcher's "8b in bits" rule
+    return {"id": block_hash(h), "height": h, "timestamp": GENESIS_TS + 600 * h,
+            "bits": "1708b0a5" if h % 2 else "17034219", "tx_count": 3}
+
+
+# the ordinals.com widget: AL answers at once, IL shows "running…" first
+_PREVIEW = """<!doctype html><html><body>
+<input id="blockAL"><button id="alButton">AL</button><pre id="alOutput"></pre>
+<input id="blockIL"><button id="ilButton">IL</button><pre id="ilOutput"></pre>
+<script>
+alButton.onclick = () => {
+  const n = +blockAL.value;
+  alOutput.textContent = JSON.stringify({block: n, authorizedParent: "parent" + n + "i0"});
+};
+ilButton.onclick = () => {
+  const n = +blockIL.value;
+  ilOutput.textContent = "running…";
+  setTimeout(() => ilOutput.textContent =
+      JSON.stringify({block: n, mintedInscription: "insc" + n + "i0"}), %(il_ms)d);
+};
+</script></body></html>"""
+
+
+class FakeExplorer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr=("127.0.0.1", 0), tip: int = 900_000,
+                 latency: float = 0.0, il_ms: int = 200, zmq_url: str | None = None):
+        self.tip, self.latency, self.il_ms = tip, latency, il_ms
+        self.hits: dict[str, int] = {}
+        self.by_hash: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._pub, self._seq = None, 0
+        if zmq_url:
+            import zmq
+            self._pub = zmq.Context.instance().socket(zmq.PUB)
+            self._pub.bind(zmq_url)
+        super().__init__(addr, _Handler)
+
+    def mine(self, n: int = 1) -> int:
+        """Extend the chain by n blocks, publishing hashblock for each; returns the tip."""
+        for _ in range(n):
+            with self._lock:
+                self.tip += 1
+                h, seq = self.tip, self._seq
+                self._seq += 1
+            if self._pub is not None:
+                self._pub.send_multipart([b"hashblock", bytes.fromhex(block_hash(h)),
+                                          seq.to_bytes(4, "little")])
+        return self.tip
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self.hits[route] = self.hits.get(route, 0) + 1
+
+    def start(self) -> "FakeExplorer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+_HEIGHT_OR_HASH = re.compile(r"^[0-9]+$")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeExplorer
+
+    def log_message(self, *args):                # keep bench output readable
+        pass
+
+    def _send(self, body, status: int = 200, ctype: str = "application/json"):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _height(self, ref: str) -> int | None:
+        if _HEIGHT_OR_HASH.match(ref):
+            return int(ref)
+        if ref in self.server.by_hash:
+            return self.server.by_hash[ref]
+        # hashes come from block_hash(); search back from the tip
+        for h in range(self.server.tip, max(self.server.tip - 20_000, -1), -1):
+            if block_hash(h) == ref:
+                return h
+        return None
+
+    def do_GET(self):
+        srv = self.server
+        if srv.latency:
+            time.sleep(srv.latency)
+        parts = self.path.split("?")[0].strip("/").split("/")
+
+        if parts[:1] == ["api"]:
+            rest = parts[1:]
+            srv.count("/api/" + rest[0] if rest else "/api")
+            if rest == ["blocks", "tip", "height"]:
+                return self._send(str(srv.tip), ctype="text/plain")
+            if len(rest) == 2 and rest[0] == "block-height":
+                h = int(rest[1])
+                if h > srv.tip:
+                    return self._send("Block not found", 404, "text/plain")
+                srv.by_hash[block_hash(h)] = h
+                return self._send(block_hash(h), ctype="text/plain")
+            if len(rest) == 2 and rest[0] == "blocks":
+                start = min(int(rest[1]), srv.tip)
+                return self._send([block(h) for h in range(start, max(start - 10, -1), -1)])
+            if len(rest) >= 2 and rest[0] == "block":
+                h = self._height(rest[1])
+                if h is None or h > srv.tip:
+                    return self._send("Block not found", 404, "text/plain")
+                if rest[2:] == ["txids"]:
+                    return self._send([txid(h, i) for i in range(3)])
+                return self._send(block(h))
+            if len(rest) == 3 and rest[0] == "tx" and rest[2] == "status":
+                return self._send({"confirmed": True, "block_height": srv.tip})
+
+        if parts[:1] == ["rest"]:
+            rest = [p.removesuffix(".json") for p in parts[1:]]
+            srv.count("/rest/" + rest[0] if rest else "/rest")
+            if rest == ["chaininfo"]:
+                return self._send({"chain": "main", "blocks": srv.tip,
+                                   "bestblockhash": block_hash(srv.tip)})
+            if len(rest) == 2 and rest[0] == "blockhashbyheight" and int(rest[1]) <= srv.tip:
+                return self._send({"blockhash": block_hash(int(rest[1]))})
+            if len(rest) == 3 and rest[:2] == ["block", "notxdetails"]:
+                h = self._height(rest[2])
+                if h is not None and h <= srv.tip:
+                    b = block(h)
+                    return self._send({"hash": b["id"], "height": h, "time": b["timestamp"],
+                                       "bits": b["bits"], "nTx": b["tx_count"],
+                                       "tx": [txid(h, i) for i in range(b["tx_count"])]})
+            return self._send("Block not found", 404, "text/plain")
+
+        if parts[:2] == ["hiro", "inscriptions"] and len(parts) == 3:
+            srv.count("/hiro")
+            n = int(re.sub(r"\D", "", parts[2]) or 0)
+            return self._send({"id": parts[2], "number": n,
+                               "timestamp": (GENESIS_TS + 600 * n) * 1000})
+
+        if parts[:1] == ["inscription"] and len(parts) == 2:
+            srv.count("/inscription")
+            return self._send(f'<!doctype html><iframe src="/preview/{parts[1]}"></iframe>',
+                              ctype="text/html")
+        if parts[:1] == ["preview"]:
+            srv.count("/preview")
+            return self._send(_PREVIEW % {"il_ms": srv.il_ms},
+                              ctype="text/html")
+
+        self._send({"error": "not found", "path": self.path}, 404)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="serve the fake explorer on its own")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--tip", type=int, default=900_000)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--zmq", help="publish hashblock here, e.g. tcp://127.0.0.1:28332")
+    ap.add_argument("--mine-every", type=float, default=0, help="seconds between new blocks")
+    a = ap.parse_args()
+    srv = FakeExplorer(("127.0.0.1", a.port), tip=a.tip, latency=a.latency_ms / 1000,
+                       zmq_url=a.zmq)
+    print("fake explorer ▶", srv.url)
+    if a.mine_every:
+        def _miner():
+            while True:
+                time.sleep(a.mine_every)
+                print("mined", srv.mine())
+        threading.Thread(target=_miner, daemon=True).start()
+    srv.serve_forever()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------
+# run.py – offline load test / benchmark harness
+#   • moto DynamoDB seeded with N mintBlocks + M backfill rows
+#   • fake Blockstream / Hiro / ordinals.com (fake_explorer.py)
+#   • app.py started against both, then:
+#       mint     – stampede of POST /api/blocks/<n>/mint on a few hot blocks
+#       sockets  – thousands of Socket.IO listeners, announce → receive latency
+#       watcher  – ingest.py (both sinks) catching up over the last K blocks
+#       looper   – authLooperBackend + indexLooper backfill (needs Playwright)
+#   • p50 / p99, throughput, peak RSS and DynamoDB calls per scenario,
+#     written to bench/results/<label>.json
+#
+#   pip install -r bench/requirements.txt
+#   python bench/run.py --label before
+#   python bench/run.py --label after --scenarios mint,sockets
+#   python bench/run.py --compare bench/results/before.json bench/results/after.json
+# ---------------------------------------------------
+from __future__ import annotations
+
+import argparse, asyncio, importlib.util, json, os, platform, resource, socket, \
+       subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT      = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from fake_explorer import FakeExplorer          # noqa: E402
+
+SEED_BASE = 800_000                             # first seeded mintBlocks row
+CHAIN_TIP = 900_000                             # fake explorer tip
+SCENARIOS = ("mint", "sockets", "watcher", "looper")
+
+
+# ─── numbers ────────────────────────────────────────
+def pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def summary(lat_s: list[float], wall_s: float) -> dict:
+    return {"n": len(lat_s),
+            "p50_ms": round(pct(lat_s, 50) * 1000, 2),
+            "p99_ms": round(pct(lat_s, 99) * 1000, 2),
+            "max_ms": round(max(lat_s, default=0) * 1000, 2),
+            "wall_s": round(wall_s, 3),
+            "throughput_per_s": round(len(lat_s) / wall_s, 2) if wall_s else 0.0}
+
+
+def rss_mb(pid: int) -> dict:
+    """Current + peak resident set of a process, from /proc (Linux)."""
+    out = {}
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            key, _, val = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                out["rss_mb" if key == "VmRSS" else "peak_rss_mb"] = \
+                    round(int(val.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return out
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_rev() -> dict:
+    def git(*a):
+        return subprocess.run(["git", *a], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+# ─── stand-ins ──────────────────────────────────────
+def start_dynamo(port: int):
+    from moto.server import ThreadedMotoServer
+    srv = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    srv.start()
+    return srv
+
+
+def seed_tables(endpoint: str, blocks: int, backfill: int) -> None:
+    import boto3
+    ddb = boto3.resource("dynamodb", region_name="us-east-1", endpoint_url=endpoint)
+    ddb.create_table(TableName="mintBlocks",
+                     KeySchema=[{"AttributeName": "block", "KeyType": "HASH"}],
+                     AttributeDefinitions=[{"AttributeName": "block", "AttributeType": "N"},
+                                           {"AttributeName": "pending_confirm",
+                                            "AttributeType": "S"}],
+                     GlobalSecondaryIndexes=[{          # sparse: see ingest.MintSink
+                         "IndexName": "pending_confirm-index",
+                         "KeySchema": [{"AttributeName": "pending_confirm", "KeyType": "HASH"},
+                                       {"AttributeName": "block", "KeyType": "RANGE"}],
+                         "Projection": {"ProjectionType": "INCLUDE",
+                                        "NonKeyAttributes": ["inscription_id"]}}],
+                     BillingMode="PAY_PER_REQUEST")
+    ddb.create_table(TableName="dynamicIndex1",
+                     KeySchema=[{"AttributeName": "block_number", "KeyType": "HASH"}],
+                     AttributeDefinitions=[{"AttributeName": "block_number",
+                                            "AttributeType": "N"}],
+                     BillingMode="PAY_PER_REQUEST")
+    now = int(time.time() * 1000)
+    with ddb.Table("mintBlocks").batch_writer() as bw:
+        for b in range(SEED_BASE, SEED_BASE + blocks):
+            bw.put_item(Item={"block": b, "hash": f"{b:064x}", "mined_at": b,
+                              "added_at": now, "status": "available",
+                              "inscription_id": "", "confirmed": False})
+    with ddb.Table("dynamicIndex1").batch_writer() as bw:
+        for b in range(SEED_BASE, SEED_BASE + backfill):
+            bw.put_item(Item={"block_number": b, "bits": "1708b0a5",
+                              "status": "available", "timestamp": b})
+
+
+class Stack:
+    """moto + fake explorer + app.py, torn down in reverse."""
+
+    def __init__(self, args):
+        self.args     = args
+        self.work     = Path(tempfile.mkdtemp(prefix="dynidx-bench-"))
+        self.ddb_port = free_port()
+        self.app_port = free_port()
+        self.app_url  = f"http://127.0.0.1:{self.app_port}"
+        self.app: subprocess.Popen | None = None
+
+    def __enter__(self) -> "Stack":
+        a = self.args
+        self.moto = start_dynamo(self.ddb_port)
+        self.ddb_url = f"http://127.0.0.1:{self.ddb_port}"
+        seed_tables(self.ddb_url, a.blocks, a.backfill)
+        self.explorer = FakeExplorer(tip=CHAIN_TIP, latency=a.explorer_latency_ms / 1000).start()
+        self.env = {
+            **os.environ,
+            "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "DYNAMODB_ENDPOINT": self.ddb_url,
+            "BLOCKSTREAM_API": self.explorer.url + "/api",
+            "HIRO_API_BASE": self.explorer.url + "/hiro/inscriptions",
+            "ORDINALS_BASE": self.explorer.url,
+            "ANNOUNCE_URL": self.app_url + "/api/announce-blocks",
+            "STATE_DIR": str(self.work / "state"),
+            "PORT": str(self.app_port),
+        }
+        for k in ("METRICS_TEXTFILE", "METRICS_PUSHGATEWAY", "BUS_URL", "METRICS_DIR"):
+            self.env.pop(k, None)
+        self.app = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=self.env,
+                                    stdout=open(self.work / "app.log", "w"),
+                                    stderr=subprocess.STDOUT)
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self, timeout: float = 60) -> None:
+        import requests
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.app.poll() is not None:
+                sys.exit(f"app.py exited – see {self.work / 'app.log'}")
+            try:
+                requests.get(self.app_url + "/api/ping", timeout=1)
+                requests.get(self.app_url + "/api/blocks", timeout=30)   # warm the cache
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        sys.exit("app.py did not come up")
+
+    def __exit__(self, *exc):
+        if self.app and self.app.poll() is None:
+            self.app.terminate()
+            try:
+                self.app.wait(10)
+            except subprocess.TimeoutExpired:
+                self.app.kill()
+        self.explorer.shutdown()
+        self.moto.stop()
+
+    def ddb_calls(self) -> int:
+        """Sum of dynamodb_calls_total as reported by the app's /metrics."""
+        import requests
+        text = requests.get(self.app_url + "/metrics", timeout=10).text
+        return int(sum(float(l.rsplit(" ", 1)[1]) for l in text.splitlines()
+                       if l.startswith("dynamodb_calls_total")))
+
+    def script(self, name: str, **env) -> subprocess.Popen:
+        return subprocess.Popen([sys.executable, name], cwd=ROOT / "scripts",
+                                env={**self.env, **env},
+                                stdout=open(self.work / f"{name}.log", "a"),
+                                stderr=subprocess.STDOUT)
+
+
+# ─── scenarios ──────────────────────────────────────
+async def _mint(stack: Stack) -> dict:
+    import aiohttp
+    a = stack.args
+    hot = [SEED_BASE + i for i in range(a.hot_blocks)]
+    lat: list[float] = []
+    codes: dict[str, int] = {}
+    sem = asyncio.Semaphore(a.concurrency)
+
+    async def one(session, i: int):
+        async with sem:
+            t0 = time.perf_counter()
+            async with session.post(f"{stack.app_url}/api/blocks/{hot[i % len(hot)]}/mint",
+                                    json={"wallet": f"bc1qbench{i:06d}", "enableSig": True}) as r:
+                await r.read()
+            lat.append(time.perf_counter() - t0)
+            codes[str(r.status)] = codes.get(str(r.status), 0) + 1
+
+    conn = aiohttp.TCPConnector(limit=a.concurrency)
+    async with aiohttp.ClientSession(connector=conn) as session:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(session, i) for i in range(a.stampede)))
+        wall = time.perf_counter() - t0
+    return {**summary(lat, wall), "status": codes,
+            "winners_ok": codes.get("200", 0) == len(hot)}
+
+
+async def _sockets(stack: Stack) -> dict:
+    import aiohttp, socketio
+    a = stack.args
+    sent: dict[int, float] = {}
+    lat: list[float] = []
+    conn_lat: list[float] = []
+    clients: list = []
+    sem = asyncio.Semaphore(200)
+    rooms = a.socket_mode == "rooms"
+
+    def on_diff(d: dict):
+        k = d.get("bench_id")
+        if k in sent:
+            lat.append(time.perf_counter() - sent[k])
+
+    async def connect(i: int):
+        c = socketio.AsyncClient(reconnection=False)
+        if rooms:
+            c.on("block_updates", lambda m: [on_diff(u) for u in m.get("updates", ())])
+        else:
+            c.on("block_update", on_diff)
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await c.connect(stack.app_url, transports=["websocket"], wait_timeout=30)
+                if rooms:
+                    await c.call("subscribe", {"all": True}, timeout=30)
+            except Exception:
+                return
+            conn_lat.append(time.perf_counter() - t0)
+            clients.append(c)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(connect(i) for i in range(a.sockets)))
+    conn_wall = time.perf_counter() - t0
+    peak = rss_mb(stack.app.pid)
+
+    expected = len(clients) * a.announces
+    async with aiohttp.ClientSession() as session:
+        t0 = time.perf_counter()
+        for k in range(a.announces):
+            sent[k] = time.perf_counter()
+            async with session.post(stack.app_url + "/api/announce-block",
+                                    json={"block": SEED_BASE + k, "bench_id": k}) as r:
+                await r.read()
+            await asyncio.sleep(1 / a.announce_rate)
+        deadline = time.perf_counter() + 30
+        while len(lat) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        wall = time.perf_counter() - t0
+
+    await asyncio.gather(*(c.disconnect() for c in clients), return_exceptions=True)
+    return {"mode": a.socket_mode,
+            "connected": len(clients), "requested": a.sockets,
+            "connect": summary(conn_lat, conn_wall),
+            "delivery": {**summary(lat, wall),
+                         "delivered_ratio": round(len(lat) / expected, 4) if expected else 0},
+            "app_rss_with_clients_mb": peak.get("rss_mb")}
+
+
+def _watcher(stack: Stack) -> dict:
+    a = stack.args
+    state = Path(stack.env["STATE_DIR"])
+    state.mkdir(parents=True, exist_ok=True)
+    mark = state / "last_height2.txt"
+    start = CHAIN_TIP - a.catchup
+    mark.write_text(str(start))
+    (state / "last_height.txt").write_text(str(start))   # index sink catches up too
+
+    proc = stack.script("ingest.py", POLL_SECS="3600")
+    t0 = time.perf_counter()
+    seen, stamps, last, peak = start, [], t0, {}
+    deadline = t0 + a.timeout
+    while seen < CHAIN_TIP and time.perf_counter() < deadline and proc.poll() is None:
+        time.sleep(0.02)
+        try:
+            h = int(mark.read_text() or seen)
+        except ValueError:                      # caught mid-write
+            continue
+        if h > seen:
+            now = time.perf_counter()
+            stamps += [(now - last) / (h - seen)] * (h - seen)
+            seen, last = h, now
+        peak = rss_mb(proc.pid) or peak
+    wall = time.perf_counter() - t0
+    proc.terminate()
+    proc.wait()
+    return {**summary(stamps, wall), "blocks": seen - start, "complete": seen == CHAIN_TIP,
+            "watcher_peak_rss_mb": peak.get("peak_rss_mb"),
+            "explorer_requests": dict(stack.explorer.hits)}
+
+
+def _looper(stack: Stack) -> dict:
+    a = stack.args
+    if importlib.util.find_spec("playwright") is None:
+        return {"skipped": "playwright not installed"}
+    import boto3
+    table = boto3.resource("dynamodb", region_name="us-east-1",
+                           endpoint_url=stack.ddb_url).Table("dynamicIndex1")
+
+    def rows() -> list[dict]:
+        out, kw = [], {}
+        while True:
+            resp = table.scan(**kw)
+            out += resp["Items"]
+            if "LastEvaluatedKey" not in resp:
+                return out
+            kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def intervals(items: list[dict]) -> list[float]:
+        ts = sorted(datetime.fromisoformat(it["lastProcessedAt"].rstrip("Z")).timestamp()
+                    for it in items if it.get("lastProcessedAt"))
+        return [b - a_ for a_, b in zip(ts, ts[1:])]
+
+    out = {}
+    for name, script, ok in (
+        ("auth",  "authLooperBackend.py",
+         lambda it: it.get("authParent", "").startswith("parent")),
+        ("index", "indexLooper.py",
+         lambda it: it.get("inscriptionID", "").startswith("insc")),
+    ):
+        t0 = time.perf_counter()
+        proc = stack.script(script)
+        peak = {}
+        while proc.poll() is None and time.perf_counter() - t0 < a.timeout:
+            peak = rss_mb(proc.pid) or peak
+            time.sleep(0.1)
+        if proc.poll() is None:
+            proc.kill()
+        wall = time.perf_counter() - t0
+        items = rows()
+        out[name] = {**summary(intervals(items), wall),
+                     "blocks_ok": sum(1 for it in items if ok(it)),
+                     "blocks": a.backfill,
+                     "looper_peak_rss_mb": peak.get("peak_rss_mb")}
+    return out
+
+
+def run_scenario(stack: Stack, name: str) -> dict:
+    calls0 = stack.ddb_calls()
+    if name == "mint":
+        res = asyncio.run(_mint(stack))
+    elif name == "sockets":
+        res = asyncio.run(_sockets(stack))
+    elif name == "watcher":
+        res = _watcher(stack)
+    else:
+        res = _looper(stack)
+    res["app_dynamodb_calls"] = stack.ddb_calls() - calls0
+    res["app_memory"] = rss_mb(stack.app.pid)
+    return res
+
+
+# ─── compare ────────────────────────────────────────
+def _flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            out.update(_flatten(v, f"{prefix}{k}."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[prefix + k] = v
+    return out
+
+
+def compare(old_path: str, new_path: str) -> None:
+    old, new = (json.loads(Path(p).read_text()) for p in (old_path, new_path))
+    print(f"{'metric':<52} {old.get('label', 'old'):>12} {new.get('label', 'new'):>12}   delta")
+    a, b = _flatten(old["scenarios"]), _flatten(new["scenarios"])
+    for key in sorted(a.keys() & b.keys()):
+        delta = f"{(b[key] - a[key]) / a[key] * 100:+.1f}%" if a[key] else ""
+        print(f"{key:<52} {a[key]:>12} {b[key]:>12}   {delta}")
+
+
+# ─── main ───────────────────────────────────────────
+def main() -> None:
+    ap = argparse.ArgumentParser(description="offline DynamicIndexer benchmarks")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--label", default=None, help="results file name (default: git commit)")
+    ap.add_argument("--out", default=str(BENCH_DIR / "results"))
+    ap.add_argument("--blocks", type=int, default=5_000, help="seeded mintBlocks rows")
+    ap.add_argument("--stampede", type=int, default=5_000, help="mint requests")
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--hot-blocks", type=int, default=20, help="blocks the stampede targets")
+    ap.add_argument("--sockets", type=int, default=5_000)
+    ap.add_argument("--socket-mode", choices=("legacy", "rooms"), default="legacy")
+    ap.add_argument("--announces", type=int, default=20)
+    ap.add_argument("--announce-rate", type=float, default=10, help="announces per second")
+    ap.add_argument("--catchup", type=int, default=500, help="watcher blocks behind tip")
+    ap.add_argument("--backfill", type=int, default=20, help="looper rows to resolve")
+    ap.add_argument("--explorer-latency-ms", type=float, default=50)
+    ap.add_argument("--timeout", type=float, default=900, help="per script scenario")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = ap.parse_args()
+
+    if args.compare:
+        return compare(*args.compare)
+
+    wanted = [s for s in args.scenarios.split(",") if s]
+    unknown = set(wanted) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))   # thousands of sockets
+
+    rev = git_rev()
+    result = {"label": args.label or rev["commit"], "git": rev,
+              "started_at": datetime.now(timezone.utc).isoformat(),
+              "host": {"python": platform.python_version(), "cpus": os.cpu_count(),
+                       "platform": platform.platform()},
+              "params": vars(args), "scenarios": {}}
+
+    with Stack(args) as stack:
+        print("bench ▶ app", stack.app_url, "| dynamo", stack.ddb_url,
+              "| explorer", stack.explorer.url, "| logs", stack.work)
+        for name in wanted:
+            print(f"bench ▶ {name} …", flush=True)
+            result["scenarios"][name] = res = run_scenario(stack, name)
+            print(json.dumps(res, indent=2))
+        result["app_memory"] = rss_mb(stack.app.pid)
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    path = out / f"{result['label']}.json"
+    path.write_text(json.dumps(result, indent=2))
+    print("bench ▶ wrote", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# ---------------------------------------------------
+# block_cache.py – process-local mirror of `mintBlocks`
+#   • loaded once (paginated scan), then write-through
+#   • pre-encoded JSON bodies + content ETags per block; lists are
+#     streamed from those (only the list ETag is cached)
+#   • periodic reconcile against DynamoDB
+# ---------------------------------------------------
+from __future__ import annotations
+
+import json, hashlib, threading
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+
+
+def clean_item(item: dict) -> dict:
+    """DynamoDB numbers arrive as Decimal → coerce to int for JSON."""
+    return {k: int(v) if isinstance(v, Decimal) else v for k, v in item.items()}
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True).encode()
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+class BlockCache:
+    """
+    In-memory copy of the mintBlocks table keyed by block number.
+
+    Writers feed it the item DynamoDB hands back (`ReturnValues="ALL_NEW"`)
+    via put(), or a raw diff via merge(); readers get ready-made JSON
+    bytes + ETags so a repeat poll costs neither a DynamoDB call nor a
+    json.dumps().
+    """
+
+    def __init__(self, table):
+        self._table  = table
+        self._lock   = threading.RLock()
+        self._items: dict[int, dict]  = {}
+        self._body:  dict[int, bytes] = {}
+        self._tag:   dict[int, str]   = {}
+        self._order: list[int]        = []      # sorted block numbers
+        self._list_tag: str | None = None      # digest of the full list
+        self._written: dict[int, int] = {}      # block → generation of its last write-through
+        self.generation = 0                     # bumps on every change
+        self.loaded = False
+
+    # ── loading / reconcile ───────────────────────────────
+    def _scan_all(self) -> dict[int, dict]:
+        items, kw = {}, {}
+        while True:
+            resp = self._table.scan(**kw)
+            for it in resp.get("Items", []):
+                it = clean_item(it)
+                items[int(it["block"])] = it
+            start = resp.get("LastEvaluatedKey")
+            if not start:
+                return items
+            kw["ExclusiveStartKey"] = start
+
+    def load(self) -> None:
+        """(Re)build the whole cache from a full paginated scan."""
+        with self._lock:
+            since = self.generation
+        fresh = self._scan_all()
+        with self._lock:
+            newer = {b: self._items[b] for b in self._newer(since) if b in self._items}
+            self._items, self._body, self._tag = {}, {}, {}
+            for blk, it in {**fresh, **newer}.items():
+                self._store(blk, it)
+            self._order = sorted(self._items)
+            self._list_tag = None
+            self.generation += 1
+            self.loaded = True
+
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load()
+
+    def reconcile(self) -> int:
+        """
+        Re-scan DynamoDB and patch whatever drifted (writes we never
+        saw: other processes, console edits, lost announces).
+        Blocks written through since the scan started are left alone –
+        the scan may have read them before that write landed.
+        Returns the number of blocks that changed.
+        """
+        with self._lock:
+            since = self.generation
+        fresh   = self._scan_all()
+        changed = 0
+        with self._lock:
+            newer = self._newer(since)
+            for blk in [b for b in self._items if b not in fresh and b not in newer]:
+                self._drop(blk); changed += 1
+            for blk, it in fresh.items():
+                if blk not in newer and self._items.get(blk) != it:
+                    self._put(blk, it); changed += 1
+            if changed:
+                self._list_tag = None
+                self.generation += 1
+        return changed
+
+    def _newer(self, since: int) -> set[int]:
+        """Blocks written through after generation `since`."""
+        return {b for b, g in self._written.items() if g > since}
+
+    # ── write-through ─────────────────────────────────────
+    def put(self, item: dict) -> dict:
+        """Replace a block with the authoritative item from DynamoDB."""
+        it = clean_item(item)
+        with self._lock:
+            self._put(int(it["block"]), it)
+            self._list_tag = None
+            self.generation += 1
+            self._written[int(it["block"])] = self.generation
+        return it
+
+    def merge(self, block: int, diff: dict) -> dict:
+        """Apply a partial diff (announce-block) on top of what we hold."""
+        with self._lock:
+            it = {**self._items.get(block, {}), **clean_item(diff), "block": block}
+            self._put(block, it)
+            self._list_tag = None
+            self.generation += 1
+            self._written[block] = self.generation
+        return it
+
+    def _put(self, blk: int, it: dict) -> None:
+        if blk not in self._items:
+            insort(self._order, blk)
+        self._store(blk, it)
+
+    def _store(self, blk: int, it: dict) -> None:
+        body = _encode(it)
+        self._items[blk] = it
+        self._body[blk]  = body
+        self._tag[blk]   = _etag(body)
+
+    def _drop(self, blk: int) -> None:
+        self._items.pop(blk, None)
+        self._body.pop(blk, None)
+        self._tag.pop(blk, None)
+        i = bisect_left(self._order, blk)
+        if i < len(self._order) and self._order[i] == blk:
+            del self._order[i]
+
+    # ── reads ─────────────────────────────────────────────
+    def get(self, block: int) -> dict | None:
+        it = self._items.get(block)
+        return dict(it) if it is not None else None
+
+    def entry(self, block: int) -> tuple[bytes, str] | None:
+        """(json_body, etag) for one block, or None if unknown."""
+        with self._lock:
+            if block not in self._body:
+                return None
+            return self._body[block], self._tag[block]
+
+    def listing(self) -> tuple[list[int], str]:
+        """
+        (block numbers, tag) for the full sorted list: callers stream the
+        per-block bodies (body()) instead of one joined copy of the table.
+        The tag is digest() of every block, recomputed only after a change.
+        """
+        with self._lock:
+            if self._list_tag is None:
+                self._list_tag = self.digest(self._order)
+            return list(self._order), self._list_tag
+
+    def select(
+        self,
+        lo: int | None = None,
+        hi: int | None = None,
+        statuses: set[str] | None = None,
+        after: int | None = None,
+        limit: int | None = None,
+    ) -> tuple[list[int], int | None]:
+        """
+        Block numbers in [lo, hi] (optionally only `statuses`, starting
+        after cursor `after`), capped at `limit`.
+        Returns (blocks, next_cursor) – next_cursor is None on the last page.
+        """
+        with self._lock:
+            start = lo if lo is not None else self._order[0] if self._order else 0
+            if after is not None:
+                start = max(start, after + 1)
+            i = bisect_left(self._order, start)
+            j = bisect_right(self._order, hi) if hi is not None else len(self._order)
+            out: list[int] = []
+            for k in range(i, j):
+                blk = self._order[k]
+                if statuses and self._items[blk].get("status") not in statuses:
+                    continue
+                if limit is not None and len(out) == limit:
+                    return out, out[-1]         # only now: `blk` proves there is a next page
+                out.append(blk)
+            return out, None                    # an exactly-full last page gets no cursor
+
+    def digest(self, blocks: list[int], salt: bytes = b"") -> str:
+        """
+        Validator for a selection: hash of the blocks' content ETags, so
+        every process holding the same rows agrees on it (unlike generation).
+        """
+        h = hashlib.blake2b(salt, digest_size=8)
+        with self._lock:
+            for blk in blocks:
+                h.update(self._tag.get(blk, "-").encode())
+        return h.hexdigest()
+
+    def body(self, block: int, fields: set[str] | None = None) -> bytes | None:
+        """Encoded JSON for one block, optionally projected to `fields`."""
+        with self._lock:
+            if fields is None:
+                return self._body.get(block)
+            it = self._items.get(block)
+        if it is None:
+            return None
+        return _encode({k: v for k, v in it.items() if k in fields or k == "block"})
+
+    def find(self, pred) -> list[dict]:
+        """All cached items matching pred(item), in block order."""
+        with self._lock:
+            return [dict(self._items[b]) for b in self._order if pred(self._items[b])]
@@ -0,0 +1,80 @@
+# ---------------------------------------------------
+# bulk_writes.py – per-block updates in TransactWriteItems chunks
+#   • TRANSACT_MAX ops per transaction (DynamoDB's cap)
+#   • a cancelled transaction is mapped back per op through
+#     CancellationReasons; the ops that were fine are retried
+#   • every op gets a result, whatever DynamoDB hands back
+# ---------------------------------------------------
+from __future__ import annotations
+
+import time
+
+from botocore.exceptions import ClientError
+
+TRANSACT_MAX = 100                           # DynamoDB TransactWriteItems cap
+ATTEMPTS     = 4                             # transactions per chunk before giving up
+
+
+def transact_updates(client, table: str, ops: list[dict],
+                     sleep=time.sleep) -> dict[int, str]:
+    """
+    ops: [{"block", "update", "names", "values", "cond" (optional)}]
+    Returns {block: "ok" | "conflict" | "error:<code>"} for every op.
+
+    A transaction is all-or-nothing, so when one is cancelled the blocks
+    whose condition failed are marked "conflict" from CancellationReasons
+    and the rest of the chunk is retried without them. Reasons that
+    don't line up with the ops (missing, or a different count) can't be
+    attributed, so the whole chunk is retried; ops still pending after
+    ATTEMPTS transactions end up "error:TransactionCanceled".
+    """
+    results: dict[int, str] = {}
+    for i in range(0, len(ops), TRANSACT_MAX):
+        pending = ops[i:i + TRANSACT_MAX]
+        for attempt in range(ATTEMPTS):
+            if not pending:
+                break
+            items = []
+            for op in pending:
+                upd = {
+                    "TableName": table,
+                    "Key": {"block": op["block"]},          # the resource's client serializes
+                    "UpdateExpression": op["update"],
+                    "ExpressionAttributeNames": op["names"],
+                    "ExpressionAttributeValues": op["values"],
+                }
+                if op.get("cond"):
+                    upd["ConditionExpression"] = op["cond"]
+                items.append({"Update": upd})
+            try:
+                client.transact_write_items(TransactItems=items)
+            except client.exceptions.TransactionCanceledException as exc:
+                reasons = exc.response.get("CancellationReasons") or []
+                if len(reasons) != len(pending):     # can't tell which op failed
+                    reasons = [{"Code": "None"}] * len(pending)
+                retry = []
+                for op, r in zip(pending, reasons):
+                    code = r.get("Code", "None")
+                    if code == "ConditionalCheckFailed":
+                        results[op["block"]] = "conflict"
+                    elif code == "None":
+                        retry.append(op)
+                    else:                        # throttled / conflicting txn
+                        results[op["block"]] = f"error:{code}"
+                        retry.append(op)
+                if len(retry) == len(pending):   # no progress → back off
+                    sleep(0.1 * 2 ** attempt)
+                pending = retry
+                continue
+            except ClientError as exc:
+                code = exc.response.get("Error", {}).get("Code", "ClientError")
+                for op in pending:
+                    results[op["block"]] = f"error:{code}"
+                pending = []
+                break
+            for op in pending:
+                results[op["block"]] = "ok"
+            pending = []
+        for op in pending:                       # retries exhausted
+            results.setdefault(op["block"], "error:TransactionCanceled")
+    return results
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------
+# bus.py – broadcast bus shared by all API workers
+#   • local://          single process (default)
+#   • unix:///path.sock one-box hub, run `python bus.py serve unix:///path.sock`
+#     (each client gets its own outbound queue + writer thread; one
+#     BUS_HUB_BACKLOG lines behind is dropped and reconnects)
+#   • redis://host/db   Redis (or anything speaking PUBLISH/SUBSCRIBE)
+#
+# Every message is delivered to every worker – the publisher included –
+# stamped with a bus-wide sequence number, so each worker can fan out to
+# its own sockets and keep its own caches coherent.
+# ---------------------------------------------------
+from __future__ import annotations
+
+import json, logging, os, queue, socket, socketserver, sys, threading, time, uuid
+from urllib.parse import urlparse
+
+log = logging.getLogger(__name__)
+
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LocalBus:
+    """In-process bus: publish() calls the handler synchronously."""
+
+    def __init__(self):
+        self.origin  = ORIGIN
+        self.epoch   = uuid.uuid4().hex[:12]
+        self._seq    = 0
+        self._lock   = threading.Lock()
+        self._handler = None
+
+    def start(self, handler, spawn=None) -> None:
+        self._handler = handler
+
+    def publish(self, topic: str, data: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            msg = {"epoch": self.epoch, "seq": self._seq,
+                   "origin": self.origin, "topic": topic, "data": data}
+        if self._handler:
+            self._handler(msg)
+
+
+class UnixBus:
+    """
+    Client of the `bus.py serve` hub. The hub stamps epoch + seq, so
+    sequence numbers are shared by every worker on the box.
+
+    If the hub is unreachable, publish() still delivers locally under an
+    "offline-…" epoch; clients resuming across that gap are told to resync.
+    """
+
+    def __init__(self, path: str):
+        self.origin  = ORIGIN
+        self.epoch   = "offline-" + uuid.uuid4().hex[:6]
+        self._path   = path
+        self._sock: socket.socket | None = None
+        self._wlock  = threading.Lock()
+        self._lock   = threading.Lock()           # guards _seq (offline numbering)
+        self._seq    = 0
+        self._handler = None
+
+    def start(self, handler, spawn=None) -> None:
+        self._handler = handler
+        (spawn or _thread)(self._reader)
+
+    def _connect(self) -> socket.socket:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.connect(self._path)
+        return s
+
+    def _reader(self) -> None:
+        while True:
+            try:
+                sock = self._connect()
+                rfile = sock.makefile("rb")
+                hello = json.loads(rfile.readline())
+                self.epoch, self._sock = hello["epoch"], sock
+                log.info("bus: connected to hub %s (epoch %s)", self._path, self.epoch)
+                for line in rfile:
+                    _deliver(self._handler, json.loads(line))
+            except Exception as exc:
+                log.warning("bus: hub connection lost: %s", exc)
+            self._sock = None
+            self.epoch = "offline-" + uuid.uuid4().hex[:6]
+            time.sleep(1)
+
+    def publish(self, topic: str, data: dict) -> None:
+        msg = {"origin": self.origin, "topic": topic, "data": data}
+        sock = self._sock
+        if sock is not None:
+            try:
+                with self._wlock:
+                    sock.sendall(json.dumps(msg).encode() + b"\n")
+                return
+            except OSError as exc:
+                log.warning("bus: publish failed, delivering locally: %s", exc)
+        with self._lock:
+            self._seq += 1
+            msg.update(epoch=self.epoch, seq=self._seq)
+        self._handler(msg)
+
+
+class RedisBus:
+    """
+    PUBLISH/SUBSCRIBE on one channel; seq comes from INCR in the same
+    Lua call as the PUBLISH, so it is ordered and gap-free bus-wide.
+    """
+
+    _PUBLISH = """
+        local seq = redis.call('INCR', KEYS[1])
+        redis.call('PUBLISH', KEYS[2], seq .. '|' .. ARGV[1])
+        return seq
+    """
+
+    def __init__(self, url: str, channel: str = "dynamicIndexer"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("BUS_URL=redis://… needs `pip install redis`") from exc
+        self.origin   = ORIGIN
+        self._r       = redis.Redis.from_url(url)
+        self._chan    = channel
+        self._seq_key = f"{channel}:seq"
+        self._script  = self._r.register_script(self._PUBLISH)
+        # epoch changes only if Redis lost the counter (flush / restart w/o AOF)
+        self._r.set(f"{channel}:epoch", uuid.uuid4().hex[:12], nx=True)
+        self.epoch    = self._r.get(f"{channel}:epoch").decode()
+        self._handler = None
+
+    def start(self, handler, spawn=None) -> None:
+        self._handler = handler
+        (spawn or _thread)(self._reader)
+
+    def _reader(self) -> None:
+        while True:
+            try:
+                ps = self._r.pubsub(ignore_subscribe_messages=True)
+                ps.subscribe(self._chan)
+                for raw in ps.listen():
+                    seq, _, body = raw["data"].decode().partition("|")
+                    _deliver(self._handler,
+                             {**json.loads(body), "epoch": self.epoch, "seq": int(seq)})
+            except Exception as exc:
+                log.warning("bus: redis subscription lost: %s", exc)
+                time.sleep(1)
+
+    def publish(self, topic: str, data: dict) -> None:
+        body = json.dumps({"origin": self.origin, "topic": topic, "data": data})
+        self._script(keys=[self._seq_key, self._chan], args=[body])
+
+
+def _deliver(handler, msg: dict) -> None:
+    """A handler bug must not tear down the subscription."""
+    try:
+        handler(msg)
+    except Exception:
+        log.exception("bus: handler failed for %s #%s", msg.get("topic"), msg.get("seq"))
+
+
+def _thread(fn) -> None:
+    threading.Thread(target=fn, daemon=True).start()
+
+
+def make_bus(url: str | None):
+    """Pick a backend from BUS_URL (empty → in-process)."""
+    u = urlparse(url or "local://")
+    if u.scheme == "local":
+        return LocalBus()
+    if u.scheme == "unix":
+        return UnixBus(u.path)
+    if u.scheme in ("redis", "rediss"):
+        return RedisBus(url)
+    raise ValueError(f"unsupported BUS_URL scheme: {u.scheme}")
+
+
+# ─── one-box hub ────────────────────────────────────
+HUB_BACKLOG = int(os.getenv("BUS_HUB_BACKLOG", 10_000))   # queued lines before a client is dropped
+
+
+class _Client:
+    """One worker's connection; its own writer thread drains `out`."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.out: queue.Queue = queue.Queue(HUB_BACKLOG)
+        _thread(self._writer)
+
+    def send(self, line: bytes) -> bool:
+        """Queue without blocking; False if the client is too far behind."""
+        try:
+            self.out.put_nowait(line)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self) -> None:
+        try:
+            self.out.put_nowait(None)
+        except queue.Full:                      # writer is stuck: unblock it
+            self.sock.shutdown(socket.SHUT_RDWR)
+
+    def _writer(self) -> None:
+        try:
+            while (line := self.out.get()) is not None:
+                self.sock.sendall(line)
+        except OSError:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # ends the handler's read loop too
+        except OSError:
+            pass
+
+
+class _Hub(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        self.epoch   = uuid.uuid4().hex[:12]
+        self.seq     = 0
+        self.clients: set[_Client] = set()
+        self.lock    = threading.Lock()
+        super().__init__(path, _HubHandler)
+
+    def fan(self, line: bytes) -> None:
+        """Stamp and queue for every client; a slow one is dropped, never waited on."""
+        with self.lock:                         # one lock → one global order
+            self.seq += 1
+            msg = json.loads(line)
+            msg.update(epoch=self.epoch, seq=self.seq)
+            out = json.dumps(msg).encode() + b"\n"
+            for c in list(self.clients):
+                if not c.send(out):
+                    log.warning("bus hub: dropping a client %d messages behind", HUB_BACKLOG)
+                    self.clients.discard(c)
+                    c.close()
+
+
+class _HubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        hub: _Hub = self.server
+        client = _Client(self.request)
+        with hub.lock:                          # hello + join atomically: no gap
+            client.send(json.dumps({"epoch": hub.epoch}).encode() + b"\n")
+            hub.clients.add(client)
+        try:
+            for line in self.rfile:
+                hub.fan(line)
+        except OSError:
+            pass
+        finally:
+            with hub.lock:
+                hub.clients.discard(client)
+            client.close()
+
+
+def serve(url: str) -> None:
+    path = urlparse(url).path
+    if os.path.exists(path):
+        os.unlink(path)
+    with _Hub(path) as hub:
+        os.chmod(path, 0o660)
+        print("bus hub ▶ listening on", path, "epoch", hub.epoch)
+        hub.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "serve":
+        sys.exit("usage: bus.py serve unix:///path/to/bus.sock")
+    serve(sys.argv[2])
@@ -0,0 +1,177 @@
+# ---------------------------------------------------
+# fanout.py – room-scoped, coalesced Web-Socket diffs
+#   • rooms per block range ("blocks:<n // span>") and status
+#   • diffs merged per block over a short window, then one
+#     `block_updates` frame per room
+#   • sockets that never subscribe keep getting the legacy
+#     one-frame-per-diff `block_update`
+#   • every diff carries a bus sequence number; a bounded ring
+#     buffer lets reconnecting clients `resume` from it
+# ---------------------------------------------------
+from __future__ import annotations
+
+import threading
+from collections import defaultdict, deque
+
+LEGACY_ROOM = "legacy"
+ALL_ROOM    = "all"
+MAX_ROOMS   = 1_000                         # per subscribe call
+
+
+def range_room(block: int, span: int) -> str:
+    return f"blocks:{block // span}"
+
+
+def status_room(status: str) -> str:
+    return f"status:{status}"
+
+
+class Fanout:
+    """
+    deliver() is cheap and never emits the batched frame itself; the
+    first diff in a quiet period schedules a flush `window` seconds out
+    and everything that lands before then rides along in it.
+
+    A socket in several matching rooms gets the diff once per room –
+    clients should treat `block_updates` entries as idempotent merges.
+    """
+
+    def __init__(self, socketio, span: int = 1_000, window: float = 0.05,
+                 log_size: int = 10_000, namespace: str = "/", on_emit=None):
+        self._sio       = socketio
+        self._on_emit   = on_emit or (lambda event, n: None)
+        self.span       = span
+        self.window     = window
+        self._ns        = namespace
+        self._lock      = threading.Lock()
+        self.epoch      = ""                      # set by the first bus delivery
+        self.seq        = 0
+        self._log: deque[tuple[int, dict, frozenset]] = deque(maxlen=log_size)
+        self._pending: dict[int, dict]     = {}
+        self._rooms:   dict[int, set[str]] = {}
+        self._status:  dict[int, str]      = {}   # last status we fanned out
+        self._scheduled = False
+
+    # ── membership ────────────────────────────────────────
+    def _rooms_for_spec(self, spec: dict) -> list[str]:
+        rooms: list[str] = []
+        if spec.get("all"):
+            rooms.append(ALL_ROOM)
+        lo, hi = spec.get("from_block"), spec.get("to_block")
+        if lo is not None or hi is not None:
+            lo = int(lo if lo is not None else hi)
+            hi = int(hi if hi is not None else lo)
+            if hi < lo:
+                raise ValueError("to_block < from_block")
+            first, last = lo // self.span, hi // self.span
+            if last - first + 1 > MAX_ROOMS:
+                raise ValueError("block range too wide")
+            rooms += [f"blocks:{b}" for b in range(first, last + 1)]
+        rooms += [status_room(s) for s in spec.get("statuses") or ()]
+        return rooms
+
+    def subscribe(self, sid: str, spec: dict) -> list[str]:
+        """Join the rooms described by spec; leaves the legacy stream."""
+        rooms = self._rooms_for_spec(spec)
+        if not rooms:
+            raise ValueError("empty subscription")
+        srv = self._sio.server
+        for room in rooms:
+            srv.enter_room(sid, room, namespace=self._ns)
+        srv.leave_room(sid, LEGACY_ROOM, namespace=self._ns)
+        return rooms
+
+    def unsubscribe(self, sid: str, spec: dict) -> list[str]:
+        rooms = self._rooms_for_spec(spec)
+        for room in rooms:
+            self._sio.server.leave_room(sid, room, namespace=self._ns)
+        return rooms
+
+    def seed(self, items) -> None:
+        """Remember current statuses so the first change reaches the old room."""
+        with self._lock:
+            for it in items:
+                if it.get("status"):
+                    self._status[int(it["block"])] = it["status"]
+
+    # ── publishing ────────────────────────────────────────
+    def deliver(self, epoch: str, seq: int, diffs: list[dict]) -> None:
+        """
+        Fan out one bus message – a list of diffs sharing one sequence
+        number. Each diff must already be JSON-safe and carry an int "block".
+        """
+        with self._lock:
+            if epoch != self.epoch:             # bus restarted: old offsets are void
+                self.epoch = epoch
+                self._log.clear()
+            self.seq = seq
+            stamped = [{**d, "seq": seq} for d in diffs]
+            for diff in stamped:
+                self._stage(diff)
+            schedule, self._scheduled = not self._scheduled, True
+
+        for diff in stamped:
+            self._sio.emit("block_update", diff, to=LEGACY_ROOM, namespace=self._ns)
+        self._on_emit("block_update", len(stamped))
+        if schedule:
+            self._sio.start_background_task(self._flush_later)
+
+    def _stage(self, diff: dict) -> None:
+        """Log + queue one diff for the next flush (caller holds the lock)."""
+        block = diff["block"]
+        rooms = {ALL_ROOM, range_room(block, self.span)}
+        old = self._status.get(block)
+        new = diff.get("status") or old
+        if old and old != new:
+            rooms.add(status_room(old))         # so "available" views drop it
+        if new:
+            rooms.add(status_room(new))
+            self._status[block] = new
+        self._log.append((diff["seq"], diff, frozenset(rooms)))
+        self._rooms.setdefault(block, set()).update(rooms)
+        prev = self._pending.get(block, {})
+        if "status" in diff and prev.get("status") not in (None, diff["status"]):
+            prev = {}                           # new state supersedes the old diff
+        self._pending[block] = {**prev, **diff}
+
+    def resume(self, sid: str, epoch: str | None, seq: int | None,
+               spec: dict | None = None) -> dict:
+        """
+        Catch a reconnecting socket up from `seq`.
+
+        If spec names rooms the socket is (re)subscribed and only diffs
+        for those rooms are replayed. When the client's seq is from
+        another process (epoch mismatch) or older than the ring buffer,
+        the reply says `resync` and the client should refetch
+        /api/blocks, whose X-Epoch / X-Seq headers give the new offset.
+        """
+        rooms = set(self.subscribe(sid, spec)) if spec else None
+        with self._lock:
+            head   = self.seq
+            oldest = self._log[0][0] if self._log else head + 1
+            if epoch != self.epoch or seq is None or seq > head or seq < oldest - 1:
+                return {"resync": True, "epoch": self.epoch, "seq": head}
+            missed = [d for s, d, r in self._log
+                      if s > seq and (rooms is None or rooms & r)]
+        return {"epoch": self.epoch, "seq": head, "updates": missed}
+
+    def _flush_later(self) -> None:
+        self._sio.sleep(self.window)
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, rooms = self._pending, self._rooms
+            self._pending, self._rooms = {}, {}
+            self._scheduled = False
+        by_room: dict[str, list[dict]] = defaultdict(list)
+        for block in sorted(pending):
+            for room in rooms[block]:
+                by_room[room].append(pending[block])
+        for room, updates in by_room.items():
+            self._sio.emit("block_updates",
+                           {"epoch": self.epoch,
+                            "seq": max(u["seq"] for u in updates),
+                            "updates": updates},
+                           to=room, namespace=self._ns)
+        self._on_emit("block_updates", len(by_room))
@@ -0,0 +1,22 @@
+# ---------------------------------------------------
+# gunicorn.conf.py – multi-worker API
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# Workers share diffs + cache writes through BUS_URL (see bus.py), so
+# set it to the hub socket or Redis whenever workers > 1:
+#   python bus.py serve unix:///run/dynamicIndexer/bus.sock
+#   BUS_URL=unix:///run/dynamicIndexer/bus.sock
+#
+# Socket.IO long-polling needs sticky sessions across workers, and a
+# client's handshake + polls to one port would land on different
+# workers. So this runs ONE worker unless WEB_CONCURRENCY is set, which
+# only makes sense once clients are pinned to
+# `transports: ["websocket"]` or nginx `ip_hash` fronts one port per
+# worker.
+# ---------------------------------------------------
+import os
+
+bind         = os.getenv("BIND", "0.0.0.0:8080")
+worker_class = "eventlet"
+workers      = int(os.getenv("WEB_CONCURRENCY", 1))
+timeout      = 120
@@ -0,0 +1,72 @@
+# ---------------------------------------------------
+# hold_scheduler.py – fire hold expiries on time
+#   • min-heap keyed on reserved_until (epoch ms)
+#   • one sleeper wakes for the earliest deadline only
+# ---------------------------------------------------
+from __future__ import annotations
+
+import heapq, logging, threading, time
+
+log = logging.getLogger(__name__)
+
+_now_ms = lambda: int(time.time() * 1000)
+
+
+class HoldScheduler:
+    """
+    Calls on_expire(block, reserved_until) once each hold runs out.
+
+    Entries are never removed early: a hold that was released, minted
+    or re-granted in the meantime still fires, and on_expire is expected
+    to make its write conditional on the exact `reserved_until` it was
+    scheduled with. That keeps schedule() O(log n) and lock-light.
+
+    threading primitives are green under eventlet.monkey_patch(), so
+    run() is safe to hand to socketio.start_background_task().
+    """
+
+    def __init__(self, on_expire):
+        self._on_expire = on_expire
+        self._heap: list[tuple[int, int]] = []
+        self._queued: set[tuple[int, int]] = set()
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, block: int, until_ms: int) -> None:
+        entry = (int(until_ms), int(block))
+        with self._cond:
+            if entry in self._queued:
+                return
+            self._queued.add(entry)
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] == entry:          # new earliest deadline
+                self._cond.notify()
+
+    def seed(self, items) -> int:
+        """Schedule every timed hold in an iterable of block items."""
+        n = 0
+        for it in items:
+            if it.get("status") == "reserved" and it.get("reserved_until"):
+                self.schedule(int(it["block"]), int(it["reserved_until"]))
+                n += 1
+        return n
+
+    def run(self) -> None:
+        """Blocking loop: sleep until the head deadline, fire, repeat."""
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                until, block = self._heap[0]
+                delay = (until - _now_ms()) / 1000
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue                    # re-check: head may have changed
+                heapq.heappop(self._heap)
+                self._queued.discard((until, block))
+            try:
+                self._on_expire(block, until)
+            except Exception as exc:
+                log.warning("hold expiry for block %s failed: %s", block, exc)
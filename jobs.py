@@ -0,0 +1,293 @@
+# ---------------------------------------------------
+# jobs.py – warm job runner for the looper scripts
+#   • N long-lived `scripts/job_worker.py` processes with
+#     boto3 / Playwright already imported
+#   • job state lives in one SQLite file under STATE_DIR, shared by
+#     every API worker: submit() dedups (one queued run per kind)
+#     and /api/jobs reads the same rows in every process
+#   • one API worker at a time holds the runner flock and is the only
+#     one that spawns job workers and dispatches; the others just
+#     queue. If it dies, another takes the lock over
+#   • kinds that share a stage never run side by side (CONFLICTS),
+#     and the worker's stage flocks keep the timer out too
+#   • progress per job: blocks per stage, blocks_done / rate count
+#     blocks through the job's last stage (index, for "both")
+#
+# Env:
+#   JOBS_DB  path (default STATE_DIR/jobs.sqlite)
+# ---------------------------------------------------
+from __future__ import annotations
+
+import fcntl, json, logging, os, sqlite3, subprocess, sys, threading, time, uuid
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+STATE_DIR   = Path(os.getenv("STATE_DIR", Path(__file__).parent / "scripts" / "state"))
+DB_PATH     = os.getenv("JOBS_DB", str(STATE_DIR / "jobs.sqlite"))
+KINDS       = ("auth", "index", "both")
+CONFLICTS   = {                              # kinds that share a looper / checkpoint
+    "auth" : {"auth", "both"},
+    "index": {"index", "both"},
+    "both" : {"auth", "index", "both"},
+}
+FINAL_STAGE = {"auth": "auth", "index": "index", "both": "index"}   # what blocks_done counts
+KEEP_JOBS   = 200                            # finished jobs kept for GET /api/jobs
+ELECT_SECS  = 2.0                            # runner-lock retry + queue poll interval
+
+
+class _JobStore:
+    """Job rows shared by the API workers: (id, kind, state, queued_at, doc JSON)."""
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id         TEXT PRIMARY KEY,
+                kind       TEXT NOT NULL,
+                state      TEXT NOT NULL,
+                queued_at  REAL NOT NULL,
+                doc        TEXT NOT NULL
+            )""")
+        self._lock = threading.Lock()
+
+    def _txn(self, fn):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn()
+                self._db.execute("COMMIT")
+                return out
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def submit(self, job: dict) -> tuple[dict, bool]:
+        """Insert `job` unless one of its kind is already queued (then return that)."""
+        def run():
+            row = self._db.execute("SELECT doc FROM jobs WHERE kind=? AND state='queued' "
+                                   "ORDER BY queued_at LIMIT 1", (job["kind"],)).fetchone()
+            if row:
+                return json.loads(row[0]), True
+            self._db.execute("INSERT INTO jobs (id, kind, state, queued_at, doc) "
+                             "VALUES (?, ?, ?, ?, ?)", (job["id"], job["kind"], job["state"],
+                                                        job["queued_at"], json.dumps(job)))
+            self._db.execute("DELETE FROM jobs WHERE state NOT IN ('queued', 'running') AND "
+                             "id NOT IN (SELECT id FROM jobs ORDER BY queued_at DESC LIMIT ?)",
+                             (KEEP_JOBS,))
+            return job, False
+        return self._txn(run)
+
+    def claim(self) -> dict | None:
+        """Oldest queued job that conflicts with nothing running; marked running."""
+        def run():
+            busy = {r[0] for r in self._db.execute(
+                "SELECT kind FROM jobs WHERE state='running'")}
+            for (doc,) in self._db.execute(
+                    "SELECT doc FROM jobs WHERE state='queued' ORDER BY queued_at").fetchall():
+                job = json.loads(doc)
+                if not CONFLICTS[job["kind"]] & busy:
+                    job.update(state="running", started_at=time.time())
+                    self._save(job)
+                    return job
+            return None
+        return self._txn(run)
+
+    def _save(self, job: dict) -> None:
+        self._db.execute("UPDATE jobs SET state=?, doc=? WHERE id=?",
+                         (job["state"], json.dumps(job), job["id"]))
+
+    def save(self, job: dict) -> None:
+        with self._lock:
+            self._save(job)
+
+    def fail_running(self, error: str) -> list[dict]:
+        """Jobs a dead runner left 'running' → failed (called by a new runner)."""
+        def run():
+            out = []
+            for (doc,) in self._db.execute(
+                    "SELECT doc FROM jobs WHERE state='running'").fetchall():
+                job = json.loads(doc)
+                job.update(state="failed", finished_at=time.time(), error=error)
+                self._save(job)
+                out.append(job)
+            return out
+        return self._txn(run)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT doc FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            return [json.loads(r[0]) for r in self._db.execute(
+                "SELECT doc FROM jobs ORDER BY queued_at DESC LIMIT ?", (KEEP_JOBS,))]
+
+
+class _Worker:
+    def __init__(self, script: Path):
+        self.proc = subprocess.Popen(
+            [sys.executable, str(script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=str(script.parent),
+            text=True,
+            bufsize=1,
+        )
+        self.job: dict | None = None
+
+
+class JobRunner:
+    """
+    submit(kind) never refuses: if a run of that kind is already queued
+    (by any API worker) the caller gets that job back; if one is only
+    running, a single follow-up run is queued behind it (it will see rows
+    written since).
+
+    start() begins competing for the runner lock; only the holder runs
+    jobs. on_event(job) is called on every state change and on progress
+    (throttled to `progress_every` seconds per job) – app.py publishes it
+    on the bus, and peer() on the runner picks new submissions up at once.
+    """
+
+    def __init__(self, script: Path, size: int = 2, spawn=None,
+                 on_event=None, progress_every: float = 1.0,
+                 db_path: str | Path = DB_PATH):
+        self._script  = script
+        self._size    = size
+        self._spawn   = spawn or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self._on_event = on_event or (lambda job: None)
+        self._every   = progress_every
+        self._lock    = threading.RLock()
+        self._store   = _JobStore(db_path)
+        self._lock_path = Path(db_path).with_suffix(".runner.lock")
+        self._lock_fd: int | None = None
+        self._workers: list[_Worker] = []
+
+    # ── public ────────────────────────────────────────────
+    def start(self) -> None:
+        self._spawn(self._elect)
+
+    @property
+    def leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def submit(self, kind: str) -> tuple[dict, bool]:
+        """Returns (job, deduplicated)."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown job kind {kind}")
+        job = {
+            "id": uuid.uuid4().hex[:12], "kind": kind, "state": "queued",
+            "queued_at": time.time(), "started_at": None, "finished_at": None,
+            "blocks_done": 0, "done_by_stage": {}, "stage": None, "current_block": None,
+            "rate": 0.0, "error": None,
+        }
+        job, dedup = self._store.submit(job)
+        if not dedup:
+            self._emit(job)
+            self._dispatch()
+        return job, dedup
+
+    def get(self, job_id: str) -> dict | None:
+        return self._store.get(job_id)
+
+    def recent(self) -> list[dict]:
+        return self._store.recent()
+
+    def peer(self, job: dict) -> None:
+        """A job event from another API worker: the runner starts new submissions now."""
+        if job.get("state") == "queued":
+            self._dispatch()
+
+    # ── internals ─────────────────────────────────────────
+    def _elect(self) -> None:
+        """Take the runner lock when it is free; while held, poll the queue."""
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            if not self.leader:
+                fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                else:
+                    self._lock_fd = fd             # held for the life of the process
+                    log.info("job runner: this worker (%s) runs the jobs", os.getpid())
+                    for job in self._store.fail_running("runner exited"):
+                        self._emit(job)
+            self._dispatch()
+            time.sleep(ELECT_SECS)
+
+    def _emit(self, job: dict) -> None:
+        try:
+            self._on_event(dict(job))
+        except Exception as exc:
+            log.warning("job event hook failed: %s", exc)
+
+    def _dispatch(self) -> None:
+        if not self.leader:
+            return
+        with self._lock:
+            while True:
+                idle = next((w for w in self._workers if w.job is None), None)
+                if idle is None and len(self._workers) < self._size:
+                    idle = _Worker(self._script)
+                    self._workers.append(idle)
+                    self._spawn(lambda w=idle: self._read(w))
+                if idle is None:
+                    return
+                job = self._store.claim()
+                if job is None:                     # nothing queued, or only conflicting runs
+                    return
+                idle.job = job
+                idle.proc.stdin.write(json.dumps({"id": job["id"], "kind": job["kind"]}) + "\n")
+                idle.proc.stdin.flush()
+                self._emit(job)
+
+    def _read(self, w: _Worker) -> None:
+        last_emit = 0.0
+        for line in w.proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                job = w.job
+                if job is None or msg.get("id") != job["id"]:
+                    continue
+                if msg["event"] == "progress":
+                    stage = job["stage"] = msg.get("stage")
+                    job["done_by_stage"][stage] = job["done_by_stage"].get(stage, 0) + 1
+                    # a "both" run reports every block twice (auth, then index)
+                    job["blocks_done"] = job["done_by_stage"].get(FINAL_STAGE[job["kind"]], 0)
+                    job["current_block"] = msg.get("block")
+                    elapsed = max(time.time() - job["started_at"], 1e-6)
+                    job["rate"] = round(job["blocks_done"] / elapsed, 3)
+                    if time.time() - last_emit < self._every:
+                        continue
+                    last_emit = time.time()
+                else:                               # done | failed
+                    job.update(state=msg["event"], finished_at=time.time(),
+                               error=msg.get("error"))
+                    w.job = None
+                self._store.save(job)
+            self._emit(job)
+            if msg["event"] != "progress":
+                self._dispatch()
+
+        # worker died – fail its job, drop it, let _dispatch start a fresh one
+        log.warning("job worker %s exited (%s)", w.proc.pid, w.proc.wait())
+        with self._lock:
+            self._workers.remove(w)
+            job, w.job = w.job, None
+            if job:
+                job.update(state="failed", finished_at=time.time(),
+                           error="worker exited")
+                self._store.save(job)
+        if job:
+            self._emit(job)
+        self._dispatch()
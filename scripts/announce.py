@@ -0,0 +1,169 @@
+# --------------------------------------------------------------
+# announce.py – non-blocking, at-least-once announces to the API
+#   • publish(diff) appends to an in-memory queue + a spool file
+#     under STATE_DIR and returns at once
+#   • a sender thread POSTs whatever is queued, in order, as one
+#     array to /api/announce-blocks (one bus message, one
+#     broadcast), backing off while the API is down
+#   • the spool is replayed on start, so a restart of either side
+#     loses nothing; a diff can arrive twice, never not at all
+#     (diffs are idempotent merges)
+#   • bounded: past ANNOUNCE_MAX_PENDING the oldest are dropped
+#   • traced diffs get their `sent` hop stamped per POST attempt
+#
+# Env:
+#   ANNOUNCE_URL           batch endpoint (default http://127.0.0.1:8080/api/announce-blocks)
+#   ANNOUNCE_MAX_PENDING   queued diffs kept (default 10000)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import atexit, json, logging, os, threading, time
+from pathlib import Path
+
+import block_trace
+import http_client as http
+import metrics
+from checkpoint import atomic_write
+
+log = logging.getLogger("announce")
+
+STATE_DIR    = Path(os.getenv("STATE_DIR", Path(__file__).parent / "state"))
+ANNOUNCE_URL = os.getenv("ANNOUNCE_URL", "http://127.0.0.1:8080/api/announce-blocks")
+MAX_PENDING  = int(os.getenv("ANNOUNCE_MAX_PENDING", 10_000))
+BATCH        = 1_000                        # the endpoint's BULK_MAX
+LINGER_SECS  = 0.05                         # let a burst collect into one POST
+BACKOFF_CAP  = 30.0
+
+SENT    = metrics.REGISTRY.counter("announce_sent_total", "Diffs delivered to the API")
+FAILS   = metrics.REGISTRY.counter("watcher_announce_failures_total", "Failed announces")
+DROPPED = metrics.REGISTRY.counter("announce_dropped_total", "Diffs dropped, queue full")
+PENDING = metrics.REGISTRY.gauge("announce_pending", "Diffs waiting for the API")
+
+
+class Announcer:
+    def __init__(self, url: str = ANNOUNCE_URL, spool: str | Path | None = None,
+                 max_pending: int = MAX_PENDING):
+        self.url, self.max_pending = url, max_pending
+        self.spool = Path(spool or STATE_DIR / "announce.spool")
+        self.spool.parent.mkdir(parents=True, exist_ok=True)
+        self._pending: list[tuple[int, dict]] = []     # (seq, diff), oldest first
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._fh = None
+        if self.spool.exists():                 # replay what the last run did not deliver
+            for line in self.spool.read_text().splitlines():
+                try:
+                    self._queue(json.loads(line))
+                except ValueError:              # torn last line
+                    pass
+            self._pending = self._pending[-max_pending:]
+            if self._pending:
+                log.info("announce: replaying %d spooled diffs", len(self._pending))
+        self._rewrite()
+        threading.Thread(target=self._run, name="announce", daemon=True).start()
+
+    def _queue(self, diff: dict) -> None:
+        self._seq += 1
+        self._pending.append((self._seq, diff))
+
+    def _rewrite(self) -> None:
+        """Spool := what is still pending. Caller holds the lock (or is __init__)."""
+        if self._fh is not None:
+            self._fh.close()
+        atomic_write(self.spool, "".join(json.dumps(d, default=int) + "\n"
+                                         for _, d in self._pending))
+        self._fh = open(self.spool, "a")
+        self._spooled = len(self._pending)
+        PENDING.set(len(self._pending))
+
+    def publish(self, diff: dict) -> None:
+        """Queue one diff ({"block": n, "table": name, …}); never blocks on the API."""
+        line = json.dumps(diff, default=int)
+        with self._cond:
+            self._queue(diff)
+            self._fh.write(line + "\n")
+            self._fh.flush()
+            self._spooled += 1
+            if len(self._pending) > self.max_pending:
+                over = len(self._pending) - self.max_pending
+                del self._pending[:over]
+                DROPPED.inc(over)
+                if self._spooled > 2 * self.max_pending:
+                    self._rewrite()
+            PENDING.set(len(self._pending))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+            time.sleep(LINGER_SECS)
+            with self._cond:
+                batch = self._pending[:BATCH]
+            if self._send([d for _, d in batch]):
+                failures = 0
+                self._ack(batch[-1][0])
+            else:
+                failures += 1
+                with self._cond:
+                    if self._closed:
+                        return
+                    self._cond.wait(min(BACKOFF_CAP, 0.5 * 2 ** failures))
+
+    def _send(self, batch: list[dict]) -> bool:
+        try:
+            body = {"blocks": [block_trace.stamped(d, "sent") for d in batch]}
+            http.post(self.url, json=body, timeout=2, retries=0).raise_for_status()
+        except Exception as exc:
+            FAILS.inc()
+            log.warning("announce: %d diffs not delivered: %s", len(batch), exc)
+            return False
+        SENT.inc(len(batch))
+        return True
+
+    def _ack(self, seq: int) -> None:
+        """Everything up to seq was delivered."""
+        with self._cond:
+            self._pending = [p for p in self._pending if p[0] > seq]
+            self._rewrite()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait up to `timeout` for the queue to drain; True if it did."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._cond:
+                if not self._pending:
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def close(self) -> None:
+        """Best-effort drain; whatever is left stays spooled for the next run."""
+        self.flush(2.0)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+_announcer: Announcer | None = None
+_announcer_lock = threading.Lock()
+
+
+def announcer() -> Announcer:
+    """Process-wide announcer, drained (best effort) at exit."""
+    global _announcer
+    with _announcer_lock:
+        if _announcer is None:
+            http.client()                       # its atexit close must run after ours
+            _announcer = Announcer()
+            atexit.register(_announcer.close)
+        return _announcer
+
+
+def publish(diff: dict) -> None:
+    announcer().publish(diff)
@@ -19,10 +19,18 @@ import json
 import time
 import datetime
 import logging
-import requests
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from boto3.dynamodb.conditions import Attr
-from playwright.sync_api import sync_playwright
+
+import http_client as http
+import metrics
+import storage
+from checkpoint import Checkpoint
+from result_cache import FAIL_TTL, get_cache
+from widget_pool import get_pool
+from work_queue import get_queue
+from write_buffer import WriteBuffer
 
 # -----------------------------------------------------------------------
 # Logging
@@ -30,142 +38,235 @@ from playwright.sync_api import sync_playwright
 logger = logging.getLogger("authLooperBackend")
 logger.setLevel(logging.DEBUG)
 
+LOG_DIR = Path(os.getenv("LOG_DIR", Path(__file__).parent.parent))   # not the cwd
 _fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
 _console = logging.StreamHandler(); _console.setFormatter(_fmt)
-_file    = logging.FileHandler("authLooperBackend.log"); _file.setFormatter(_fmt)
+_file    = logging.FileHandler(LOG_DIR / "authLooperBackend.log"); _file.setFormatter(_fmt)
 
 logger.addHandler(_console)
 logger.addHandler(_file)
 
 # -----------------------------------------------------------------------
-# DynamoDB
+# DynamoDB (or local SQLite – STORAGE_BACKEND, see storage.py)
 # -----------------------------------------------------------------------
-dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+dynamodb = storage.resource()
 table    = dynamodb.Table("dynamicIndex1")
+metrics.instrument_dynamodb(dynamodb)
+
+# -----------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------
+BLOCKS      = metrics.REGISTRY.counter("looper_blocks_total", "Blocks processed",
+                                       ("script", "result"))
+BLOCK_SECS  = metrics.REGISTRY.histogram("looper_block_seconds", "Wall time per block",
+                                         ("script",), buckets=(1, 2, 5, 10, 20, 30, 60, 120))
+
+# -----------------------------------------------------------------------
+# Work queue: one scan per pass, progress checkpointed per block
+# -----------------------------------------------------------------------
+STATE_DIR     = Path(os.getenv("STATE_DIR", Path(__file__).parent / "state"))
+CHECKPOINT    = Checkpoint(STATE_DIR / "auth_pending.json")
+SCAN_SEGMENTS = int(os.getenv("AUTH_SCAN_SEGMENTS", 4))    # parallel scan workers
+
+# -----------------------------------------------------------------------
+# External endpoints (overridable for offline benchmarks)
+# -----------------------------------------------------------------------
+BLOCKSTREAM   = os.getenv("BLOCKSTREAM_API", "https://blockstream.info/api")
 
 # -----------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------
+def _iso(ts: int) -> str:
+    return datetime.datetime.utcfromtimestamp(ts).isoformat() + "Z"
+
+
 def fetch_block_mined_iso(block_height: int) -> str | None:
     """Return the block’s mined-time as an ISO-8601 UTC string (or None)."""
-    try:
-        h = requests.get(
-            f"https://blockstream.info/api/block-height/{block_height}", timeout=10
-        )
-        h.raise_for_status()
-        block_hash = h.text.strip()
-
-        info = requests.get(
-            f"https://blockstream.info/api/block/{block_hash}", timeout=10
-        )
-        info.raise_for_status()
-        ts = info.json().get("timestamp")          # epoch-seconds
-        return datetime.datetime.utcfromtimestamp(ts).isoformat() + "Z"
-    except Exception as exc:
-        logger.error("Error fetching mined date for block %s: %s", block_height, exc)
-        return None
+    return fetch_block_mined_iso_many([block_height])[block_height]
 
 
-def fetch_al_for_block(block_num: int | str) -> tuple[str, str]:
+def fetch_block_mined_iso_many(heights: list[int]) -> dict[int, str | None]:
     """
-    Resolve authorised parent via ordinals.com’s hidden ‘AL’ widget.
-    Returns (block_number, authorised_parent | error_flag)
+    fetch_block_mined_iso for many blocks: cache first (the watchers
+    store every block they see), then hashes and blocks fetched
+    concurrently through the shared rate-limited client.
     """
-    url = ("https://ordinals.com/inscription/"
-           "66475024139f5a7500b48ac688a7418fdf5838a7eabbc7e6792b7dc7829c8ef7i0")
-    logger.debug("Launching Playwright to load URL: %s", url)
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page    = browser.new_page()
-        try:
-            page.goto(url); page.wait_for_load_state("networkidle")
-        except Exception as exc:
-            logger.error("Error loading page: %s", exc)
-            browser.close(); return str(block_num), "PAGE_LOAD_ERROR"
-
-        frame = next((f for f in page.frames if "/preview/" in f.url), None)
-        if not frame:
-            browser.close(); return str(block_num), "NO_IFRAME"
-
+    cache = get_cache()
+    out: dict[int, str | None] = {}
+    for h, ts in cache.get_many("block_ts", heights).items():
+        out[h] = _iso(ts)
+    todo = [h for h in heights if h not in out]
+    hashes = {}
+    for h, r in zip(todo, http.fetch_many(f"{BLOCKSTREAM}/block-height/{h}" for h in todo)):
+        if isinstance(r, Exception) or not r.is_success:
+            logger.error("Error fetching mined date for block %s: %s", h,
+                         r if isinstance(r, Exception) else r.status_code)
+            out[h] = None
+        else:
+            hashes[h] = r.text.strip()
+    for h, r in zip(hashes, http.fetch_many(f"{BLOCKSTREAM}/block/{x}" for x in hashes.values())):
         try:
-            frame.wait_for_selector("#blockAL", timeout=5_000)
-            frame.fill("#blockAL", str(block_num))
-            frame.click("#alButton")
-            time.sleep(2)
-            result_text = frame.inner_text("#alOutput").strip()
+            if isinstance(r, Exception):
+                raise r
+            r.raise_for_status()
+            ts = r.json().get("timestamp")          # epoch-seconds
+            cache.put("block_ts", h, ts)
+            out[h] = _iso(ts)
         except Exception as exc:
-            browser.close(); return str(block_num), f"INTERACTION_ERROR:{exc}"
+            logger.error("Error fetching mined date for block %s: %s", h, exc)
+            out[h] = None
+    return out
 
-        browser.close()
 
-    # parse JSON result
+def _parse_al(block_num: int | str, result: str | Exception) -> tuple[str, str]:
+    if isinstance(result, Exception):
+        flag = getattr(result, "flag", f"INTERACTION_ERROR:{result}")
+        if not flag.startswith(("PAGE_LOAD_ERROR", "NO_IFRAME", "INTERACTION_ERROR")):
+            flag = f"INTERACTION_ERROR:{flag}"
+        return str(block_num), flag
     try:
-        data      = json.loads(result_text)
+        data      = json.loads(result)
         blk_str   = str(data.get("block", block_num))
         parent_id = str(data.get("authorizedParent", "invalid"))
         return blk_str, parent_id
     except Exception as exc:
         logger.error("JSON parse error for block %s: %s", block_num, exc)
-        return str(block_num), result_text
+        return str(block_num), result
+
+
+def fetch_al_for_block(block_num: int | str) -> tuple[str, str]:
+    """
+    Resolve authorised parent via ordinals.com’s hidden ‘AL’ widget.
+    Returns (block_number, authorised_parent | error_flag)
+    """
+    return fetch_al_for_blocks([block_num])[0]
+
+
+def fetch_al_for_blocks(blocks: list) -> list[tuple[str, str]]:
+    """
+    fetch_al_for_block for many blocks at once, on the shared page pool.
+    Answers are cached for good; failures for RESULT_CACHE_FAIL_TTL.
+    """
+    cache  = get_cache()
+    known  = cache.get_many("al", [int(b) for b in blocks])
+    misses = [int(b) for b in blocks if int(b) not in known]
+    if misses:
+        for b, r in zip(misses, get_pool().resolve_many("al", misses)):
+            known[b] = _parse_al(b, r)[1]
+            failed = known[b].startswith(("PAGE_LOAD_ERROR", "NO_IFRAME", "INTERACTION_ERROR"))
+            cache.put("al", b, known[b], ttl=FAIL_TTL if failed else None)
+    return [(str(b), known[int(b)]) for b in blocks]
 
 # -----------------------------------------------------------------------
-# Main loop
+# Pending set + per-block work
 # -----------------------------------------------------------------------
-def main() -> None:
-    logger.info("Starting authLooperBackend execution")
-
+def _scan_segment(segment: int) -> list[int]:
+    """Every page of one parallel-scan segment, keys only."""
+    kw = {
+        "FilterExpression": Attr("authParent").not_exists() | Attr("authParent").eq(""),
+        "ProjectionExpression": "block_number",
+        "Segment": segment, "TotalSegments": SCAN_SEGMENTS,
+    }
+    out: list[int] = []
     while True:
-        # 1) scan for blocks missing authParent
-        try:
-            response = table.scan(
-                FilterExpression=Attr("authParent").not_exists() |
-                                 Attr("authParent").eq("")
-            )
-        except Exception as exc:
-            logger.error("Error scanning DynamoDB: %s", exc)
-            break
+        resp = table.scan(**kw)
+        out += [int(it["block_number"]) for it in resp.get("Items", [])]
+        if "LastEvaluatedKey" not in resp:
+            return out
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
 
-        items = response.get("Items", [])
-        if not items:
-            logger.info("No blocks to process – exiting.")
-            break
 
-        # earliest block first
-        current = min(items, key=lambda x: int(x["block_number"]))
-        blk = current["block_number"]
-        logger.info("Processing block %s", blk)
+def pending_blocks() -> list[int]:
+    """All blocks missing authParent, in one (segmented, paginated) pass."""
+    with ThreadPoolExecutor(SCAN_SEGMENTS) as pool:
+        return sorted(b for seg in pool.map(_scan_segment, range(SCAN_SEGMENTS))
+                      for b in seg)
 
-        # 2) resolve authParent
-        _, parent_str = fetch_al_for_block(int(blk))
-        logger.info("Block %s: authParent = %s", blk, parent_str)
 
-        # 3) store authParent + timestamp
-        now_iso = datetime.datetime.utcnow().isoformat() + "Z"
-        try:
-            table.update_item(
-                Key={"block_number": int(blk)},                     # Number PK
-                UpdateExpression="SET authParent = :a, lastProcessedAt = :t",
-                ExpressionAttributeValues={":a": parent_str, ":t": now_iso},
-            )
-        except Exception as exc:
-            logger.error("Failed to update authParent for block %s: %s", blk, exc)
+def _process(blk: int, parent_str: str, date_iso: str | None, t0: float,
+             buf: WriteBuffer) -> None:
+    """Queue a resolved authParent and dateAvailable for one block."""
+    logger.info("Block %s: authParent = %s", blk, parent_str)
+
+    # 3) authParent + timestamp, 4) mined-time for THIS block – one merged update
+    now_iso = datetime.datetime.utcnow().isoformat() + "Z"
+    fields = {"authParent": parent_str, "lastProcessedAt": now_iso}
+    if date_iso:
+        fields["dateAvailable"] = date_iso
+        logger.info("Block %s: dateAvailable = %s", blk, date_iso)
+    buf.update({"block_number": int(blk)}, **fields)           # Number PK
+
+    failed = parent_str.startswith(("PAGE_LOAD_ERROR", "NO_IFRAME", "INTERACTION_ERROR"))
+    BLOCKS.inc(script="auth", result="error" if failed else "ok")
+    BLOCK_SECS.observe(time.perf_counter() - t0, script="auth")
 
-        # 4) mined-time for THIS block
-        date_iso = fetch_block_mined_iso(int(blk))
-        if date_iso:
+def process_blocks(blocks: list[int], buf: WriteBuffer, progress=None,
+                   width: int | None = None) -> None:
+    """Resolve + store `blocks`, `width` (default: pool size) at a time."""
+    width = width or get_pool().size
+    for i in range(0, len(blocks), width):
+        chunk = blocks[i:i + width]
+        t0 = time.perf_counter()
+        dates = fetch_block_mined_iso_many(chunk)
+        for blk, (_, parent_str) in zip(chunk, fetch_al_for_blocks(chunk)):
+            _process(blk, parent_str, dates[blk], t0, buf)
+            # progress once the write has been sent (failures are logged)
+            if progress:
+                buf.after(lambda blk=blk: progress(blk))
+
+# -----------------------------------------------------------------------
+# Main loop
+# -----------------------------------------------------------------------
+def main(progress=None, width: int | None = None) -> None:
+    """
+    progress(block) is called after each block's write has been sent
+    (job runner / pipeline hook); `width` blocks (default: pool size)
+    are resolved at once.
+
+    Work comes from one scan per pass, checkpointed under STATE_DIR so
+    a crashed run picks up where it stopped. Rows that appear while a
+    pass runs are caught by the next pass; a block is tried once per run.
+    Blocks still in the work queue are left to `pipeline.py --follow`,
+    which makes this the reconciliation sweep for whatever it missed.
+    """
+    logger.info("Starting authLooperBackend execution")
+    metrics.start_exporter("authLooperBackend")
+
+    tried: set[int] = set()
+    buf = WriteBuffer(table, ("block_number",))
+
+    def done(blk: int) -> None:
+        CHECKPOINT.advance(blk)
+        if progress:
+            progress(blk)
+
+    todo = CHECKPOINT.load()
+    if todo is not None:
+        logger.info("Resuming checkpointed pass: %d blocks left", len(todo))
+
+    while True:
+        if todo is None:
+            # 1) one scan for every block missing authParent
             try:
-                table.update_item(
-                    Key={"block_number": int(blk)},                 # Number PK
-                    UpdateExpression="SET dateAvailable = :d",
-                    ExpressionAttributeValues={":d": date_iso},
-                )
-                logger.info("Block %s: wrote dateAvailable = %s", blk, date_iso)
+                skip = tried | get_queue().blocks("auth")
+                todo = CHECKPOINT.begin(b for b in pending_blocks() if b not in skip)
             except Exception as exc:
-                logger.error("Error writing dateAvailable for block %s: %s", blk, exc)
+                logger.error("Error scanning DynamoDB: %s", exc)
+                break
+            logger.info("New pass: %d blocks pending", len(todo))
+        if not todo:
+            buf.flush()
+            CHECKPOINT.finish()
+            logger.info("No blocks to process – exiting.")
+            break
 
-        time.sleep(1)  # polite delay to external services
+        # 2) resolve a pool's worth of blocks at once, store them in order
+        tried.update(todo)
+        process_blocks(todo, buf, done, width)
+        buf.flush()
+        todo = None
 
+    logger.info("Result cache: %s", get_cache().summary())
     logger.info("authLooperBackend completed.")
     print(json.dumps({"message": "Processing completed"}))
 
@@ -0,0 +1,198 @@
+# --------------------------------------------------------------
+# block_source.py – where ingest.py learns about new blocks
+#   • one surface: tip_height() / catch_up(last, tip) /
+#     fetch_txids(hashes) / wait(tip) – wait() returns when a
+#     block past `tip` may exist
+#   • blockstream (default) – Esplora, polled adaptively: slow right
+#     after a block, faster as the next one becomes due (blocks are
+#     ~Poisson, 600 s apart). The clock starts at the tip block's
+#     timestamp; a failed poll keeps the same schedule
+#   • bitcoind – a local node's REST interface, polled every
+#     BITCOIND_POLL_SECS (cheap, no rate limit)
+#   • zmq – bitcoind `hashblock` notifications wake wait() at once;
+#     blocks are read over REST; POLL_SECS stays as a safety net
+#
+# Env:
+#   BLOCK_SOURCE        blockstream | bitcoind | zmq
+#   POLL_SECS           longest wait between tip checks (default 120)
+#   POLL_MIN_SECS       shortest adaptive poll (default 10)
+#   BITCOIND_REST       node with -rest=1 (default http://127.0.0.1:8332)
+#   BITCOIND_ZMQ        its -zmqpubhashblock (default tcp://127.0.0.1:28332)
+#
+# zmq needs `pip install pyzmq`; bench/fake_explorer.py serves the REST
+# routes and can publish hashblock for local runs.
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import math, os, time
+
+import blockstream
+import http_client as http
+import metrics
+
+POLL_SECS     = float(os.getenv("POLL_SECS", 120))
+POLL_MIN_SECS = float(os.getenv("POLL_MIN_SECS", 10))
+BLOCK_SECS    = 600.0                        # mean block interval
+BITCOIND_REST = os.getenv("BITCOIND_REST", "http://127.0.0.1:8332").rstrip("/")
+BITCOIND_POLL = float(os.getenv("BITCOIND_POLL_SECS", 2))
+BITCOIND_ZMQ  = os.getenv("BITCOIND_ZMQ", "tcp://127.0.0.1:28332")
+
+WAKEUPS = metrics.REGISTRY.counter("block_source_wakeups_total", "Tip checks by cause",
+                                   ("source", "cause"))
+SEEN_LAG = metrics.REGISTRY.histogram("block_source_seen_lag_seconds",
+                                      "Block timestamp → tip seen", ("source",),
+                                      buckets=(1, 2, 5, 10, 30, 60, 120, 300))
+
+
+def _ok(r):
+    """fetch_many slot → response, raising what failed."""
+    if isinstance(r, Exception):
+        raise r
+    r.raise_for_status()
+    return r
+
+
+class BlockSource:
+    name = ""
+
+    def tip_height(self) -> int:
+        raise NotImplementedError
+
+    def catch_up(self, last: int, tip: int):
+        """Blocks last+1..tip in height order (Esplora-shaped dicts)."""
+        raise NotImplementedError
+
+    def fetch_txids(self, hashes) -> list[list[str]]:
+        raise NotImplementedError
+
+    def wait(self, tip: int) -> None:
+        raise NotImplementedError
+
+    def seen(self, blk: dict) -> None:
+        """Called for the newest block of each advance; feeds the lag histogram."""
+        SEEN_LAG.observe(max(0.0, time.time() - blk["timestamp"]), source=self.name)
+
+
+class EsploraSource(BlockSource):
+    name = "blockstream"
+
+    def __init__(self):
+        self._last_ts: float | None = None      # timestamp of the newest block seen
+        self._failed = False
+
+    def tip_height(self) -> int:
+        try:
+            tip = blockstream.tip_height()
+        except Exception:
+            self._failed = True
+            raise
+        self._failed = False
+        if self._last_ts is None:
+            try:                                 # seed the schedule from the tip block
+                self._last_ts = blockstream.fetch_heights([tip])[0]["timestamp"]
+            except Exception:
+                pass                             # next successful poll tries again
+        return tip
+
+    def catch_up(self, last: int, tip: int):
+        return blockstream.catch_up(last, tip)
+
+    def fetch_txids(self, hashes) -> list[list[str]]:
+        return blockstream.fetch_txids(hashes)
+
+    def seen(self, blk: dict) -> None:
+        super().seen(blk)
+        self._last_ts = blk["timestamp"]
+
+    def interval(self) -> float:
+        """
+        POLL_SECS right after a block, shrinking towards POLL_MIN_SECS as
+        the gap since it grows (one mean interval in: ~POLL_SECS / e).
+        Failed polls follow the same curve; with no block time known yet
+        it assumes one mean interval has passed.
+        """
+        if self._last_ts is None:
+            since = BLOCK_SECS
+        else:
+            since = max(0.0, time.time() - self._last_ts)
+        return max(POLL_MIN_SECS, POLL_SECS * math.exp(-since / BLOCK_SECS))
+
+    def wait(self, tip: int) -> None:
+        WAKEUPS.inc(source=self.name, cause="retry" if self._failed else "poll")
+        time.sleep(self.interval())
+
+
+class BitcoindSource(BlockSource):
+    """A node's REST interface (bitcoind -rest=1)."""
+    name = "bitcoind"
+
+    def __init__(self, url: str = BITCOIND_REST):
+        self.url = url
+
+    def _json(self, path: str):
+        r = http.get(f"{self.url}/rest/{path}")
+        r.raise_for_status()
+        return r.json()
+
+    def tip_height(self) -> int:
+        return int(self._json("chaininfo.json")["blocks"])
+
+    @staticmethod
+    def _esplora(b: dict) -> dict:
+        return {"id": b["hash"], "height": b["height"], "timestamp": b["time"],
+                "bits": b["bits"], "tx_count": b.get("nTx", len(b.get("tx", ())))}
+
+    def _blocks(self, heights: list[int]) -> list[dict]:
+        hashes = []
+        for r in http.fetch_many(f"{self.url}/rest/blockhashbyheight/{h}.json" for h in heights):
+            hashes.append(_ok(r).json()["blockhash"])
+        return [self._esplora(_ok(r).json()) for r in
+                http.fetch_many(f"{self.url}/rest/block/notxdetails/{x}.json" for x in hashes)]
+
+    def catch_up(self, last: int, tip: int):
+        step = blockstream.CATCHUP_CALLS * blockstream.PAGE
+        for lo in range(last + 1, tip + 1, step):
+            yield from self._blocks(list(range(lo, min(lo + step, tip + 1))))
+
+    def fetch_txids(self, hashes) -> list[list[str]]:
+        return [_ok(r).json()["tx"] for r in
+                http.fetch_many(f"{self.url}/rest/block/notxdetails/{x}.json" for x in hashes)]
+
+    def wait(self, tip: int) -> None:
+        WAKEUPS.inc(source=self.name, cause="poll")
+        time.sleep(BITCOIND_POLL)
+
+
+class ZmqSource(BitcoindSource):
+    """REST for data, `hashblock` pushes for timing."""
+    name = "zmq"
+
+    def __init__(self, url: str = BITCOIND_REST, endpoint: str = BITCOIND_ZMQ):
+        try:
+            import zmq
+        except ImportError as exc:
+            raise RuntimeError("BLOCK_SOURCE=zmq needs `pip install pyzmq`") from exc
+        super().__init__(url)
+        self._sock = zmq.Context.instance().socket(zmq.SUB)
+        self._sock.setsockopt(zmq.SUBSCRIBE, b"hashblock")
+        self._sock.setsockopt(zmq.RCVHWM, 0)
+        self._sock.connect(endpoint)
+
+    def wait(self, tip: int) -> None:
+        """Until a hashblock arrives (drained, so a burst is one wake-up) or POLL_SECS."""
+        if not self._sock.poll(int(POLL_SECS * 1000)):
+            WAKEUPS.inc(source=self.name, cause="timeout")
+            return
+        while self._sock.poll(0):
+            self._sock.recv_multipart()
+        WAKEUPS.inc(source=self.name, cause="push")
+
+
+SOURCES = {"blockstream": EsploraSource, "bitcoind": BitcoindSource, "zmq": ZmqSource}
+
+
+def get_source(name: str | None = None) -> BlockSource:
+    name = name or os.getenv("BLOCK_SOURCE", "blockstream")
+    if name not in SOURCES:
+        raise ValueError(f"unknown BLOCK_SOURCE {name}")
+    return SOURCES[name]()
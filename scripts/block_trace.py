@@ -0,0 +1,52 @@
+# --------------------------------------------------------------
+# block_trace.py – per-block latency traces, watcher side
+#   • a trace is {"id", "block", "hops": [[name, unix secs], …]}
+#     and rides inside the announced diff as "trace"
+#   • hops added here: mined (block header time) → seen (tip
+#     noticed) → fetched → written (DynamoDB write landed) → sent
+#     (announce POST); the API adds received / published /
+#     emitted / acked and turns the gaps into histograms
+#     (tracing.py at the repo root)
+#
+# Env:
+#   BLOCK_TRACE   0 disables tracing (default 1)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import os, time, uuid
+
+ENABLED = os.getenv("BLOCK_TRACE", "1") != "0"
+
+
+def new(blk: dict, seen_at: float) -> dict | None:
+    """Trace for a block just fetched; None with tracing off."""
+    if not ENABLED:
+        return None
+    return {"id": uuid.uuid4().hex[:16], "block": blk["height"],
+            "hops": [["mined", blk["timestamp"]], ["seen", round(seen_at, 3)],
+                     ["fetched", round(time.time(), 3)]]}
+
+
+def copy(tr: dict | None) -> dict | None:
+    return None if tr is None else {**tr, "hops": [list(h) for h in tr["hops"]]}
+
+
+def branch(tr: dict | None, name: str) -> dict | None:
+    """Copy of tr for one consumer (a sink), with its own id."""
+    tr = copy(tr)
+    if tr is not None:
+        tr["id"] = f"{tr['id']}.{name}"
+    return tr
+
+
+def hop(tr: dict | None, name: str, t: float | None = None) -> dict | None:
+    if tr is not None:
+        tr["hops"].append([name, round(time.time() if t is None else t, 3)])
+    return tr
+
+
+def stamped(diff: dict, name: str) -> dict:
+    """diff with one more hop on a copy of its trace (the queued diff is left as is)."""
+    if not diff.get("trace"):
+        return diff
+    return {**diff, "trace": hop(copy(diff["trace"]), name)}
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------
+# checkpoint.py – crash-safe progress for the looper scripts
+#   • pending set written once per pass
+#   • tiny cursor file rewritten after every item
+#   • every write is tmp + fsync + rename, so a crash leaves
+#     either the old or the new file, never half of one
+#   • exclusive(): flock held while a stage runs, so two processes
+#     (API workers, the timer) never share one checkpoint
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import fcntl, json, os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def atomic_write(path: str | Path, text: str) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as fh:
+        fh.write(text)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+@contextmanager
+def exclusive(*paths: str | Path):
+    """
+    Hold an flock on every lock file in `paths` (taken in sorted order,
+    so two callers can't deadlock); waits while another process has one.
+    The kernel drops the locks if the holder dies.
+    """
+    fds = []
+    try:
+        for path in sorted(Path(p) for p in paths):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fds.append(os.open(path, os.O_RDWR | os.O_CREAT, 0o644))
+            fcntl.flock(fds[-1], fcntl.LOCK_EX)
+        yield
+    finally:
+        for fd in reversed(fds):
+            os.close(fd)                     # closing releases the lock
+
+
+class Checkpoint:
+    """
+    <name>.json holds the sorted pending items of the current pass,
+    <name>.cursor the last one finished. Items are ints (block numbers)
+    and are processed in ascending order, so resuming is "everything
+    in the pending list above the cursor" – no rescan needed.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path    = Path(path)
+        self._cursor = self.path.with_suffix(".cursor")
+
+    def load(self) -> list[int] | None:
+        """Items still to do from an interrupted pass, or None if there is none."""
+        try:
+            pending = json.loads(self.path.read_text())["pending"]
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            done = int(self._cursor.read_text())
+        except (OSError, ValueError):
+            return pending
+        return [b for b in pending if b > done]
+
+    def begin(self, items) -> list[int]:
+        pending = sorted(set(int(b) for b in items))
+        atomic_write(self.path, json.dumps({"pending": pending}))
+        self._cursor.unlink(missing_ok=True)
+        return pending
+
+    def advance(self, item: int) -> None:
+        atomic_write(self._cursor, str(int(item)))
+
+    def finish(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self._cursor.unlink(missing_ok=True)
@@ -0,0 +1,195 @@
+# --------------------------------------------------------------
+# http_client.py – one pooled HTTP client for every script
+#   • httpx.AsyncClient (keep-alive) on its own event-loop thread;
+#     sync callers use get / post / fetch_many, async code awaits
+#     request() / gather() on that loop
+#   • token bucket per host, at or under each API's published limit
+#   • retries 429 / 5xx / transport errors with full-jitter
+#     exponential backoff, honouring Retry-After
+#   • at most HTTP_MAX_CONCURRENCY requests in flight overall
+#
+# Env:
+#   HTTP_RATE_LIMITS      "host=rate/s:burst,…" overrides, e.g. "api.hiro.so=8:20"
+#   HTTP_MAX_CONCURRENCY  in-flight cap (default 16)
+#   HTTP_RETRIES          attempts after the first (default 4)
+#   HIRO_API_KEY          sent as x-api-key; lifts Hiro's limit
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio, atexit, logging, os, random, threading, time
+from urllib.parse import urlparse
+
+import httpx
+
+import metrics
+
+log = logging.getLogger("http_client")
+
+HIRO_API_KEY    = os.getenv("HIRO_API_KEY")
+MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", 16))
+RETRIES         = int(os.getenv("HTTP_RETRIES", 4))
+BACKOFF_BASE    = 0.5                       # s, first retry waits up to this
+BACKOFF_CAP     = 30.0
+RETRY_STATUS    = {429, 500, 502, 503, 504}
+
+# host → (requests per second, burst)
+RATE_LIMITS = {
+    "api.hiro.so":      (500 / 60, 20) if HIRO_API_KEY else (50 / 60, 5),  # Hiro: 50 rpm, 500 with a key
+    "blockstream.info": (5.0, 10),          # esplora publishes no quota; stay clear of its throttling
+    "mempool.space":    (5.0, 10),
+    "ordinals.com":     (5.0, 10),
+}
+for spec in filter(None, os.getenv("HTTP_RATE_LIMITS", "").split(",")):
+    host, _, rate = spec.partition("=")
+    r, _, burst = rate.partition(":")
+    RATE_LIMITS[host.strip()] = (float(r), int(burst or max(1, float(r))))
+
+REQUESTS = metrics.REGISTRY.counter("http_client_requests_total", "Outbound HTTP requests",
+                                    ("host", "status"))
+RETRY    = metrics.REGISTRY.counter("http_client_retries_total", "Outbound HTTP retries",
+                                    ("host", "reason"))
+SECONDS  = metrics.REGISTRY.histogram("http_client_request_seconds", "Outbound HTTP latency",
+                                      ("host",))
+
+
+class TokenBucket:
+    """`rate` tokens/s up to `burst`; take() waits for one. Loop-thread only."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate, self.burst = rate, burst
+        self.tokens = float(burst)
+        self._t = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+                self._t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    try:
+        return min(float(resp.headers["retry-after"]), BACKOFF_CAP)
+    except (KeyError, ValueError):
+        return None
+
+
+class HttpClient:
+    def __init__(self, concurrency: int = MAX_CONCURRENCY):
+        self._concurrency = concurrency
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="http-client",
+                         daemon=True).start()
+        self._client: httpx.AsyncClient | None = None
+        self._sem: asyncio.Semaphore | None = None
+        self._buckets: dict[str, TokenBucket | None] = {}
+
+    # ── loop side ─────────────────────────────────────────
+    def _ensure(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=15, follow_redirects=True,
+                limits=httpx.Limits(max_connections=self._concurrency,
+                                    max_keepalive_connections=self._concurrency))
+            self._sem = asyncio.Semaphore(self._concurrency)
+
+    def _bucket(self, host: str) -> TokenBucket | None:
+        if host not in self._buckets:
+            limit = RATE_LIMITS.get(host)
+            self._buckets[host] = TokenBucket(*limit) if limit else None
+        return self._buckets[host]
+
+    async def request(self, method: str, url: str, retries: int = RETRIES,
+                      **kw) -> httpx.Response:
+        """
+        Rate-limited, retried request. The last response is returned
+        whatever its status (callers decide what a 404 means); transport
+        errors are raised once retries run out.
+        """
+        self._ensure()
+        host = urlparse(url).hostname or ""
+        if host == "api.hiro.so" and HIRO_API_KEY:
+            kw["headers"] = {"x-api-key": HIRO_API_KEY, **kw.get("headers", {})}
+        bucket = self._bucket(host)
+        for attempt in range(retries + 1):
+            if bucket:
+                await bucket.take()
+            wait = None
+            t0 = time.perf_counter()
+            try:
+                async with self._sem:
+                    resp = await self._client.request(method, url, **kw)
+            except httpx.TransportError as exc:
+                REQUESTS.inc(host=host, status="error")
+                if attempt == retries:
+                    raise
+                RETRY.inc(host=host, reason=type(exc).__name__)
+            else:
+                SECONDS.observe(time.perf_counter() - t0, host=host)
+                REQUESTS.inc(host=host, status=str(resp.status_code))
+                if resp.status_code not in RETRY_STATUS or attempt == retries:
+                    return resp
+                RETRY.inc(host=host, reason=str(resp.status_code))
+                wait = _retry_after(resp)
+            if wait is None:                    # full jitter
+                wait = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            log.debug("retrying %s %s in %.2fs (attempt %d)", method, url, wait, attempt + 1)
+            await asyncio.sleep(wait)
+        raise AssertionError("unreachable")
+
+    async def gather(self, coros) -> list:
+        """Await many; failures come back as exceptions in their slot."""
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    # ── sync facade ───────────────────────────────────────
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def get(self, url: str, **kw) -> httpx.Response:
+        return self.run(self.request("GET", url, **kw))
+
+    def post(self, url: str, **kw) -> httpx.Response:
+        return self.run(self.request("POST", url, **kw))
+
+    def fetch_many(self, urls, method: str = "GET", **kw) -> list:
+        """Responses (or exceptions) for every URL, in order, fetched concurrently."""
+        return self.run(self.gather(self.request(method, u, **kw) for u in urls))
+
+    def close(self) -> None:
+        if self._client is not None:
+            try:
+                self.run(self._client.aclose())
+            except Exception as exc:
+                log.debug("http client close: %s", exc)
+
+
+_client: HttpClient | None = None
+_client_lock = threading.Lock()
+
+
+def client() -> HttpClient:
+    """Process-wide client, closed at exit."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+            atexit.register(_client.close)
+        return _client
+
+
+def get(url: str, **kw) -> httpx.Response:
+    return client().get(url, **kw)
+
+
+def post(url: str, **kw) -> httpx.Response:
+    return client().post(url, **kw)
+
+
+def fetch_many(urls, **kw) -> list:
+    return client().fetch_many(urls, **kw)
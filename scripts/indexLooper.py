@@ -6,160 +6,201 @@ from __future__ import annotations           # PEP-604 unions on Py 3.9
 # --------------------------------------------------------------
 
 # ---- lock-file cleanup ---------------------------------------
-import os, atexit, json, time, datetime, logging, boto3, requests
+import os, atexit, json, time, datetime, logging
 from pathlib import Path
 from boto3.dynamodb.conditions import Attr
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+
+import http_client as http
+import metrics
+import storage
+from result_cache import FAIL_TTL, get_cache
+from widget_pool import get_pool
+from write_buffer import WriteBuffer
 
 LOCK_FILE = os.getenv("INDEX_LOCK_FILE")      # set by app.py at launch
 if LOCK_FILE:
     atexit.register(lambda: Path(LOCK_FILE).unlink(missing_ok=True))
 
 ENABLE_DATE_FETCH = True
-HIRO_API_BASE     = "https://api.hiro.so/ordinals/v1/inscriptions"
-WAIT_MAX_SEC      = 20
-WAIT_POLL_SEC     = 0.5
+HIRO_API_BASE     = os.getenv("HIRO_API_BASE", "https://api.hiro.so/ordinals/v1/inscriptions")
 
 # ───────────────────────── logging ────────────────────────────
 log = logging.getLogger("indexLooper")
 log.setLevel(logging.DEBUG)
+LOG_DIR = Path(os.getenv("LOG_DIR", Path(__file__).parent.parent))   # not the cwd
 _fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
 for h in (logging.StreamHandler(),
-          logging.FileHandler("indexLooper.log")):
+          logging.FileHandler(LOG_DIR / "indexLooper.log")):
     h.setFormatter(_fmt); log.addHandler(h)
 
-# ─────────────────────── DynamoDB ─────────────────────────────
-table = boto3.resource("dynamodb", region_name="us-east-1") \
-             .Table("dynamicIndex1")
+# ─────────────── DynamoDB (or SQLite, storage.py) ─────────────
+table = storage.resource().Table("dynamicIndex1")
+metrics.instrument_dynamodb(table)
+
+# ───────────────────────── metrics ────────────────────────────
+BLOCKS     = metrics.REGISTRY.counter("looper_blocks_total", "Blocks processed",
+                                      ("script", "result"))
+BLOCK_SECS = metrics.REGISTRY.histogram("looper_block_seconds", "Wall time per block",
+                                        ("script",), buckets=(1, 2, 5, 10, 20, 30, 60, 120))
 
 # ───────────── ordinals.com fallback widget ──────────────────
+def _parse_il(block_num: int | str, result: str | Exception) -> tuple[str, str]:
+    if isinstance(result, Exception):
+        flag = getattr(result, "flag", f"UI_ERROR:{result}")
+        if flag.startswith("INTERACTION_ERROR:"):
+            flag = "UI_ERROR:" + flag.split(":", 1)[1]
+        return str(block_num), flag
+
+    out = result
+    if out.startswith('"') and out.endswith('"'):
+        out = out[1:-1]
+
+    try:
+        j = json.loads(out)       # sometimes returns proper JSON
+        return str(j.get("block", block_num)), str(j.get("mintedInscription"))
+    except Exception:
+        return str(block_num), out
+
+
 def fetch_il_for_block(block_num: int | str) -> tuple[str, str]:
     """
     Call the hidden “IL” widget to map a block to its minted inscription.
     Returns (block_str, inscription_id | error_flag)
     """
-    url = ("https://ordinals.com/inscription/"
-           "66475024139f5a7500b48ac688a7418fdf5838a7eabbc7e6792b7dc7829c8ef7i0")
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page    = browser.new_page()
-        try:
-            page.goto(url); page.wait_for_load_state("networkidle")
-        except Exception:
-            browser.close(); return str(block_num), "PAGE_LOAD_ERROR"
+    return fetch_il_for_blocks([block_num])[0]
 
-        frame = next((f for f in page.frames if "/preview/" in f.url), None)
-        if not frame:
-            browser.close(); return str(block_num), "NO_IFRAME"
 
-        try:
-            frame.wait_for_selector("#blockIL", timeout=5_000)
-            frame.fill("#blockIL", str(block_num))
-            frame.click("#ilButton")
-        except PWTimeout:
-            browser.close(); return str(block_num), "NO_FALLBACK_UI"
-        except Exception as exc:
-            browser.close(); return str(block_num), f"UI_ERROR:{exc}"
+def _il_failed(insc_id: str) -> bool:
+    return (not insc_id or insc_id.lower() in {"none", "error", "timeout"}
+            or insc_id.startswith(("NO_", "PAGE_", "UI_", "TIMEOUT")))
 
-        deadline = time.time() + WAIT_MAX_SEC
-        while time.time() < deadline:
-            out = frame.inner_text("#ilOutput").strip()
-            if out and not out.lower().startswith("running"):
-                break
-            time.sleep(WAIT_POLL_SEC)
-        else:
-            browser.close(); return str(block_num), "TIMEOUT"
 
-        browser.close()
+def fetch_il_for_blocks(blocks: list) -> list[tuple[str, str]]:
+    """
+    fetch_il_for_block for many blocks at once, on the shared page pool.
+    Answers are cached for good; failures for RESULT_CACHE_FAIL_TTL, so a
+    block that keeps failing is not re-rendered on every timer tick.
+    """
+    cache  = get_cache()
+    known  = cache.get_many("il", [int(b) for b in blocks])
+    misses = [int(b) for b in blocks if int(b) not in known]
+    if misses:
+        for b, r in zip(misses, get_pool().resolve_many("il", misses)):
+            known[b] = _parse_il(b, r)[1]
+            cache.put("il", b, known[b], ttl=FAIL_TTL if _il_failed(known[b]) else None)
+    return [(str(b), known[int(b)]) for b in blocks]
 
-    if out.startswith('"') and out.endswith('"'):
-        out = out[1:-1]
+# ─────────────────────── Hiro helpers ─────────────────────────
+def _hiro_fields(j: dict) -> tuple[int | None, int | None]:
+    ts, num = j.get("timestamp"), j.get("number")
+    return (ts // 1000 if isinstance(ts, int) else None,
+            int(num) if isinstance(num, int) else None)
 
-    try:
-        j = json.loads(out)       # sometimes returns proper JSON
-        return str(j.get("block", block_num)), str(j.get("mintedInscription"))
-    except Exception:
-        return str(block_num), out
 
-# ─────────────────────── Hiro helpers ─────────────────────────
 def fetch_ts_and_number(insc_id: str) -> tuple[int | None, int | None]:
-    try:
-        r = requests.get(f"{HIRO_API_BASE}/{insc_id}", timeout=10)
-        r.raise_for_status()
-        j   = r.json()
-        ts  = j.get("timestamp")
-        num = j.get("number")
-        return (ts // 1000 if isinstance(ts, int) else None,
-                int(num) if isinstance(num, int) else None)
-    except Exception as exc:
-        log.error("Hiro API error for %s: %s", insc_id, exc)
-        return None, None
+    return fetch_ts_and_number_many([insc_id])[insc_id]
+
+
+def fetch_ts_and_number_many(ids: list[str]) -> dict[str, tuple[int | None, int | None]]:
+    """Cached first (immutable once complete), the rest fetched concurrently."""
+    cache = get_cache()
+    out = {i: tuple(v) for i, v in cache.get_many("hiro", ids).items()}
+    todo = [i for i in dict.fromkeys(ids) if i not in out]
+    for insc_id, r in zip(todo, http.fetch_many(f"{HIRO_API_BASE}/{i}" for i in todo)):
+        try:
+            if isinstance(r, Exception):
+                raise r
+            r.raise_for_status()
+            ts, num = _hiro_fields(r.json())
+            if ts is not None and num is not None:
+                cache.put("hiro", insc_id, [ts, num])
+            out[insc_id] = (ts, num)
+        except Exception as exc:
+            log.error("Hiro API error for %s: %s", insc_id, exc)
+            out[insc_id] = (None, None)
+    return out
+
+def _store(blk: int, insc_id: str, hiro: tuple[int | None, int | None], t0: float,
+           buf: WriteBuffer) -> None:
+    """Queue one resolved inscriptionID (+ Hiro enrichment) as a single update."""
+    log.info("block %s", blk)
+    key = {"block_number": int(blk)}
+    now = datetime.datetime.utcnow().isoformat() + "Z"
+
+    # Guard: skip obviously invalid results
+    if _il_failed(insc_id):
+        log.warning("block %s gave invalid inscriptionID: %s", blk, insc_id)
+        buf.update(key, lastProcessedAt=now)
+        BLOCKS.inc(script="index", result="invalid")
+        BLOCK_SECS.observe(time.perf_counter() - t0, script="index")
+        return
+
+    # Valid ID (+ optional Hiro enrichment) → one write to Dynamo
+    fields = {"inscriptionID": insc_id, "lastProcessedAt": now}
+    if ENABLE_DATE_FETCH:
+        ts, num = hiro
+        if ts is not None:
+            fields["inscriptionTimestamp"] = ts
+        if num is not None:
+            fields["inscriptionNumber"] = num
+    buf.update(key, **fields)
+
+    BLOCKS.inc(script="index", result="ok")
+    BLOCK_SECS.observe(time.perf_counter() - t0, script="index")
 
 # ───────────────────────── main loop ──────────────────────────
-def main() -> None:
+def pending_blocks() -> list[int]:
+    """Rows with authParent but no usable inscriptionID (paginated scan)."""
+    kw = {
+        "FilterExpression": Attr("authParent").exists() &
+        (
+            Attr("inscriptionID").not_exists() |
+            Attr("inscriptionID").eq("") |
+            Attr("inscriptionID").eq("None")
+        ),
+        "ProjectionExpression": "block_number",
+    }
+    out = []
+    while True:
+        resp = table.scan(**kw)
+        out += [int(it["block_number"]) for it in resp.get("Items", [])]
+        if "LastEvaluatedKey" not in resp:
+            return sorted(out)
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+def process_blocks(blocks: list[int], buf: WriteBuffer, progress=None,
+                   width: int | None = None) -> None:
+    """Resolve + store `blocks`, `width` (default: pool size) at a time."""
+    width = width or get_pool().size
+    for i in range(0, len(blocks), width):
+        chunk = blocks[i:i + width]
+        t0 = time.perf_counter()
+        # -------- resolve a pool's worth of inscriptionIDs at once --------
+        resolved = fetch_il_for_blocks(chunk)
+        valid    = [i for _, i in resolved if not _il_failed(i)]
+        hiro     = fetch_ts_and_number_many(valid) if ENABLE_DATE_FETCH else {}
+        for blk, (_, insc_id) in zip(chunk, resolved):
+            _store(blk, insc_id, hiro.get(insc_id, (None, None)), t0, buf)
+            if progress:
+                buf.after(lambda blk=blk: progress(blk))
+
+def main(progress=None) -> None:
+    """progress(block) is called after each block (job runner hook)."""
     log.info("indexLooper start")
+    metrics.start_exporter("indexLooper")
 
     try:
-        scan = table.scan(
-            FilterExpression=Attr("authParent").exists() &
-            (
-                Attr("inscriptionID").not_exists() |
-                Attr("inscriptionID").eq("") |
-                Attr("inscriptionID").eq("None")
-            )
-        )
+        blocks = pending_blocks()
     except Exception as exc:
         log.error("scan error: %s", exc); return
-
-    items = scan.get("Items", [])
-    if not items:
+    if not blocks:
         log.info("nothing to do"); return
 
-    for it in sorted(items, key=lambda x: int(x["block_number"])):
-        blk = it["block_number"]
-        log.info("block %s", blk)
-
-        # -------- resolve inscriptionID --------
-        _, insc_id = fetch_il_for_block(int(blk))
-
-        # Guard: skip obviously invalid results
-        if not insc_id or insc_id.lower() in {"none","error","timeout"} \
-           or insc_id.startswith(("NO_", "PAGE_", "UI_", "TIMEOUT")):
-            log.warning("block %s gave invalid inscriptionID: %s", blk, insc_id)
-            table.update_item(
-                Key={"block_number": int(blk)},
-                UpdateExpression="SET lastProcessedAt=:t",
-                ExpressionAttributeValues={":t": datetime.datetime.utcnow().isoformat()+"Z"},
-            )
-            time.sleep(1)
-            continue
-
-        # Valid ID → write to Dynamo
-        now = datetime.datetime.utcnow().isoformat() + "Z"
-        table.update_item(
-            Key={"block_number": int(blk)},
-            UpdateExpression="SET inscriptionID=:i, lastProcessedAt=:t",
-            ExpressionAttributeValues={":i": insc_id, ":t": now},
-        )
-
-        # -------- optional Hiro enrichment -----
-        if ENABLE_DATE_FETCH:
-            ts, num = fetch_ts_and_number(insc_id)
-            expr, vals = [], {}
-            if ts is not None:
-                expr.append("inscriptionTimestamp=:ts"); vals[":ts"] = ts
-            if num is not None:
-                expr.append("inscriptionNumber=:n");    vals[":n"]  = num
-            if expr:
-                table.update_item(
-                    Key={"block_number": int(blk)},
-                    UpdateExpression="SET " + ", ".join(expr),
-                    ExpressionAttributeValues=vals,
-                )
-
-        time.sleep(1)  # polite delay to external services
+    buf = WriteBuffer(table, ("block_number",))
+    process_blocks(blocks, buf, progress)
+    buf.flush()
 
+    log.info("result cache: %s", get_cache().summary())
     log.info("indexLooper done")
 
 if __name__ == "__main__":
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# --------------------------------------------------------------
+# ingest.py – one block-ingestion process for both tables
+#   • watches the tip through a pluggable block source
+#     (block_source.py: Esplora with adaptive polling, bitcoind
+#     REST, bitcoind ZMQ pushes), fetches each new block once and
+#     hands it to every sink that has not seen it yet
+#   • a sink owns its table, checkpoint file, write buffer and
+#     announce policy:
+#       index – dynamicIndex1, blocks whose bits contain "8b"
+#               (last_height.txt, was blockWatcher.py)
+#       mint  – mintBlocks, every block + inscription confirmations
+#               (last_height2.txt, was block_watcher2.py)
+#   • one table resource (storage.py) + one HTTP client for the whole process
+#   • announces go through announce.py's spool: never blocking,
+#     batched into one broadcast, delivered at least once; each names
+#     its sink's table (only mintBlocks ones touch the API's cache)
+#   • every block written to dynamicIndex1 is enqueued for the
+#     loopers (work_queue.py, consumed by `pipeline.py --follow`)
+#   • each announced block carries a latency trace (block_trace.py):
+#     mined → seen → fetched → written, one branch per sink
+#
+#   python ingest.py              # both sinks
+#   python ingest.py mint         # just the named ones
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import os, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+import block_trace as trace
+import blockstream
+import http_client as http
+import metrics
+import storage
+from announce import publish as announce      # queued; see announce.py
+from block_source import BlockSource, get_source
+from checkpoint import atomic_write
+from result_cache import get_cache
+from work_queue import get_queue
+from write_buffer import WriteBuffer
+
+# ── config ──────────────────────────────────────────────────
+STATE_DIR    = Path(os.getenv("STATE_DIR", Path(__file__).parent / "state"))
+API_TX_STAT  = blockstream.BLOCKSTREAM + "/tx/{}/status"
+
+BLOCKS    = metrics.REGISTRY.counter("watcher_blocks_total", "Blocks seen", ("sink", "result"))
+HEIGHT    = metrics.REGISTRY.gauge("watcher_last_height", "Last committed height", ("sink",))
+CONFIRMS  = metrics.REGISTRY.counter("watcher_confirmations_total",
+                                     "Pending inscription txs checked", ("confirmed",))
+
+_dynamo = None
+
+def dynamo():
+    """The process's one table resource (STORAGE_BACKEND)."""
+    global _dynamo
+    if _dynamo is None:
+        _dynamo = storage.resource()
+        metrics.instrument_dynamodb(_dynamo)
+    return _dynamo
+
+
+# ── sinks ───────────────────────────────────────────────────
+class Sink:
+    """
+    accept() is called with every block above `last`, in height order,
+    and writes through self.buf; a height is checkpointed once the
+    writes queued before it have landed. after_poll() runs once per poll.
+    """
+    name = table_name = key = state_name = ""
+
+    def __init__(self, source: BlockSource):
+        self.source = source
+        self.table = dynamo().Table(self.table_name)
+        self.buf = WriteBuffer(self.table, (self.key,))
+        self.state_file = STATE_DIR / self.state_name
+        self.last = -1
+
+    def start(self, tip: int) -> None:
+        """Resume from the checkpoint; a first-ever run starts at the tip."""
+        if self.state_file.exists():
+            self.last = int(self.state_file.read_text().strip())
+        else:
+            self._commit(tip)
+        print(f"{self.name} sink ▶ starting at height {self.last}")
+
+    def _commit(self, h: int) -> None:
+        atomic_write(self.state_file, str(h))
+        self.last = h
+        HEIGHT.set(h, sink=self.name)
+
+    def feed(self, blk: dict) -> None:
+        self.accept(blk)
+        self.buf.after(lambda h=blk["height"]: self._commit(h))
+
+    def announce_block(self, b: dict) -> None:
+        """Announce a freshly written block, its trace stamped `written`."""
+        diff = {"block": b["height"], "table": self.table_name, "hash": b["id"],
+                "mined_at": b["timestamp"], "status": "available"}
+        tr = trace.hop(trace.branch(b.get("trace"), self.name), "written")
+        if tr is not None:
+            diff["trace"] = tr
+        announce(diff)
+
+    def accept(self, blk: dict) -> None:
+        raise NotImplementedError
+
+    def after_poll(self) -> None:
+        pass
+
+
+class IndexSink(Sink):
+    """
+    dynamicIndex1: only blocks matching criteria(); once written, a block
+    is announced and queued for the auth stage.
+    """
+    name, table_name, key, state_name = "index", "dynamicIndex1", "block_number", "last_height.txt"
+
+    @staticmethod
+    def criteria(block: dict) -> bool:
+        """Return True if this block should be inserted / announced."""
+        return "8b" in block.get("bits", "")
+
+    def accept(self, b: dict) -> None:
+        if not self.criteria(b):
+            BLOCKS.inc(sink=self.name, result="skipped")
+            return
+
+        def written():
+            get_queue().put("auth", [b["height"]])
+            self.announce_block(b)
+
+        self.buf.put({
+            "block_number" : int(b["height"]),          # Number PK
+            "bits"         : b["bits"],
+            "dateAvailable": datetime.now(timezone.utc).isoformat(),
+            "hash"         : b["id"],
+            "timestamp"    : b["timestamp"],         # unix seconds
+            "status"       : "available",
+        }, then=written)
+        BLOCKS.inc(sink=self.name, result="inserted")
+        print("index: queued block", b["height"])
+
+
+class MintSink(Sink):
+    """
+    mintBlocks: every block, plus confirmation of minted inscriptions.
+
+    Rows waiting for their inscription tx carry pending_confirm (set by the
+    API's status PATCH, removed here), so the sparse PENDING_INDEX lists
+    exactly them: HASH pending_confirm (S), RANGE block (N), INCLUDE
+    inscription_id. Each new block's txid list is fetched once and matched
+    locally; only txids never checked this run get a /tx/:txid/status call.
+    """
+    name, key, state_name = "mint", "block", "last_height2.txt"
+    table_name = os.getenv("MINT_TABLE", "mintBlocks")
+
+    PENDING_INDEX = os.getenv("PENDING_INDEX", "pending_confirm-index")
+    PENDING       = "1"                  # pending_confirm value (its mere presence matters)
+    MATCH_BLOCKS  = int(os.getenv("CONFIRM_MATCH_BLOCKS", 12))  # past this, ask per tx instead
+    FILTER        = (Attr("inscription_id").ne("") &
+                     (Attr("confirmed").not_exists() | Attr("confirmed").eq(False)))
+
+    def __init__(self, source: BlockSource):
+        super().__init__(source)
+        self.backfill_mark = STATE_DIR / "pending_confirm.backfilled"
+        self.new: dict[int, dict] = {}      # blocks not yet matched against pending txs
+        self.checked: set[str] = set()      # txids seen unconfirmed by a status call
+        self.startup = True
+
+    def start(self, tip: int) -> None:
+        super().start(tip)
+        self.backfill_pending()
+
+    def accept(self, b: dict) -> None:
+        self.buf.put({
+            "block": b["height"],
+            "hash": b["id"],
+            "mined_at": b["timestamp"],
+            "added_at": int(time.time()*1000),
+            "status": "available",
+            "inscription_id": "",
+            "confirmed": False,
+        }, then=lambda: self.announce_block(b))
+        BLOCKS.inc(sink=self.name, result="inserted")
+        print("mint: queued block", b["height"])
+        self.new[b["height"]] = b
+
+    def after_poll(self) -> None:
+        # a tx can only confirm in a new block: check on tip advance (+ once at start)
+        if self.new or self.startup:
+            self.confirm_pending([self.new[h] for h in sorted(self.new)])
+            self.new, self.startup = {}, False
+
+    # ── confirmations ─────────────────────────────────────
+    def _all(self, op, **kw) -> list[dict]:
+        items = []
+        while True:
+            resp = op(**kw)
+            items += resp.get("Items", [])
+            if "LastEvaluatedKey" not in resp:
+                return items
+            kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def pending_items(self) -> list[dict]:
+        """Rows awaiting confirmation – from the index, or a scan if it is missing."""
+        try:
+            return self._all(self.table.query, IndexName=self.PENDING_INDEX,
+                             KeyConditionExpression=Key("pending_confirm").eq(self.PENDING),
+                             ProjectionExpression="#b, inscription_id",
+                             ExpressionAttributeNames={"#b": "block"})
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] not in ("ValidationException",
+                                                     "ResourceNotFoundException"):
+                raise
+            print(f"WARN {self.PENDING_INDEX} unavailable ({exc}); scanning instead")
+            # ↓ alias the reserved word “block”
+            return self._all(self.table.scan, FilterExpression=self.FILTER,
+                             ProjectionExpression="#b, inscription_id",
+                             ExpressionAttributeNames={"#b": "block"})
+
+    def backfill_pending(self) -> None:
+        """Once: tag rows that got an inscription before pending_confirm existed."""
+        if self.backfill_mark.exists():
+            return
+        rows = self._all(self.table.scan,
+                         FilterExpression=self.FILTER & Attr("pending_confirm").not_exists(),
+                         ProjectionExpression="#b", ExpressionAttributeNames={"#b": "block"})
+        for it in rows:
+            self.buf.update({"block": int(it["block"])}, pending_confirm=self.PENDING)
+        self.buf.flush()
+        atomic_write(self.backfill_mark, str(len(rows)))
+        print(f"tagged {len(rows)} unconfirmed rows with pending_confirm")
+
+    @staticmethod
+    def tx_confirmed_many(txids) -> dict[str, bool]:
+        """Only "confirmed" is final, so only that answer is cached."""
+        cache, txids = get_cache(), set(txids)
+        out = {t: True for t in cache.get_many("tx_confirmed", txids)}
+        todo = [t for t in txids if t not in out]
+        for txid, r in zip(todo, http.fetch_many(API_TX_STAT.format(t) for t in todo)):
+            ok = not isinstance(r, Exception) and r.is_success and r.json().get("confirmed", False)
+            if ok:
+                cache.put("tx_confirmed", txid, True)
+            out[txid] = ok
+        return out
+
+    def confirm_pending(self, new_blocks: list[dict]) -> None:
+        """
+        Flip confirmed=True for pending rows whose tx is in one of new_blocks.
+        Pending txids not yet checked this run (e.g. on startup) – or all of
+        them after a catch-up too long to match block by block – are asked
+        about directly.
+        """
+        by_tx: dict[str, list[int]] = {}
+        for it in self.pending_items():
+            by_tx.setdefault(it["inscription_id"].split("i")[0], []).append(int(it["block"]))
+        if not by_tx:
+            return
+
+        found = set()
+        if len(new_blocks) <= self.MATCH_BLOCKS:
+            for txids in self.source.fetch_txids(b["id"] for b in new_blocks):
+                found |= by_tx.keys() & set(txids)
+            ask = [t for t in by_tx if t not in found and t not in self.checked]
+        else:
+            ask = list(by_tx)
+        if ask:
+            status = self.tx_confirmed_many(ask)
+            found |= {t for t, ok in status.items() if ok}
+            self.checked.update(t for t, ok in status.items() if not ok)
+        self.checked.difference_update(found)
+
+        print(f"confirmations: {len(by_tx)} pending, {len(found)} confirmed, "
+              f"{len(ask)} status calls")
+        CONFIRMS.inc(len(by_tx) - len(found), confirmed=False)
+        for txid in found:
+            for blk in by_tx[txid]:
+                CONFIRMS.inc(confirmed=True)
+                print(f"  ✓ block {blk}  tx {txid[:8]}… confirmed")
+                self.buf.update({"block": blk}, confirmed=True, remove=("pending_confirm",),
+                                then=lambda blk=blk: announce(
+                                    {"block": blk, "table": self.table_name, "confirmed": True}))
+        self.buf.flush()
+
+
+SINKS = {"index": IndexSink, "mint": MintSink}
+
+
+# ── main loop ───────────────────────────────────────────────
+def main(names=None):
+    names = names or list(SINKS)
+    unknown = set(names) - SINKS.keys()
+    if unknown:
+        sys.exit(f"unknown sink(s): {', '.join(sorted(unknown))} (have {', '.join(SINKS)})")
+    metrics.start_exporter("ingest" if len(names) > 1 else f"ingest_{names[0]}")
+    source = get_source()
+    sinks = [SINKS[n](source) for n in names]
+    tip = source.tip_height()
+    for s in sinks:
+        s.start(tip)
+    print(f"ingest ▶ {', '.join(names)} from {source.name}")
+
+    while True:
+        try:
+            tip = source.tip_height()
+            lo = min(s.last for s in sinks)
+            if tip > lo:
+                # fetched once for every sink; each sink's rows are written
+                # in batches and its height checkpointed once they have landed
+                blk, seen_at = None, time.time()
+                try:
+                    for blk in source.catch_up(lo, tip):
+                        blk["trace"] = trace.new(blk, seen_at)
+                        for s in sinks:
+                            if blk["height"] > s.last:
+                                s.feed(blk)
+                finally:
+                    for s in sinks:
+                        s.buf.flush()
+                if blk is not None:
+                    source.seen(blk)
+            for s in sinks:
+                s.after_poll()
+        except Exception as e:
+            print("ERROR:", e)
+        source.wait(tip)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# --------------------------------------------------------------
+# job_worker.py – long-lived looper worker driven by app.py
+#
+# Imports both loopers once (boto3, Playwright, …) and then runs
+# jobs read from stdin, one JSON object per line:
+#     {"id": "<job id>", "kind": "auth" | "index" | "both"}
+# ("both" is the streaming pipeline: blocks move to the index stage
+# as soon as their authParent is written – see pipeline.py)
+# Events go to stdout, one JSON object per line:
+#     {"id", "event": "progress", "stage", "block"}
+#     {"id", "event": "done"} | {"id", "event": "failed", "error"}
+#
+# Every job holds the STATE_DIR flock of each stage it touches
+# (checkpoint.exclusive), so jobs started from different API workers –
+# or the run_both.py timer – wait for each other instead of running
+# the same looper twice.
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import json, sys
+from pathlib import Path
+
+# the protocol owns the real stdout; stray prints go to stderr
+_out, sys.stdout = sys.stdout, sys.stderr
+
+import authLooperBackend
+import indexLooper
+import pipeline
+from checkpoint import exclusive
+
+STAGES = {
+    "auth" : [("auth", authLooperBackend.main)],
+    "index": [("index", indexLooper.main)],
+    "both" : [("auth", pipeline.main)],      # reports its own stage per block
+}
+LOCKS = {
+    "auth" : ("auth",),
+    "index": ("index",),
+    "both" : ("auth", "index"),
+}
+
+
+def lock_paths(kind: str) -> list[Path]:
+    return [authLooperBackend.STATE_DIR / f"{s}.lock" for s in LOCKS[kind]]
+
+
+def _send(msg: dict) -> None:
+    _out.write(json.dumps(msg) + "\n")
+    _out.flush()
+
+
+def main() -> None:
+    for line in sys.stdin:
+        try:
+            req = json.loads(line)
+            job_id, stages, locks = req["id"], STAGES[req["kind"]], lock_paths(req["kind"])
+        except (ValueError, KeyError) as exc:
+            print("job_worker: bad request:", line.strip(), exc)
+            continue
+        try:
+            with exclusive(*locks):
+                for stage, fn in stages:
+                    fn(progress=lambda blk, stage=stage:
+                       _send({"id": job_id, "event": "progress",
+                              "stage": stage, "block": int(blk)}))
+            _send({"id": job_id, "event": "done"})
+        except Exception as exc:
+            _send({"id": job_id, "event": "failed", "error": repr(exc)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# --------------------------------------------------------------
+# metrics.py – dependency-free Prometheus-style metrics
+#   • Counter / Gauge / Histogram with labels
+#   • DynamoDB call accounting via botocore events
+#   • export: /metrics (app.py), node_exporter textfile, Pushgateway
+#
+# Env (scripts):
+#   METRICS_TEXTFILE   write <path> every METRICS_INTERVAL s (atomic);
+#                      "{job}" in the path is replaced by the script name
+#   METRICS_PUSHGATEWAY  PUT to <url>/metrics/job/<job> instead
+#   METRICS_INTERVAL   seconds between exports (default 15)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import atexit, json, os, threading, time
+from bisect import bisect_left
+from pathlib import Path
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+
+def _key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(n, "")) for n in labelnames)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            return [("", dict(zip(self.labelnames, k)), v)
+                    for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, n: float = 1, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0) + n
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, v: float, **labels) -> None:
+        with self._lock:
+            self._values[_key(self.labelnames, labels)] = v
+
+    def inc(self, n: float = 1, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0) + n
+
+    def dec(self, n: float = 1, **labels) -> None:
+        self.inc(-n, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, v: float, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            counts, total = self._values.get(k, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, v)] += 1
+            self._values[k] = (counts, total + v)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(k, list(c), s) for k, (c, s) in self._values.items()]
+        for k, counts, total in items:
+            base = dict(zip(self.labelnames, k))
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                out.append(("_bucket", {**base, "le": _fmt(le)}, acc))
+            out.append(("_sum", base, total))
+            out.append(("_count", base, acc))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labelnames, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labelnames, **kw)
+            return m
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def collect(self) -> list[dict]:
+        """JSON-safe snapshot: [{name, type, help, samples: [[suffix, labels, value]]}]."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [{"name": m.name, "type": m.kind, "help": m.help,
+                 "samples": [list(s) for s in m.samples()]} for m in metrics]
+
+    def render(self) -> str:
+        return render(self.collect())
+
+
+REGISTRY = Registry()
+
+
+# ── text exposition ───────────────────────────────────────────
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def _esc(v: str) -> str:
+    return str(v).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def render(families: list[dict]) -> str:
+    lines = []
+    for f in families:
+        lines.append(f"# HELP {f['name']} {f['help']}")
+        lines.append(f"# TYPE {f['name']} {f['type']}")
+        for suffix, labels, value in f["samples"]:
+            lbl = ",".join(f'{k}="{_esc(v)}"' for k, v in labels.items())
+            lines.append(f"{f['name']}{suffix}{{{lbl}}} {_fmt(value)}" if lbl
+                         else f"{f['name']}{suffix} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def merge(snapshots: dict[str, list[dict]], label: str = "worker") -> list[dict]:
+    """Fold per-process collect() snapshots into one set of families."""
+    out: dict[str, dict] = {}
+    for who, families in snapshots.items():
+        for f in families:
+            fam = out.setdefault(f["name"], {**f, "samples": []})
+            fam["samples"] += [[s, {**l, label: who}, v] for s, l, v in f["samples"]]
+    return list(out.values())
+
+
+# ── DynamoDB accounting ───────────────────────────────────────
+DDB_CALLS    = REGISTRY.counter("dynamodb_calls_total", "DynamoDB API calls", ("op", "table"))
+DDB_SECONDS  = REGISTRY.histogram("dynamodb_call_seconds", "DynamoDB call latency", ("op",))
+DDB_CAPACITY = REGISTRY.counter("dynamodb_consumed_capacity_total",
+                                "Capacity units consumed", ("op", "table"))
+DDB_ERRORS   = REGISTRY.counter("dynamodb_errors_total", "DynamoDB errors", ("op", "code"))
+DDB_CCF      = REGISTRY.counter("dynamodb_conditional_check_failed_total",
+                                "Failed ConditionExpressions (incl. inside transactions)",
+                                ("op", "table"))
+
+_CAPACITY_OPS = {"GetItem", "PutItem", "UpdateItem", "DeleteItem", "Scan", "Query",
+                 "BatchGetItem", "BatchWriteItem", "TransactWriteItems", "TransactGetItems"}
+
+
+def _before_params(params, model, context, **kw):
+    if model.name in _CAPACITY_OPS:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+    context["_m_table"] = params.get("TableName", "")
+
+
+def _before_call(model, context, **kw):
+    context["_m_t0"] = time.perf_counter()
+
+
+def _after_call(http_response, parsed, model, context, **kw):
+    op, table = model.name, context.get("_m_table", "")
+    DDB_CALLS.inc(op=op, table=table)
+    if "_m_t0" in context:
+        DDB_SECONDS.observe(time.perf_counter() - context["_m_t0"], op=op)
+    cap = parsed.get("ConsumedCapacity")
+    for c in cap if isinstance(cap, list) else [cap] if cap else []:
+        DDB_CAPACITY.inc(float(c.get("CapacityUnits", 0)),
+                         op=op, table=c.get("TableName", table))
+    code = parsed.get("Error", {}).get("Code")
+    if code:
+        DDB_ERRORS.inc(op=op, code=code)
+        if code == "ConditionalCheckFailedException":
+            DDB_CCF.inc(op=op, table=table)
+        for r in parsed.get("CancellationReasons") or []:
+            if r.get("Code") == "ConditionalCheckFailed":
+                DDB_CCF.inc(op=op, table=table)
+
+
+def _after_call_error(exception, context, event_name="", **kw):
+    """Transport-level failures (timeouts, connection resets) – no parsed body."""
+    op = event_name.rsplit(".", 1)[-1]
+    DDB_CALLS.inc(op=op, table=context.get("_m_table", ""))
+    DDB_ERRORS.inc(op=op, code=type(exception).__name__)
+
+
+def instrument_dynamodb(obj) -> None:
+    """Hook a boto3 DynamoDB resource, Table or client (idempotent per client)."""
+    client = getattr(getattr(obj, "meta", None), "client", None) or obj
+    ev = getattr(client.meta, "events", None)
+    if ev is None or getattr(client, "_metrics_hooked", False):
+        return                                  # storage.py's SQLite engine has no events
+    ev.register("before-parameter-build.dynamodb", _before_params)
+    ev.register("before-call.dynamodb", _before_call)
+    ev.register("after-call.dynamodb", _after_call)
+    ev.register("after-call-error.dynamodb", _after_call_error)
+    client._metrics_hooked = True
+
+
+# ── script exporters ──────────────────────────────────────────
+def write_textfile(path: str | Path, registry: Registry = REGISTRY) -> None:
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(registry.render())
+    os.replace(tmp, path)
+
+
+def push(url: str, job: str, registry: Registry = REGISTRY) -> None:
+    import requests
+    requests.put(f"{url.rstrip('/')}/metrics/job/{job}",
+                 data=registry.render().encode(), timeout=5).raise_for_status()
+
+
+def export(job: str) -> None:
+    """One export to whatever METRICS_TEXTFILE / METRICS_PUSHGATEWAY points at."""
+    try:
+        if os.getenv("METRICS_TEXTFILE"):
+            write_textfile(os.environ["METRICS_TEXTFILE"].format(job=job))
+        if os.getenv("METRICS_PUSHGATEWAY"):
+            push(os.environ["METRICS_PUSHGATEWAY"], job)
+    except Exception as exc:
+        print("WARN metrics export failed:", exc)
+
+
+_exporting: set[str] = set()
+
+
+def start_exporter(job: str) -> None:
+    """
+    Background export every METRICS_INTERVAL s plus one at exit; no-op if
+    unconfigured or already running for this job (warm job workers call
+    main() many times).
+    """
+    if not (os.getenv("METRICS_TEXTFILE") or os.getenv("METRICS_PUSHGATEWAY")):
+        return
+    if job in _exporting:
+        return
+    _exporting.add(job)
+    every = float(os.getenv("METRICS_INTERVAL", 15))
+
+    def loop():
+        while True:
+            time.sleep(every)
+            export(job)
+
+    threading.Thread(target=loop, daemon=True).start()
+    atexit.register(export, job)
+
+
+def dump_snapshot(path: str | Path, registry: Registry = REGISTRY) -> None:
+    """collect() as JSON – how API workers share metrics with each other."""
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(registry.collect()))
+    os.replace(tmp, path)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# --------------------------------------------------------------
+# pipeline.py – auth → index as one streaming pass
+#   • the auth stage (authLooperBackend.main) hands each block to
+#     the index stage as soon as its authParent write has been sent,
+#     instead of the index stage waiting for the whole auth backlog
+#   • rows that already had authParent (the index backlog) are fed
+#     in alongside; a block both producers queue (auth wrote it while
+#     the backlog scan was running) is indexed once
+#   • a bounded queue between the stages is the backpressure: a
+#     full queue stalls the auth stage until indexing catches up
+#   • one progress report for both stages (log line every
+#     PIPELINE_REPORT_SECS, progress(block, stage=…) per block)
+#   • --follow: run for good on the durable work queue instead
+#     (work_queue.py) – ingest.py enqueues each new block for "auth",
+#     the auth stage hands it on to "index" once written; the full
+#     scan above becomes the timer's reconciliation sweep
+#
+#   python pipeline.py              # one sweep over everything pending
+#   python pipeline.py --follow     # consume the work queue
+#
+# Env:
+#   PIPELINE_QUEUE        blocks buffered between the stages (default 64)
+#   PIPELINE_AUTH_WIDTH   blocks resolved at once by the auth stage (default: pool size)
+#   PIPELINE_INDEX_WIDTH  same for the index stage (default: pool size)
+#   PIPELINE_REPORT_SECS  progress log interval (default 30)
+#   FOLLOW_POLL_SECS      --follow: idle wait between queue checks (default 2)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import logging, os, queue, sys, threading, time
+
+import authLooperBackend
+import indexLooper
+import metrics
+from result_cache import get_cache
+from widget_pool import get_pool
+from work_queue import get_queue
+from write_buffer import WriteBuffer
+
+log = logging.getLogger("pipeline")
+log.setLevel(logging.INFO)
+if not log.handlers:
+    _h = logging.StreamHandler()
+    _h.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    log.addHandler(_h)
+
+QUEUE_MAX   = int(os.getenv("PIPELINE_QUEUE", 64))
+AUTH_WIDTH  = int(os.getenv("PIPELINE_AUTH_WIDTH", 0)) or None
+INDEX_WIDTH = int(os.getenv("PIPELINE_INDEX_WIDTH", 0)) or None
+REPORT_SECS = float(os.getenv("PIPELINE_REPORT_SECS", 30))
+FOLLOW_POLL = float(os.getenv("FOLLOW_POLL_SECS", 2))
+
+_DONE = object()                       # one per producer, closes the queue
+
+LATENCY = metrics.REGISTRY.histogram("pipeline_block_seconds",
+                                     "Auth written → index written, per block", (),
+                                     buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 900))
+DEPTH   = metrics.REGISTRY.gauge("pipeline_queue_depth", "Blocks waiting for the index stage")
+
+
+class Progress:
+    """Per-stage counts, reported together."""
+
+    def __init__(self, progress=None):
+        self.done = {"auth": 0, "index": 0}
+        self._cb = progress
+        self._lock = threading.Lock()
+        self._t0 = self._last = time.monotonic()
+
+    def __call__(self, stage: str, blk: int) -> None:
+        with self._lock:
+            self.done[stage] += 1
+        if self._cb:
+            self._cb(blk, stage=stage)
+
+    def report(self, queued: int, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < REPORT_SECS:
+            return
+        self._last = now
+        log.info("pipeline: auth %d · index %d · queued %d · %.0fs",
+                 self.done["auth"], self.done["index"], queued, now - self._t0)
+
+
+def main(progress=None) -> None:
+    """progress(block, stage=…) is called after each block of either stage."""
+    metrics.start_exporter("pipeline")
+    q: queue.Queue = queue.Queue(maxsize=QUEUE_MAX)
+    prog = Progress(progress)
+    queued_at: dict[int, float] = {}
+    errors: list[BaseException] = []
+
+    def feed(blk: int) -> None:
+        queued_at[blk] = time.monotonic()
+        q.put(blk)                           # blocks while the index stage is behind
+        DEPTH.set(q.qsize())
+
+    def backlog() -> None:
+        try:
+            queued = get_queue().blocks("index")      # --follow has those
+            for blk in indexLooper.pending_blocks():
+                if blk not in queued:
+                    q.put(blk)
+        except Exception as exc:
+            log.error("index backlog scan failed: %s", exc)
+        finally:
+            q.put(_DONE)
+
+    def auth() -> None:
+        def written(blk):
+            prog("auth", blk)
+            feed(int(blk))
+        try:
+            authLooperBackend.main(progress=written, width=AUTH_WIDTH)
+        except BaseException as exc:
+            errors.append(exc)
+            log.error("auth stage failed: %s", exc)
+        finally:
+            q.put(_DONE)
+
+    producers = [threading.Thread(target=f, name=f"pipeline-{f.__name__}", daemon=True)
+                 for f in (backlog, auth)]
+    for t in producers:
+        t.start()
+
+    # index stage: take what is ready (at least one block, at most a width's worth)
+    width = INDEX_WIDTH or get_pool().size
+    buf = WriteBuffer(indexLooper.table, ("block_number",))
+
+    def indexed(blk: int) -> None:
+        t = queued_at.pop(blk, None)
+        if t is not None:
+            LATENCY.observe(time.monotonic() - t)
+        prog("index", blk)
+
+    open_producers = len(producers)
+    seen: set[int] = set()
+    while open_producers:
+        chunk = []
+        item = q.get()
+        while True:
+            if item is _DONE:
+                open_producers -= 1
+            elif item not in seen:
+                seen.add(item)
+                chunk.append(item)
+            if len(chunk) >= width:
+                break
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+        DEPTH.set(q.qsize())
+        if chunk:
+            indexLooper.process_blocks(chunk, buf, indexed, width=width)
+            if q.empty():                    # nothing to batch with: don't sit on writes
+                buf.flush()
+        prog.report(q.qsize())
+    buf.flush()
+    prog.report(q.qsize(), force=True)
+    log.info("result cache: %s", get_cache().summary())
+    if errors:
+        raise errors[0]
+
+
+def follow(progress=None) -> None:
+    """
+    Consume the work queue for good: one thread per stage, each leasing
+    up to a width's worth of blocks and acking them once written. A block
+    leased by a worker that dies comes back after WORK_QUEUE_LEASE_SECS.
+    """
+    metrics.start_exporter("pipeline")
+    wq = get_queue()
+    prog = Progress(progress)
+
+    def stage(name: str, looper, width: int, then: str | None) -> None:
+        buf = WriteBuffer(looper.table, ("block_number",))
+
+        def written(blk: int) -> None:
+            if then:
+                wq.put(then, [blk])
+            wq.ack(name, [blk])
+            prog(name, blk)
+
+        while True:
+            try:
+                blocks = wq.lease(name, width)
+                if not blocks:
+                    time.sleep(FOLLOW_POLL)
+                    continue
+                looper.process_blocks(blocks, buf, written, width=width)
+                buf.flush()
+            except Exception as exc:               # leased blocks come back later
+                log.error("%s stage failed: %s", name, exc)
+                time.sleep(FOLLOW_POLL)
+
+    stages = [
+        ("auth", authLooperBackend, AUTH_WIDTH or get_pool().size, "index"),
+        ("index", indexLooper, INDEX_WIDTH or get_pool().size, None),
+    ]
+    for args in stages:
+        threading.Thread(target=stage, args=args, name=f"follow-{args[0]}",
+                         daemon=True).start()
+    log.info("following the work queue: %s", wq.depth())
+    while True:
+        time.sleep(REPORT_SECS)
+        prog.report(sum(wq.depth().values()), force=True)
+
+
+if __name__ == "__main__":
+    if "--follow" in sys.argv[1:]:
+        follow()
+    else:
+        main()
@@ -0,0 +1,111 @@
+# --------------------------------------------------------------
+# result_cache.py – on-disk cache for external lookups, shared by
+# the watchers and loopers (one SQLite file, WAL, many processes)
+#   • keyed by (source, key) – e.g. ("block_ts", 840000)
+#   • ttl=None never expires (immutable facts); volatile answers
+#     and failures get a TTL
+#   • hit / miss / expired counts per source, in-process + metrics
+#
+# Sources in use:
+#   block_ts      height → mined unix time      (watchers, authLooper)
+#   al            block  → authParent           (authLooper)
+#   il            block  → inscription id       (indexLooper)
+#   hiro          insc   → [timestamp, number]  (indexLooper)
+#   tx_confirmed  txid   → true                 (ingest mint sink)
+#
+# Env:
+#   RESULT_CACHE_DB        path (default STATE_DIR/result_cache.sqlite)
+#   RESULT_CACHE_FAIL_TTL  seconds a failed widget resolution is kept (default 3600)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import json, os, sqlite3, threading, time
+from pathlib import Path
+
+import metrics
+
+STATE_DIR = Path(os.getenv("STATE_DIR", Path(__file__).parent / "state"))
+DB_PATH   = os.getenv("RESULT_CACHE_DB", str(STATE_DIR / "result_cache.sqlite"))
+FAIL_TTL  = float(os.getenv("RESULT_CACHE_FAIL_TTL", 3600))
+
+LOOKUPS = metrics.REGISTRY.counter("result_cache_lookups_total", "Result cache lookups",
+                                   ("source", "result"))
+
+
+class ResultCache:
+    def __init__(self, path: str | Path = DB_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                source     TEXT NOT NULL,
+                key        TEXT NOT NULL,
+                value      TEXT NOT NULL,
+                stored_at  REAL NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (source, key)
+            )""")
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, source: str, result: str) -> None:
+        s = self.stats.setdefault(source, {"hit": 0, "miss": 0, "expired": 0})
+        s[result] += 1
+        LOOKUPS.inc(source=source, result=result)
+
+    def get(self, source: str, key, default=None):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM results WHERE source=? AND key=?",
+                (source, str(key))).fetchone()
+            if row is None:
+                self._count(source, "miss")
+                return default
+            if row[1] is not None and row[1] < time.time():
+                self._count(source, "expired")
+                return default
+            self._count(source, "hit")
+        return json.loads(row[0])
+
+    def put(self, source: str, key, value, ttl: float | None = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (source, str(key), json.dumps(value), now,
+                 None if ttl is None else now + ttl))
+
+    def get_many(self, source: str, keys) -> dict:
+        """{key: value} for the keys that are cached and fresh."""
+        out = {}
+        for k in keys:
+            v = self.get(source, k)
+            if v is not None:
+                out[k] = v
+        return out
+
+    def purge(self) -> int:
+        """Drop expired rows; returns how many."""
+        with self._lock:
+            return self._db.execute("DELETE FROM results WHERE expires_at < ?",
+                                    (time.time(),)).rowcount
+
+    def summary(self) -> str:
+        return ", ".join(f"{src} {s['hit']} hit / {s['miss'] + s['expired']} miss"
+                         for src, s in sorted(self.stats.items())) or "no lookups"
+
+
+_cache: ResultCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """Process-wide cache on DB_PATH."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
+# auth ⇒ index, one after the other; `--pipeline` streams blocks from
+# one stage to the next instead (pipeline.py). Holds both stage locks
+# (checkpoint.exclusive) for the whole run, like an API "both" job.
 from __future__ import annotations
 import os, sys, subprocess, time, pathlib
 
-BASE   = pathlib.Path(__file__).parent
-AUTH   = BASE / "authLooperBackend.py"
-INDEX  = BASE / "indexLooper.py"
+from checkpoint import exclusive
+
+BASE     = pathlib.Path(__file__).parent
+AUTH     = BASE / "authLooperBackend.py"
+INDEX    = BASE / "indexLooper.py"
+PIPELINE = BASE / "pipeline.py"
+STATE    = pathlib.Path(os.getenv("STATE_DIR", BASE / "state"))
 
 AUTH_LOCK  = "/tmp/authscript.lock"
 INDEX_LOCK = "/tmp/indexscript.lock"
@@ -21,12 +28,16 @@ def run(script: pathlib.Path):
     return proc
 
 def main():
-    # 1) run Auth and wait
-    p = run(AUTH);  p.wait()           # guarantees lock disappears
-    wait_for_lock(AUTH_LOCK)
+    with exclusive(STATE / "auth.lock", STATE / "index.lock"):
+        if "--pipeline" in sys.argv[1:]:
+            sys.exit(run(PIPELINE).wait())
+
+        # 1) run Auth and wait
+        p = run(AUTH);  p.wait()           # guarantees lock disappears
+        wait_for_lock(AUTH_LOCK)
 
-    # 2) run Inscription
-    run(INDEX).wait()
+        # 2) run Inscription
+        run(INDEX).wait()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,845 @@
+# --------------------------------------------------------------
+# storage.py – where the tables live, chosen by configuration
+#   • resource() is the process's table resource: boto3 DynamoDB
+#     (default) or a local SQLite (WAL) engine with the same surface
+#     for what this repo uses –
+#       Table:  get_item / put_item / update_item / delete_item /
+#               scan / query / batch_writer
+#       client: batch_write_item / transact_write_items / update_item /
+#               exceptions.ConditionalCheckFailedException / …
+#   • SQLite: one table per DynamoDB table, the item as JSON keyed
+#     by its hash key (a real primary key); each GSI is an index on
+#     json_extract() of its key attributes, so a query on it is an
+#     index range read – sparse like DynamoDB's
+#   • Key / Condition / Filter / Update / Projection expressions –
+#     strings or boto3 Attr/Key objects – are evaluated in Python
+#   • numbers come back as Decimal and failures as ClientError with
+#     DynamoDB's error codes, so callers need no backend checks; a
+#     key of the wrong type ("5" for an N key) is a ValidationException
+#     here too, never coerced
+#   • several processes can share the file (API, ingest, loopers)
+#
+# Env:
+#   STORAGE_BACKEND     dynamodb | sqlite (default dynamodb)
+#   STORAGE_PATH        SQLite file (default STATE_DIR/tables.sqlite)
+#   AWS_REGION          dynamodb region (default us-east-1)
+#   DYNAMODB_ENDPOINT   dynamodb endpoint override (local stand-ins)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import json, os, re, sqlite3, threading, zlib
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from botocore.exceptions import ClientError
+
+STATE_DIR = Path(os.getenv("STATE_DIR", Path(__file__).parent / "state"))
+BACKEND   = os.getenv("STORAGE_BACKEND", "dynamodb")
+PATH      = os.getenv("STORAGE_PATH", str(STATE_DIR / "tables.sqlite"))
+REGION    = os.getenv("AWS_REGION", "us-east-1")
+
+# tables the SQLite engine creates on first use:
+#   name → (hash key, key type, {gsi name: (hash attr, range attr | None)})
+TABLES = {
+    "dynamicIndex1": ("block_number", "N", {}),
+    "mintBlocks":    ("block", "N", {"pending_confirm-index": ("pending_confirm", "block")}),
+}
+
+
+# ── errors ──────────────────────────────────────────────────
+def _error(code: str, message: str, op: str, **extra) -> ClientError:
+    return _ERRORS.get(code, ClientError)(
+        {"Error": {"Code": code, "Message": message}, **extra}, op)
+
+
+class ConditionalCheckFailedException(ClientError):
+    pass
+
+
+class TransactionCanceledException(ClientError):
+    pass
+
+
+class ResourceNotFoundException(ClientError):
+    pass
+
+
+_ERRORS = {c.__name__: c for c in (ConditionalCheckFailedException,
+                                   TransactionCanceledException, ResourceNotFoundException)}
+
+
+def _validation(message: str, op: str) -> ClientError:
+    return _error("ValidationException", message, op)
+
+
+# ── values ──────────────────────────────────────────────────
+_MISSING = object()
+
+
+def _norm(v):
+    """Python value → what DynamoDB would hand back (numbers as Decimal)."""
+    if isinstance(v, bool) or v is None or isinstance(v, (str, bytes, Decimal)):
+        return v
+    if isinstance(v, (int, float)):
+        return Decimal(str(v))
+    if isinstance(v, dict):
+        return {k: _norm(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_norm(x) for x in v]
+    if isinstance(v, (set, frozenset)):
+        return {_norm(x) for x in v}
+    raise TypeError(f"unsupported type {type(v).__name__}")
+
+
+def _json_default(v):
+    if isinstance(v, Decimal):
+        return int(v) if v == v.to_integral_value() else float(v)
+    if isinstance(v, (set, frozenset)):
+        return sorted(v)
+    raise TypeError(f"unsupported type {type(v).__name__}")
+
+
+def _dumps(item: dict) -> str:
+    return json.dumps(item, default=_json_default, separators=(",", ":"))
+
+
+def _loads(text: str) -> dict:
+    return json.loads(text, parse_int=Decimal, parse_float=Decimal)
+
+
+def _sql_value(v):
+    """A key / index value as SQLite stores it inside the JSON."""
+    return _json_default(v) if isinstance(v, Decimal) else v
+
+
+def _is_num(v) -> bool:
+    return isinstance(v, Decimal) and not isinstance(v, bool)
+
+
+def _compare(op: str, a, b) -> bool:
+    if a is _MISSING or b is _MISSING:
+        return op == "<>"
+    same = (_is_num(a) and _is_num(b)) or type(a) is type(b)
+    if op == "=":
+        return same and a == b
+    if op == "<>":
+        return not same or a != b
+    if not same or not isinstance(a, (Decimal, str, bytes)):
+        return False
+    return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[op]
+
+
+# ── expressions ─────────────────────────────────────────────
+_TOKEN = re.compile(r"\s*(<>|<=|>=|[=<>(),+\-]|[#:]?[A-Za-z_]\w*|\S)")
+_CLAUSES = {"SET", "REMOVE", "ADD", "DELETE"}
+
+
+class _Parser:
+    """One expression string + its placeholders → a small AST."""
+
+    def __init__(self, text: str, names: dict, values: dict, op: str):
+        self.toks = _TOKEN.findall(text or "")
+        self.i, self.names, self.values, self.op = 0, names or {}, values or {}, op
+
+    def _peek(self, upper: bool = True) -> str | None:
+        if self.i >= len(self.toks):
+            return None
+        return self.toks[self.i].upper() if upper else self.toks[self.i]
+
+    def _next(self) -> str:
+        if self.i >= len(self.toks):
+            raise _validation("unexpected end of expression", self.op)
+        self.i += 1
+        return self.toks[self.i - 1]
+
+    def _expect(self, tok: str) -> None:
+        got = self._next()
+        if got.upper() != tok:
+            raise _validation(f"expected {tok!r}, got {got!r}", self.op)
+
+    def done(self) -> None:
+        if self.i != len(self.toks):
+            raise _validation(f"unexpected {self.toks[self.i]!r}", self.op)
+
+    def name(self) -> str:
+        tok = self._next()
+        if tok.startswith("#"):
+            if tok not in self.names:
+                raise _validation(f"undefined attribute name {tok}", self.op)
+            return self.names[tok]
+        if not re.match(r"[A-Za-z_]", tok):
+            raise _validation(f"bad attribute name {tok!r}", self.op)
+        return tok
+
+    def operand(self):
+        tok = self._peek(upper=False)
+        if tok is None:
+            raise _validation("unexpected end of expression", self.op)
+        if tok.startswith(":"):
+            self.i += 1
+            if tok not in self.values:
+                raise _validation(f"undefined attribute value {tok}", self.op)
+            return ("val", _norm(self.values[tok]))
+        if tok.lower() in ("size", "if_not_exists", "list_append") and \
+                self.toks[self.i + 1:self.i + 2] == ["("]:
+            fn = self._next().lower()
+            self._expect("(")
+            args = [self.operand()]
+            while self._peek() == ",":
+                self.i += 1
+                args.append(self.operand())
+            self._expect(")")
+            return (fn, *args)
+        return ("path", self.name())
+
+    # conditions
+    def condition(self):
+        node = self._and()
+        while self._peek() == "OR":
+            self.i += 1
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() == "AND":
+            self.i += 1
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self._peek() == "NOT":
+            self.i += 1
+            return ("not", self._not())
+        return self._primary()
+
+    _FUNCS = {"ATTRIBUTE_EXISTS", "ATTRIBUTE_NOT_EXISTS", "BEGINS_WITH",
+              "CONTAINS", "ATTRIBUTE_TYPE"}
+
+    def _primary(self):
+        if self._peek() == "(":
+            self.i += 1
+            node = self.condition()
+            self._expect(")")
+            return node
+        if self._peek() in self._FUNCS:
+            fn = self._next().lower()
+            self._expect("(")
+            args = [self.operand()]
+            while self._peek() == ",":
+                self.i += 1
+                args.append(self.operand())
+            self._expect(")")
+            return ("fn", fn, args)
+        left = self.operand()
+        tok = self._peek()
+        if tok in ("=", "<>", "<", "<=", ">", ">="):
+            self.i += 1
+            return ("cmp", tok, left, self.operand())
+        if tok == "BETWEEN":
+            self.i += 1
+            lo = self.operand()
+            self._expect("AND")
+            return ("between", left, lo, self.operand())
+        if tok == "IN":
+            self.i += 1
+            self._expect("(")
+            opts = [self.operand()]
+            while self._peek() == ",":
+                self.i += 1
+                opts.append(self.operand())
+            self._expect(")")
+            return ("in", left, opts)
+        raise _validation(f"expected a comparison after {self.toks[self.i - 1]!r}", self.op)
+
+    # updates
+    def update(self) -> list[tuple]:
+        actions = []
+        while self._peek() is not None:
+            clause = self._next().upper()
+            if clause not in _CLAUSES:
+                raise _validation(f"unexpected {clause!r} in update expression", self.op)
+            while True:
+                attr = self.name()
+                if clause == "SET":
+                    self._expect("=")
+                    value = self.operand()
+                    if self._peek() in ("+", "-"):
+                        value = (self._next(), value, self.operand())
+                    actions.append(("set", attr, value))
+                elif clause == "REMOVE":
+                    actions.append(("remove", attr, None))
+                else:
+                    actions.append((clause.lower(), attr, self.operand()))
+                if self._peek() != ",":
+                    break
+                self.i += 1
+        return actions
+
+
+def _value(node, item: dict):
+    kind = node[0]
+    if kind == "val":
+        return node[1]
+    if kind == "path":
+        return item.get(node[1], _MISSING)
+    if kind == "size":
+        v = _value(node[1], item)
+        return _MISSING if v is _MISSING or _is_num(v) or isinstance(v, bool) \
+            else Decimal(len(v))
+    if kind == "if_not_exists":
+        v = _value(node[1], item)
+        return _value(node[2], item) if v is _MISSING else v
+    if kind == "list_append":
+        return list(_value(node[1], item)) + list(_value(node[2], item))
+    if kind in ("+", "-"):
+        a, b = _value(node[1], item), _value(node[2], item)
+        if not (_is_num(a) and _is_num(b)):
+            raise _validation("arithmetic on a non-number", "UpdateItem")
+        return a + b if kind == "+" else a - b
+    raise _validation(f"bad operand {kind}", "")
+
+
+def _test(node, item: dict) -> bool:
+    kind = node[0]
+    if kind == "or":
+        return _test(node[1], item) or _test(node[2], item)
+    if kind == "and":
+        return _test(node[1], item) and _test(node[2], item)
+    if kind == "not":
+        return not _test(node[1], item)
+    if kind == "cmp":
+        return _compare(node[1], _value(node[2], item), _value(node[3], item))
+    if kind == "between":
+        v = _value(node[1], item)
+        return _compare(">=", v, _value(node[2], item)) and _compare("<=", v, _value(node[3], item))
+    if kind == "in":
+        v = _value(node[1], item)
+        return any(_compare("=", v, _value(o, item)) for o in node[2])
+    fn, args = node[1], node[2]
+    v = _value(args[0], item)
+    if fn == "attribute_exists":
+        return v is not _MISSING
+    if fn == "attribute_not_exists":
+        return v is _MISSING
+    arg = _value(args[1], item)
+    if fn == "begins_with":
+        return isinstance(v, (str, bytes)) and type(v) is type(arg) and v.startswith(arg)
+    if fn == "contains":
+        if isinstance(v, str):
+            return isinstance(arg, str) and arg in v
+        return isinstance(v, (list, set)) and arg in v
+    if fn == "attribute_type":
+        return v is not _MISSING and _type_tag(v) == arg
+    raise _validation(f"unknown function {fn}", "")
+
+
+def _type_tag(v) -> str:
+    if isinstance(v, bool):
+        return "BOOL"
+    if v is None:
+        return "NULL"
+    return {str: "S", bytes: "B", Decimal: "N", dict: "M", list: "L"}.get(type(v), "SS")
+
+
+class _Expr:
+    """The expression keyword arguments of one call, parsed on demand."""
+
+    def __init__(self, kw: dict, op: str):
+        self.kw, self.op = kw, op
+        self.names  = dict(kw.get("ExpressionAttributeNames") or {})
+        self.values = dict(kw.get("ExpressionAttributeValues") or {})
+        self._builder = ConditionExpressionBuilder()
+
+    def _text(self, key: str, is_key: bool = False) -> str | None:
+        expr = self.kw.get(key)
+        if isinstance(expr, ConditionBase):
+            built = self._builder.build_expression(expr, is_key_condition=is_key)
+            self.names.update(built.attribute_name_placeholders)
+            self.values.update(built.attribute_value_placeholders)
+            return built.condition_expression
+        return expr
+
+    def condition(self, key: str, is_key: bool = False):
+        text = self._text(key, is_key)
+        if not text:
+            return None
+        p = _Parser(text, self.names, self.values, self.op)
+        node = p.condition()
+        p.done()
+        return node
+
+    def update(self) -> list[tuple]:
+        p = _Parser(self.kw.get("UpdateExpression"), self.names, self.values, self.op)
+        actions = p.update()
+        p.done()
+        return actions
+
+    def projection(self) -> list[str] | None:
+        text = self.kw.get("ProjectionExpression")
+        if not text:
+            return None
+        return [self.names.get(a.strip(), a.strip()) for a in text.split(",")]
+
+
+def _project(item: dict, attrs: list[str] | None) -> dict:
+    return item if attrs is None else {a: item[a] for a in attrs if a in item}
+
+
+def _eq_on(node, attr: str):
+    """The value `attr` must equal for node to hold (top-level AND), or _MISSING."""
+    if node is None:
+        return _MISSING
+    if node[0] == "and":
+        v = _eq_on(node[1], attr)
+        return v if v is not _MISSING else _eq_on(node[2], attr)
+    if node[0] == "cmp" and node[1] == "=":
+        a, b = node[2], node[3]
+        if a == ("path", attr) and b[0] == "val":
+            return b[1]
+        if b == ("path", attr) and a[0] == "val":
+            return a[1]
+    return _MISSING
+
+
+def _plain(v):
+    """A low-level attribute value ({"N": "5"}) → Python; anything else as is."""
+    if isinstance(v, dict) and len(v) == 1:
+        (tag, x), = v.items()
+        if tag == "S":
+            return x
+        if tag == "N":
+            return Decimal(x)
+        if tag == "BOOL":
+            return x
+        if tag == "NULL":
+            return None
+        if tag == "M":
+            return {k: _plain(y) for k, y in x.items()}
+        if tag == "L":
+            return [_plain(y) for y in x]
+    return v
+
+
+# ── SQLite engine ───────────────────────────────────────────
+def _segment(pk, total: int) -> int:
+    """Parallel-scan segment of a stored key (SQL function `segment`)."""
+    return (pk if isinstance(pk, int) else zlib.crc32(str(pk).encode())) % total
+
+
+def _json_col(attr: str) -> str:
+    """SQL for one top-level attribute of the stored item (what GSIs index)."""
+    return "json_extract(item, '$.\"" + attr.replace("'", "''").replace('"', '\\"') + "\"')"
+
+
+class SqliteTable:
+    def __init__(self, engine: "SqliteResource", name: str):
+        self._engine = engine
+        self.name = self.table_name = name
+        self.meta = SimpleNamespace(client=engine.meta.client)
+
+    @property
+    def _schema(self):
+        return self._engine.schema(self.name)
+
+    def _sql(self) -> str:
+        return '"t_' + self.name.replace('"', '""') + '"'
+
+    def _pk(self, key: dict, op: str):
+        hash_key, key_type, _ = self._schema
+        if set(key) != {hash_key}:
+            raise _validation(f"key must be exactly {{{hash_key!r}}}", op)
+        v = _norm(key[hash_key])
+        if (key_type == "N" and not _is_num(v)) or (key_type == "S" and not isinstance(v, str)):
+            raise _validation("One or more parameter values were invalid: Type mismatch "
+                              f"for key {hash_key} expected: {key_type}", op)
+        return _sql_value(v)
+
+    def _item(self, item: dict, op: str) -> tuple:
+        """(pk, normalised item) for a full row."""
+        hash_key, key_type, _ = self._schema
+        if hash_key not in item:
+            raise _validation(f"missing key {hash_key}", op)
+        pk = self._pk({hash_key: item[hash_key]}, op)
+        item = {k: _norm(v) for k, v in item.items()}
+        item[hash_key] = _norm(pk)
+        return pk, item
+
+    # single-row reads / writes (the engine lock is held by the caller for writes)
+    def _read(self, pk) -> dict | None:
+        row = self._engine.db.execute(f"SELECT item FROM {self._sql()} WHERE pk=?",
+                                      (pk,)).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _write(self, pk, item: dict | None) -> None:
+        if item is None:
+            self._engine.db.execute(f"DELETE FROM {self._sql()} WHERE pk=?", (pk,))
+        else:
+            self._engine.db.execute(f"INSERT OR REPLACE INTO {self._sql()} (pk, item) "
+                                    f"VALUES (?, ?)", (pk, _dumps(item)))
+
+    def _check(self, ex: _Expr, old: dict | None, op: str) -> None:
+        cond = ex.condition("ConditionExpression")
+        if cond is not None and not _test(cond, old or {}):
+            raise _error("ConditionalCheckFailedException", "The conditional request failed", op)
+
+    def _updated(self, ex: _Expr, pk, old: dict | None, op: str) -> dict:
+        hash_key = self._schema[0]
+        base = old or {hash_key: _norm(pk)}
+        new = dict(base)
+        for action, attr, node in ex.update():
+            if attr == hash_key:
+                raise _validation(f"cannot update key attribute {attr}", op)
+            if action == "set":
+                new[attr] = _value(node, base)
+                if new[attr] is _MISSING:
+                    raise _validation("The provided expression refers to an attribute "
+                                      "that does not exist in the item", op)
+            elif action == "remove":
+                new.pop(attr, None)
+            elif action == "add":
+                v, cur = _value(node, base), new.get(attr, _MISSING)
+                if _is_num(v):
+                    new[attr] = v + (cur if cur is not _MISSING else 0)
+                elif isinstance(v, set):
+                    new[attr] = (cur if cur is not _MISSING else set()) | v
+                else:
+                    raise _validation("ADD needs a number or a set", op)
+            else:                                       # delete (from a set)
+                cur = new.get(attr)
+                if isinstance(cur, set):
+                    new[attr] = cur - _value(node, base)
+                    if not new[attr]:
+                        del new[attr]
+        return new
+
+    @staticmethod
+    def _returned(kw: dict, old: dict | None, new: dict | None) -> dict:
+        rv = kw.get("ReturnValues", "NONE")
+        if rv == "ALL_NEW" and new is not None:
+            return {"Attributes": new}
+        if rv == "ALL_OLD" and old is not None:
+            return {"Attributes": old}
+        return {}
+
+    def get_item(self, Key: dict, **kw) -> dict:
+        ex = _Expr(kw, "GetItem")
+        with self._engine.lock:
+            item = self._read(self._pk(Key, "GetItem"))
+        return {"Item": _project(item, ex.projection())} if item is not None else {}
+
+    def put_item(self, Item: dict, **kw) -> dict:
+        ex = _Expr(kw, "PutItem")
+        pk, item = self._item(Item, "PutItem")
+        with self._engine.write():
+            old = self._read(pk)
+            self._check(ex, old, "PutItem")
+            self._write(pk, item)
+        return self._returned(kw, old, None)
+
+    def update_item(self, Key: dict, **kw) -> dict:
+        ex = _Expr(kw, "UpdateItem")
+        pk = self._pk(Key, "UpdateItem")
+        with self._engine.write():
+            old = self._read(pk)
+            self._check(ex, old, "UpdateItem")
+            new = self._updated(ex, pk, old, "UpdateItem")
+            self._write(pk, new)
+        return self._returned(kw, old, new)
+
+    def delete_item(self, Key: dict, **kw) -> dict:
+        ex = _Expr(kw, "DeleteItem")
+        pk = self._pk(Key, "DeleteItem")
+        with self._engine.write():
+            old = self._read(pk)
+            self._check(ex, old, "DeleteItem")
+            self._write(pk, None)
+        return self._returned(kw, old, None)
+
+    def batch_writer(self, overwrite_by_pkeys=None) -> "_BatchWriter":
+        return _BatchWriter(self)
+
+    # reads over many rows
+    def _page(self, rows, ex: _Expr, key_of, kw: dict) -> dict:
+        """Filter / project / paginate rows (pk-ordered dicts) like Scan and Query."""
+        filt = ex.condition("FilterExpression")
+        attrs = ex.projection()
+        limit = kw.get("Limit")
+        items, scanned, last = [], 0, None
+        for it in rows:
+            scanned += 1
+            if filt is None or _test(filt, it):
+                items.append(_project(it, attrs))
+            if limit and scanned >= limit:
+                last = key_of(it)
+                break
+        out = {"Items": items, "Count": len(items), "ScannedCount": scanned}
+        if kw.get("Select") == "COUNT":
+            del out["Items"]
+        if last is not None:
+            out["LastEvaluatedKey"] = last
+        return out
+
+    def scan(self, **kw) -> dict:
+        """One page is one primary-key range read: start key, segment and Limit are SQL."""
+        ex = _Expr(kw, "Scan")
+        hash_key = self._schema[0]
+        where, args = [], []
+        if kw.get("ExclusiveStartKey"):
+            where.append("pk > ?")
+            args.append(self._pk({hash_key: kw["ExclusiveStartKey"][hash_key]}, "Scan"))
+        if kw.get("TotalSegments"):
+            where.append("segment(pk, ?) = ?")
+            args += [kw["TotalSegments"], kw.get("Segment", 0)]
+        sql = f"SELECT item FROM {self._sql()}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY pk"
+        if kw.get("Limit"):
+            sql += " LIMIT ?"
+            args.append(kw["Limit"])
+        with self._engine.lock:
+            rows = self._engine.db.execute(sql, args).fetchall()
+        return self._page((_loads(r[0]) for r in rows), ex,
+                          lambda it: {hash_key: it[hash_key]}, kw)
+
+    def query(self, **kw) -> dict:
+        ex = _Expr(kw, "Query")
+        hash_key, _, indexes = self._schema
+        index = kw.get("IndexName")
+        if index is not None and index not in indexes:
+            raise _validation(f"The table does not have the specified index: {index}", "Query")
+        qhash, qrange = indexes[index] if index else (hash_key, None)
+        keycond = ex.condition("KeyConditionExpression", is_key=True)
+        want = _eq_on(keycond, qhash)
+        if want is _MISSING:
+            raise _validation(f"query needs {qhash} = :value", "Query")
+
+        if index is None:
+            with self._engine.lock:
+                item = self._read(self._pk({hash_key: want}, "Query"))
+            rows = [item] if item is not None else []
+        else:
+            order = f"{_json_col(qrange)}, pk" if qrange else "pk"
+            with self._engine.lock:
+                rows = [_loads(r[0]) for r in self._engine.db.execute(
+                    f"SELECT item FROM {self._sql()} WHERE {_json_col(qhash)} = ? ORDER BY {order}",
+                    (_sql_value(want),))]
+        rows = [it for it in rows if _test(keycond, it)]
+        if not kw.get("ScanIndexForward", True):
+            rows.reverse()
+
+        def key_of(it):
+            k = {hash_key: it[hash_key]}
+            if index:
+                k.update((a, it[a]) for a in (qhash, qrange) if a)
+            return k
+
+        start = kw.get("ExclusiveStartKey")
+        if start:
+            keys = [key_of(it) for it in rows]
+            norm = {k: _norm(v) for k, v in start.items()}
+            rows = rows[keys.index(norm) + 1:] if norm in keys else []
+        return self._page(rows, ex, key_of, kw)
+
+
+class _BatchWriter:
+    """table.batch_writer(): writes go straight through, one transaction per flush."""
+
+    def __init__(self, table: SqliteTable):
+        self._table, self._ops = table, []
+
+    def put_item(self, Item: dict) -> None:
+        self._ops.append({"PutRequest": {"Item": Item}})
+        if len(self._ops) >= 25:
+            self.flush()
+
+    def delete_item(self, Key: dict) -> None:
+        self._ops.append({"DeleteRequest": {"Key": Key}})
+        if len(self._ops) >= 25:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._ops:
+            self._table.meta.client.batch_write_item(RequestItems={self._table.name: self._ops})
+            self._ops = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+class SqliteClient:
+    """The resource's `meta.client`: the multi-item calls."""
+
+    exceptions = SimpleNamespace(**_ERRORS, ClientError=ClientError)
+
+    def __init__(self, engine: "SqliteResource"):
+        self._engine = engine
+        self.meta = SimpleNamespace(region_name="local")
+
+    def batch_write_item(self, RequestItems: dict, **kw) -> dict:
+        with self._engine.write():
+            for name, reqs in RequestItems.items():
+                t = self._engine.Table(name)
+                for r in reqs:
+                    if "PutRequest" in r:
+                        t._write(*t._item(r["PutRequest"]["Item"], "BatchWriteItem"))
+                    else:
+                        t._write(t._pk(r["DeleteRequest"]["Key"], "BatchWriteItem"), None)
+        return {"UnprocessedItems": {}}
+
+    def update_item(self, TableName: str, Key: dict, **kw) -> dict:
+        """Client-style UpdateItem: plain or low-level ({"N": "5"}) values."""
+        if kw.get("ExpressionAttributeValues"):
+            kw["ExpressionAttributeValues"] = {
+                k: _plain(v) for k, v in kw["ExpressionAttributeValues"].items()}
+        return self._engine.Table(TableName).update_item(
+            Key={k: _plain(v) for k, v in Key.items()}, **kw)
+
+    def transact_write_items(self, TransactItems: list, **kw) -> dict:
+        """All conditions checked first; one failing cancels every write."""
+        op = "TransactWriteItems"
+        with self._engine.write():
+            plan, reasons = [], []
+            for entry in TransactItems:
+                (kind, spec), = entry.items()
+                t = self._engine.Table(spec["TableName"])
+                spec = {**spec, "ExpressionAttributeValues":
+                        {k: _plain(v) for k, v in (spec.get("ExpressionAttributeValues") or {}).items()}}
+                ex = _Expr(spec, op)
+                if kind == "Put":
+                    pk, new = t._item({k: _plain(v) for k, v in spec["Item"].items()}, op)
+                else:
+                    pk = t._pk({k: _plain(v) for k, v in spec["Key"].items()}, op)
+                    new = None
+                old = t._read(pk)
+                try:
+                    t._check(ex, old, op)
+                    reasons.append({"Code": "None"})
+                except ConditionalCheckFailedException:
+                    reasons.append({"Code": "ConditionalCheckFailed",
+                                    "Message": "The conditional request failed"})
+                    continue
+                if kind == "Update":
+                    new = t._updated(ex, pk, old, op)
+                if kind != "ConditionCheck":
+                    plan.append((t, pk, new))
+            if any(r["Code"] != "None" for r in reasons):
+                raise _error("TransactionCanceledException", "Transaction cancelled", op,
+                             CancellationReasons=reasons)
+            for t, pk, new in plan:
+                t._write(pk, new)
+        return {}
+
+
+class SqliteResource:
+    """boto3.resource("dynamodb") look-alike over one SQLite file."""
+
+    def __init__(self, path: str | Path = PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=30, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.create_function("segment", 2, _segment, deterministic=True)
+        self.db.execute("CREATE TABLE IF NOT EXISTS _tables "
+                        "(name TEXT PRIMARY KEY, schema TEXT NOT NULL)")
+        self.lock = threading.RLock()
+        self.meta = SimpleNamespace()
+        self.meta.client = SqliteClient(self)
+        self._schemas: dict[str, tuple] = {}
+
+    def write(self):
+        return _WriteTxn(self)
+
+    def schema(self, name: str) -> tuple:
+        if name not in self._schemas:
+            with self.lock:
+                row = self.db.execute("SELECT schema FROM _tables WHERE name=?",
+                                      (name,)).fetchone()
+            if row is None and name in TABLES:
+                self._create(name, *TABLES[name])
+            elif row is None:
+                raise _error("ResourceNotFoundException",
+                             f"Requested resource not found: Table: {name} not found",
+                             "DescribeTable")
+            else:
+                h, kt, idx = json.loads(row[0])
+                self._schemas[name] = (h, kt, {k: tuple(v) for k, v in idx.items()})
+        return self._schemas[name]
+
+    def _create(self, name: str, hash_key: str, key_type: str, indexes: dict) -> None:
+        t = '"t_' + name.replace('"', '""') + '"'
+        with self.write():
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {t} "
+                            f"(pk NOT NULL PRIMARY KEY, item TEXT NOT NULL) WITHOUT ROWID")
+            for iname, attrs in indexes.items():
+                cols = ", ".join(_json_col(a) for a in attrs if a)
+                self.db.execute(f'CREATE INDEX IF NOT EXISTS "i_{name}_{iname}" ON {t} ({cols})')
+            self.db.execute("INSERT OR REPLACE INTO _tables (name, schema) VALUES (?, ?)",
+                            (name, json.dumps([hash_key, key_type, indexes])))
+        self._schemas[name] = (hash_key, key_type, indexes)
+
+    def create_table(self, TableName: str, KeySchema: list, AttributeDefinitions: list,
+                     GlobalSecondaryIndexes=(), **kw) -> SqliteTable:
+        """Same arguments as DynamoDB's CreateTable (hash-key tables only)."""
+        types = {a["AttributeName"]: a["AttributeType"] for a in AttributeDefinitions}
+        keys = {k["KeyType"]: k["AttributeName"] for k in KeySchema}
+        if "RANGE" in keys:
+            raise _validation("the SQLite engine only has hash-key tables", "CreateTable")
+        indexes = {}
+        for g in GlobalSecondaryIndexes:
+            gk = {k["KeyType"]: k["AttributeName"] for k in g["KeySchema"]}
+            indexes[g["IndexName"]] = (gk["HASH"], gk.get("RANGE"))
+        self._create(TableName, keys["HASH"], types[keys["HASH"]], indexes)
+        return self.Table(TableName)
+
+    def Table(self, name: str) -> SqliteTable:
+        return SqliteTable(self, name)
+
+
+class _WriteTxn:
+    """Engine lock + BEGIN IMMEDIATE … COMMIT (ROLLBACK on error); re-entrant."""
+
+    def __init__(self, engine: SqliteResource):
+        self._engine = engine
+
+    def __enter__(self):
+        self._engine.lock.acquire()
+        self._outer = not self._engine.db.in_transaction
+        if self._outer:
+            self._engine.db.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            if self._outer:
+                self._engine.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._engine.lock.release()
+
+
+# ── factory ─────────────────────────────────────────────────
+_resource = None
+_resource_lock = threading.Lock()
+
+
+def resource():
+    """The process's table resource for STORAGE_BACKEND."""
+    global _resource
+    with _resource_lock:
+        if _resource is None:
+            if BACKEND == "sqlite":
+                _resource = SqliteResource(PATH)
+            elif BACKEND == "dynamodb":
+                import boto3
+                _resource = boto3.resource("dynamodb", region_name=REGION,
+                                           endpoint_url=os.getenv("DYNAMODB_ENDPOINT"))
+            else:
+                raise ValueError(f"unknown STORAGE_BACKEND {BACKEND}")
+        return _resource
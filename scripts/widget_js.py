@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# --------------------------------------------------------------
+# widget_js.py – browserless AL/IL resolver
+#   • fetches the inscription page, its /preview/ frame and every
+#     <script> once, then runs them in QuickJS with a tiny DOM,
+#     fetch() and setTimeout() shim – no Chromium
+#   • recursive-endpoint responses are cached per URL
+#     (WIDGET_JS_CACHE_SECS, page + scripts are kept for the
+#     life of the process)
+#   • scripts run under a CPU limit per call (WIDGET_JS_CPU_SECS) and
+#     64 MB; fetch() is answered from Python between calls
+#   • same resolve / resolve_many / size surface as WidgetPool, but
+#     get_pool() won't hand it out until a Chromium-recorded parity
+#     fixture exists (fixtures/widget/sample.json, see below)
+#
+# Needs `pip install quickjs`. Offline check against outputs
+# recorded from the Chromium path:
+#   python widget_js.py record fixtures/widget/sample.json 840000 840001
+#   python widget_js.py verify fixtures/widget/sample.json
+# (tests/test_widget_js.py runs verify() on it once it is committed)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import json, logging, os, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import httpx
+
+import http_client as http
+import metrics
+from widget_pool import CALL_SECS, POOL_SIZE, RUN_TIMEOUT_MS, WIDGET_URL, WIDGETS, WidgetError
+
+log = logging.getLogger("widget_js")
+
+CACHE_SECS = float(os.getenv("WIDGET_JS_CACHE_SECS", 3600))
+CPU_SECS   = float(os.getenv("WIDGET_JS_CPU_SECS", 2))      # per eval / job / timer
+MAX_FRAMES = 3                               # page → preview → nested preview
+
+FETCHES = metrics.REGISTRY.counter("widget_js_fetches_total", "Widget resource fetches",
+                                   ("cached",))
+
+
+# ─── HTML → scripts, ids, frames ──────────────────────
+class _Page(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.frames: list[str] = []
+        self.scripts: list[tuple[str, str]] = []  # ("src", url) | ("inline", code)
+        self.elements: dict[str, dict] = {}       # id → {tag, value, onclick, text}
+        self._script: list[str] | None = None
+        self._open: list[dict] = []
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "iframe" and a.get("src"):
+            self.frames.append(a["src"])
+        if tag == "script":
+            if a.get("src"):
+                self.scripts.append(("src", a["src"]))
+            else:
+                self._script = []
+            return
+        if a.get("id"):
+            el = {"tag": tag, "value": a.get("value", ""), "onclick": a.get("onclick"), "text": ""}
+            self.elements[a["id"]] = el
+            if tag not in ("input", "img", "br", "hr", "meta", "link"):
+                self._open.append(el)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._script is not None:
+            self.scripts.append(("inline", "".join(self._script)))
+            self._script = None
+        elif self._open and self._open[-1]["tag"] == tag:
+            self._open.pop()
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script.append(data)
+        elif self._open:
+            self._open[-1]["text"] += data
+
+
+# ─── JS shims ─────────────────────────────────────────
+_PRELUDE = r"""
+var window = globalThis, self = globalThis;
+var console = {log() {}, warn() {}, error() {}, info() {}, debug() {}};
+var __now = 0, __timers = [], __tid = 0;
+function setTimeout(fn, ms) {
+  __timers.push({id: ++__tid, at: __now + (+ms || 0), fn}); return __tid;
+}
+function clearTimeout(id) { __timers = __timers.filter(t => t.id !== id); }
+function setInterval(fn, ms) {
+  const tick = () => { fn(); setTimeout(tick, ms); }; return setTimeout(tick, ms);
+}
+var clearInterval = clearTimeout;
+function __runTimer() {                       // → ms advanced, or -1 if idle
+  if (!__timers.length) return -1;
+  __timers.sort((a, b) => a.at - b.at || a.id - b.id);
+  const t = __timers.shift(), step = Math.max(0, t.at - __now);
+  __now = Math.max(__now, t.at); t.fn(); return step;
+}
+class __El {
+  constructor(id, tag, init) {
+    init = init || {};
+    this.id = id; this.tagName = (tag || "div").toUpperCase();
+    this.value = init.value || ""; this._text = init.text || "";
+    this.style = {}; this.dataset = {}; this.children = []; this._on = {};
+    this.classList = {add() {}, remove() {}, toggle() {}, contains() { return false; }};
+    this.disabled = false; this.onclick = null;
+  }
+  get textContent() { return this._text; }   set textContent(v) { this._text = String(v); }
+  get innerText()   { return this._text; }   set innerText(v)   { this._text = String(v); }
+  get innerHTML()   { return this._text; }   set innerHTML(v)   { this._text = String(v); }
+  addEventListener(t, fn) { (this._on[t] = this._on[t] || []).push(fn); }
+  removeEventListener(t, fn) { this._on[t] = (this._on[t] || []).filter(f => f !== fn); }
+  dispatchEvent(ev) {
+    ev.target = ev.currentTarget = this;
+    ev.preventDefault = ev.preventDefault || (() => {});
+    if (typeof this["on" + ev.type] === "function") this["on" + ev.type](ev);
+    (this._on[ev.type] || []).forEach(f => f.call(this, ev));
+    return true;
+  }
+  click() { if (!this.disabled) this.dispatchEvent({type: "click"}); }
+  focus() {} blur() {}
+  appendChild(c) { this.children.push(c); return c; }
+  removeChild(c) { this.children = this.children.filter(x => x !== c); return c; }
+  append(...cs) { cs.forEach(c => this.appendChild(c)); }
+  setAttribute(k, v) { this[k] = v; }  getAttribute(k) { return this[k] ?? null; }
+  querySelector(s) { return document.querySelector(s); }
+  querySelectorAll(s) { return document.querySelectorAll(s); }
+}
+var __els = {};
+var document = {
+  readyState: "complete", _on: {},
+  body: new __El("", "body"), head: new __El("", "head"),
+  getElementById(id) { return __els[id] || null; },
+  querySelector(s) { return s.startsWith("#") ? this.getElementById(s.slice(1)) : null; },
+  querySelectorAll(s) { const e = this.querySelector(s); return e ? [e] : []; },
+  createElement(tag) { return new __El("", tag); },
+  createTextNode(t) { return new __El("", "#text", {text: t}); },
+  addEventListener(t, fn) { (this._on[t] = this._on[t] || []).push(fn); },
+  removeEventListener() {},
+};
+window.addEventListener = (t, fn) => document.addEventListener(t, fn);
+window.removeEventListener = () => {};
+window.location = {href: __base, origin: __origin, protocol: "https:"};
+class __Response {
+  constructor(r) { this.status = r.status; this.ok = r.status >= 200 && r.status < 300; this._b = r.body; }
+  text() { return Promise.resolve(this._b); }
+  json() { return Promise.resolve().then(() => JSON.parse(this._b)); }
+}
+var __fetches = [], __waiting = {}, __fid = 0;
+function fetch(url) {                        // queued; Python answers via __settle()
+  return new Promise((resolve, reject) => {
+    const id = ++__fid;
+    __waiting[id] = {resolve, reject};
+    __fetches.push({id, url: String(url && url.url || url)});
+  });
+}
+function __takeFetches() { const f = __fetches; __fetches = []; return JSON.stringify(f); }
+function __settle(id, r) {
+  const w = __waiting[id]; delete __waiting[id];
+  if (w) r.error ? w.reject(new TypeError(r.error)) : w.resolve(new __Response(r));
+}
+function __defineAll(m) {                    // ids parsed from the HTML
+  for (const id in m) {
+    const el = __els[id] = new __El(id, m[id].tag, m[id]);
+    if (!(id in globalThis)) globalThis[id] = el;          // named access, as in browsers
+    if (m[id].onclick) el.onclick = new Function("event", m[id].onclick);
+  }
+}
+function __loaded() {
+  ["DOMContentLoaded", "load"].forEach(t => (document._on[t] || []).forEach(f => f({type: t})));
+  if (typeof window.onload === "function") window.onload({type: "load"});
+}
+function __run(inp, btn, block) {
+  const i = __els[inp], b = __els[btn];
+  if (!i || !b) return false;
+  i.value = String(block);
+  i.dispatchEvent({type: "input"}); i.dispatchEvent({type: "change"});
+  b.click();
+  return true;
+}
+function __out(id) { const o = __els[id]; return o ? o.textContent : null; }
+"""
+
+
+# ─── resolver ─────────────────────────────────────────
+class JsWidgetPool:
+    """
+    Drop-in for WidgetPool. Each call gets a fresh QuickJS context (they
+    are cheap and not thread-safe); `size` calls run on threads at once,
+    which is what hides the fetch() round-trips.
+
+    `fetcher(url) -> (status, body)` can be swapped, e.g. for the
+    recorded responses of a fixture.
+    """
+
+    def __init__(self, url: str = WIDGET_URL, size: int = POOL_SIZE, fetcher=None):
+        try:
+            import quickjs
+        except ImportError as exc:
+            raise RuntimeError("WIDGET_BACKEND=quickjs needs `pip install quickjs`") from exc
+        self._quickjs = quickjs
+        self.url, self.size = url, size
+        self._fetcher = fetcher or self._http
+        self._cache: dict[str, tuple[float, int, str]] = {}
+        self._lock = threading.Lock()
+        self._widget_lock = threading.Lock()
+        self._widget: tuple[str, list[str], dict] | None = None   # base, scripts, elements
+        self._pool = ThreadPoolExecutor(size, thread_name_prefix="widget-js")
+        self.recorded: dict[str, dict] = {}                       # url → {status, body}
+
+    # ── fetching ──────────────────────────────────────────
+    @staticmethod
+    def _http(url: str) -> tuple[int, str]:
+        r = http.get(url)
+        return r.status_code, r.text
+
+    def fetch(self, url: str, keep: bool = False) -> tuple[int, str]:
+        """Cached GET; `keep` pins page + script bodies for the process lifetime."""
+        now = time.time()
+        with self._lock:
+            hit = self._cache.get(url)
+            if hit and (hit[0] == float("inf") or now - hit[0] < CACHE_SECS):
+                FETCHES.inc(cached="yes")
+                return hit[1], hit[2]
+        status, body = self._fetcher(url)
+        FETCHES.inc(cached="no")
+        with self._lock:
+            self.recorded[url] = {"status": status, "body": body}
+            if status == 200:
+                self._cache[url] = (float("inf") if keep else now, status, body)
+        return status, body
+
+    def _load_widget(self) -> tuple[str, list[str], dict]:
+        """Follow page → /preview/ frame(s) to the widget; pull its scripts once."""
+        with self._widget_lock:
+            if self._widget is None:
+                self._widget = self._find_widget()
+            return self._widget
+
+    def _find_widget(self) -> tuple[str, list[str], dict]:
+        url = self.url
+        for _ in range(MAX_FRAMES):
+            try:
+                status, html = self.fetch(url, keep=True)
+            except httpx.HTTPError as exc:
+                raise WidgetError("PAGE_LOAD_ERROR") from exc
+            if status != 200:
+                raise WidgetError("PAGE_LOAD_ERROR")
+            page = _Page()
+            page.feed(html)
+            if any(sel[1:] in page.elements for sel in WIDGETS["al"] + WIDGETS["il"]):
+                break
+            preview = next((f for f in page.frames if "/preview/" in f), None)
+            if preview is None:
+                raise WidgetError("NO_IFRAME")
+            url = urljoin(url, preview)
+        else:
+            raise WidgetError("NO_FALLBACK_UI")
+
+        scripts = []
+        for kind, ref in page.scripts:
+            if kind == "inline":
+                scripts.append(ref)
+                continue
+            status, body = self.fetch(urljoin(url, ref), keep=True)
+            if status != 200:
+                raise WidgetError("PAGE_LOAD_ERROR")
+            scripts.append(body)
+        return url, scripts, page.elements
+
+    # ── evaluation ───────────────────────────────────────
+    def _context(self, base: str, scripts: list[str], elements: dict, deadline: float):
+        # JS never calls into Python (a time limit forbids that): fetch() only
+        # queues, and _drain() answers the queue between calls
+        ctx = self._quickjs.Context()
+        ctx.set_memory_limit(64 << 20)
+        ctx.set_time_limit(CPU_SECS)         # a runaway loop is interrupted, not waited on
+        origin = "/".join(base.split("/")[:3])
+        ctx.eval(f"var __base = {json.dumps(base)}, __origin = {json.dumps(origin)};")
+        ctx.eval(_PRELUDE)
+        ctx.eval(f"__defineAll({json.dumps(elements)})")
+        for code in scripts:
+            ctx.eval(code)
+        ctx.eval("__loaded()")
+        self._drain(ctx, base, deadline)
+        return ctx
+
+    def _drain(self, ctx, base: str, deadline: float) -> None:
+        """Run promise jobs and answer queued fetches until both are idle."""
+        while True:
+            while ctx.execute_pending_job():
+                if time.monotonic() > deadline:
+                    raise WidgetError("TIMEOUT")
+            requests = json.loads(ctx.eval("__takeFetches()"))
+            if not requests:
+                return
+            for r in requests:
+                try:
+                    status, body = self.fetch(urljoin(base, r["url"]))
+                    res = {"status": status, "body": body}
+                except Exception as exc:
+                    res = {"error": str(exc)}
+                ctx.eval(f"__settle({r['id']}, {json.dumps(res)})")
+            if time.monotonic() > deadline:
+                raise WidgetError("TIMEOUT")
+
+    def _resolve(self, kind: str, block: int) -> str:
+        inp, btn, out = (s[1:] for s in WIDGETS[kind])
+        t0 = time.perf_counter()
+        deadline = time.monotonic() + RUN_TIMEOUT_MS / 1000      # wall clock, fetches included
+        try:
+            base, scripts, elements = self._load_widget()
+            try:
+                ctx = self._context(base, scripts, elements, deadline)
+            except self._quickjs.JSException as exc:
+                raise WidgetError(f"INTERACTION_ERROR:{exc}") from exc
+            try:
+                if not ctx.get("__run")(inp, btn, int(block)):
+                    raise WidgetError("NO_FALLBACK_UI")
+                elapsed = 0
+                while True:
+                    self._drain(ctx, base, deadline)
+                    text = (ctx.get("__out")(out) or "").strip()
+                    if text and not text.lower().startswith("running"):
+                        return text
+                    step = ctx.eval("__runTimer()")
+                    if step < 0 or elapsed > RUN_TIMEOUT_MS:
+                        raise WidgetError("TIMEOUT")
+                    elapsed += step
+            except self._quickjs.JSException as exc:
+                raise WidgetError(f"INTERACTION_ERROR:{exc}") from exc
+        finally:
+            CALL_SECS.observe(time.perf_counter() - t0, kind=kind)
+
+    # ── WidgetPool surface ───────────────────────────────
+    def resolve(self, kind: str, block: int) -> str:
+        return self._resolve(kind, block)
+
+    def resolve_many(self, kind: str, blocks) -> list[str | WidgetError]:
+        def one(b):
+            try:
+                return self._resolve(kind, b)
+            except WidgetError as exc:
+                return exc
+            except Exception as exc:
+                return WidgetError(f"INTERACTION_ERROR:{exc}")
+        return list(self._pool.map(one, list(blocks)))
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+# ─── fixtures: record with Chromium, verify offline ───
+def record(path: str, blocks: list[int]) -> None:
+    """Resolve blocks with both backends online; store resources + Chromium's answers."""
+    from widget_pool import WidgetPool
+    chromium, js = WidgetPool(), JsWidgetPool()
+    cases = []
+    for kind in WIDGETS:
+        for b, out in zip(blocks, chromium.resolve_many(kind, blocks)):
+            cases.append({"kind": kind, "block": b,
+                          "output": out if isinstance(out, str) else None,
+                          "error": None if isinstance(out, str)
+                          else getattr(out, "flag", f"INTERACTION_ERROR:{out}")})
+        js.resolve_many(kind, blocks)            # pulls every resource the JS path needs
+    chromium.close()
+    fixture = {"url": js.url, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+               "resources": js.recorded, "cases": cases}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(fixture, fh, indent=1)
+    print(f"recorded {len(cases)} cases, {len(js.recorded)} resources → {path}")
+
+
+def _flag_code(flag: str | None) -> str | None:
+    """PAGE_LOAD_ERROR, TIMEOUT, INTERACTION_ERROR, … without the engine's message."""
+    return flag.split(":", 1)[0] if flag else None
+
+
+def verify(path: str) -> bool:
+    """
+    Replay a fixture through the JS backend with no network; True if all
+    match. An error case matches only the same flag (its message text is
+    engine-specific, so only the part before ":" is compared).
+    """
+    with open(path) as fh:
+        fixture = json.load(fh)
+    res = fixture["resources"]
+
+    def offline(url):
+        if url not in res:
+            raise httpx.ConnectError(f"not in fixture: {url}")
+        return res[url]["status"], res[url]["body"]
+
+    js, ok = JsWidgetPool(fixture["url"], fetcher=offline), True
+    for case in fixture["cases"]:
+        try:
+            got, err = js.resolve(case["kind"], case["block"]), None
+        except WidgetError as exc:
+            got, err = None, exc.flag
+        if case["output"] is not None:
+            match = got == case["output"]
+        else:
+            match = got is None and _flag_code(err) == _flag_code(case["error"])
+        ok &= match
+        print(f"{'ok  ' if match else 'FAIL'} {case['kind']} {case['block']}: "
+              f"{got or err!r}" + ("" if match else f" (chromium: {case['output'] or case['error']!r})"))
+    js.close()
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "record":
+        record(sys.argv[2], [int(b) for b in sys.argv[3:]])
+    elif len(sys.argv) == 3 and sys.argv[1] == "verify":
+        sys.exit(0 if verify(sys.argv[2]) else 1)
+    else:
+        sys.exit("usage: widget_js.py record <fixture.json> <block>… | verify <fixture.json>")
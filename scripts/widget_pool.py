@@ -0,0 +1,237 @@
+# --------------------------------------------------------------
+# widget_pool.py – one long-lived Chromium with N ordinals.com
+# widget pages already loaded, shared by both loopers
+#   • async Playwright on its own event-loop thread; callers
+#     stay synchronous (resolve / resolve_many)
+#   • pages are health-checked on checkout and recycled after a
+#     crash, any failed call, or WIDGET_PAGE_MAX_USES uses
+#   • a dead browser is relaunched on the next call
+#
+# Env:
+#   WIDGET_POOL_SIZE      pages resolving at once (default 4)
+#   WIDGET_PAGE_MAX_USES  recycle a page after this many calls (default 500)
+#   WIDGET_BACKEND        chromium (only backend for now; widget_js.py's
+#                         QuickJS resolver waits on a recorded parity fixture)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio, atexit, logging, os, threading, time
+
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+except ImportError:                         # hosts that only run widget_js
+    async_playwright = None
+
+    class PWTimeout(Exception):
+        pass
+
+import metrics
+
+log = logging.getLogger("widget_pool")
+
+ORDINALS_BASE = os.getenv("ORDINALS_BASE", "https://ordinals.com")
+WIDGET_URL    = (f"{ORDINALS_BASE}/inscription/"
+                 "66475024139f5a7500b48ac688a7418fdf5838a7eabbc7e6792b7dc7829c8ef7i0")
+POOL_SIZE     = int(os.getenv("WIDGET_POOL_SIZE", 4))
+MAX_USES      = int(os.getenv("WIDGET_PAGE_MAX_USES", 500))
+UI_TIMEOUT_MS = 5_000                       # widget inputs must appear within this
+RUN_TIMEOUT_MS = 20_000                     # widget must answer within this
+
+# kind → (input, button, output) selectors inside the /preview/ frame
+WIDGETS = {
+    "al": ("#blockAL", "#alButton", "#alOutput"),
+    "il": ("#blockIL", "#ilButton", "#ilOutput"),
+}
+
+# output is filled and no longer the IL widget's "running…" placeholder
+_DONE_JS = """sel => {
+    const t = (document.querySelector(sel)?.innerText || "").trim();
+    return t && !t.toLowerCase().startsWith("running");
+}"""
+
+CALL_SECS = metrics.REGISTRY.histogram("widget_call_seconds", "Widget resolve time",
+                                       ("kind",), buckets=(.1, .25, .5, 1, 2, 5, 10, 20))
+RECYCLES  = metrics.REGISTRY.counter("widget_page_recycles_total", "Widget pages replaced",
+                                     ("reason",))
+
+
+class WidgetError(Exception):
+    """flag is the looper-facing error string (PAGE_LOAD_ERROR, NO_IFRAME, …)."""
+
+    def __init__(self, flag: str):
+        super().__init__(flag)
+        self.flag = flag
+
+
+class _Slot:
+    def __init__(self):
+        self.page = self.frame = None
+        self.browser_gen = -1
+        self.uses = 0
+        self.dead = False
+
+
+class WidgetPool:
+    def __init__(self, url: str = WIDGET_URL, size: int = POOL_SIZE):
+        if async_playwright is None:
+            raise RuntimeError("WIDGET_BACKEND=chromium needs `pip install playwright`")
+        self.url, self.size = url, size
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="widget-pool",
+                         daemon=True).start()
+        self._pw = self._browser = None
+        self._gen = 0
+        self._slots: asyncio.Queue | None = None
+        self._launch_lock: asyncio.Lock | None = None
+
+    # ── sync facade ───────────────────────────────────────
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def resolve(self, kind: str, block: int) -> str:
+        """Raw widget output for one block; raises WidgetError."""
+        return self._call(self._resolve(kind, block))
+
+    def resolve_many(self, kind: str, blocks) -> list[str | WidgetError]:
+        """Resolve on up to `size` pages at once; results in input order."""
+        return self._call(self._resolve_many(kind, list(blocks)))
+
+    def close(self) -> None:
+        try:
+            self._call(self._close())
+        except Exception as exc:
+            log.debug("widget pool close: %s", exc)
+
+    # ── browser + pages ──────────────────────────────────
+    async def _ensure_browser(self) -> None:
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                self._slots.put_nowait(_Slot())
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            if self._browser is not None:
+                RECYCLES.inc(reason="browser")
+                log.warning("widget pool: browser gone, relaunching")
+            if self._pw is None:
+                self._pw = await async_playwright().start()
+            self._browser = await self._pw.chromium.launch(headless=True)
+            self._gen += 1
+
+    async def _drop(self, slot: _Slot, reason: str) -> None:
+        if slot.page is not None:
+            RECYCLES.inc(reason=reason)
+            try:
+                await slot.page.close()
+            except Exception:
+                pass
+        slot.page = slot.frame = None
+        slot.uses, slot.dead = 0, False
+
+    async def _checkout(self) -> _Slot:
+        await self._ensure_browser()
+        slot = await self._slots.get()
+        try:
+            if slot.page is not None:
+                if slot.browser_gen != self._gen or slot.page.is_closed():
+                    await self._drop(slot, "closed")
+                elif slot.dead or slot.frame.is_detached():
+                    await self._drop(slot, "crashed")
+                elif slot.uses >= MAX_USES:
+                    await self._drop(slot, "max_uses")
+            if slot.page is None:
+                await self._open(slot)
+        except BaseException:
+            self._slots.put_nowait(slot)
+            raise
+        return slot
+
+    async def _open(self, slot: _Slot) -> None:
+        page = await self._browser.new_page()
+        page.on("crash", lambda *_: setattr(slot, "dead", True))
+        try:
+            await page.goto(self.url)
+            await page.wait_for_load_state("networkidle")
+        except Exception as exc:
+            await page.close()
+            log.error("widget pool: page load failed: %s", exc)
+            raise WidgetError("PAGE_LOAD_ERROR") from exc
+        frame = next((f for f in page.frames if "/preview/" in f.url), None)
+        if frame is None:
+            await page.close()
+            raise WidgetError("NO_IFRAME")
+        slot.page, slot.frame, slot.browser_gen = page, frame, self._gen
+
+    # ── widget calls ─────────────────────────────────────
+    async def _resolve(self, kind: str, block: int) -> str:
+        inp, btn, out = WIDGETS[kind]
+        try:
+            slot = await self._checkout()
+        except WidgetError:
+            raise
+        except Exception as exc:                # browser launch / new_page failed
+            log.error("widget pool: no page available: %s", exc)
+            raise WidgetError("PAGE_LOAD_ERROR") from exc
+        t0 = time.perf_counter()
+        try:
+            f = slot.frame
+            try:
+                await f.wait_for_selector(inp, timeout=UI_TIMEOUT_MS)
+            except PWTimeout:
+                raise WidgetError("NO_FALLBACK_UI")
+            await f.eval_on_selector(out, "el => el.textContent = ''")
+            await f.fill(inp, str(block))
+            await f.click(btn)
+            try:
+                await f.wait_for_function(_DONE_JS, arg=out, timeout=RUN_TIMEOUT_MS)
+            except PWTimeout:
+                raise WidgetError("TIMEOUT")
+            text = (await f.inner_text(out)).strip()
+            slot.uses += 1
+            return text
+        except WidgetError:
+            await self._drop(slot, "error")
+            raise
+        except Exception as exc:
+            await self._drop(slot, "error")
+            raise WidgetError(f"INTERACTION_ERROR:{exc}") from exc
+        finally:
+            CALL_SECS.observe(time.perf_counter() - t0, kind=kind)
+            self._slots.put_nowait(slot)
+
+    async def _resolve_many(self, kind: str, blocks: list[int]) -> list:
+        return await asyncio.gather(*(self._resolve(kind, b) for b in blocks),
+                                    return_exceptions=True)
+
+    async def _close(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+        if self._pw is not None:
+            await self._pw.stop()
+        self._browser = self._pw = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Process-wide WidgetPool, started on first use and closed at exit.
+    widget_js.JsWidgetPool is not offered here until it has been verified
+    against a fixture recorded from this (Chromium) path.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            backend = os.getenv("WIDGET_BACKEND", "chromium")
+            if backend == "quickjs":
+                raise ValueError("WIDGET_BACKEND=quickjs is disabled until "
+                                 "`widget_js.py record` has a Chromium parity fixture")
+            if backend != "chromium":
+                raise ValueError(f"unknown WIDGET_BACKEND {backend}")
+            _pool = WidgetPool()
+            atexit.register(_pool.close)
+        return _pool
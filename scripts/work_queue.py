@@ -0,0 +1,102 @@
+# --------------------------------------------------------------
+# work_queue.py – durable local queue of block numbers per stage
+#   • ingest.py enqueues each new dynamicIndex1 block for "auth";
+#     the auth stage hands it on to "index" once written
+#   • SQLite (WAL) file shared by the processes on the box;
+#     put() is idempotent per (stage, block)
+#   • lease() hands out blocks for WORK_QUEUE_LEASE_SECS; a worker
+#     that dies without ack() just lets them come back
+#
+# Env:
+#   WORK_QUEUE_DB          path (default STATE_DIR/work_queue.sqlite)
+#   WORK_QUEUE_LEASE_SECS  seconds a leased block stays hidden (default 600)
+#   WORK_QUEUE_MAX_TRIES   leases before a block is parked for the sweep (default 5)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import os, sqlite3, threading, time
+from pathlib import Path
+
+import metrics
+
+STATE_DIR  = Path(os.getenv("STATE_DIR", Path(__file__).parent / "state"))
+DB_PATH    = os.getenv("WORK_QUEUE_DB", str(STATE_DIR / "work_queue.sqlite"))
+LEASE_SECS = float(os.getenv("WORK_QUEUE_LEASE_SECS", 600))
+MAX_TRIES  = int(os.getenv("WORK_QUEUE_MAX_TRIES", 5))
+
+OPS = metrics.REGISTRY.counter("work_queue_ops_total", "Work queue operations",
+                               ("stage", "op"))
+
+
+class WorkQueue:
+    def __init__(self, path: str | Path = DB_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS work (
+                stage        TEXT    NOT NULL,
+                block        INTEGER NOT NULL,
+                enqueued_at  REAL    NOT NULL,
+                leased_until REAL    NOT NULL DEFAULT 0,
+                tries        INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (stage, block)
+            )""")
+        self._lock = threading.Lock()
+
+    def put(self, stage: str, blocks) -> None:
+        rows = [(stage, int(b), time.time()) for b in blocks]
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO work (stage, block, enqueued_at) "
+                                 "VALUES (?, ?, ?)", rows)
+        OPS.inc(len(rows), stage=stage, op="put")
+
+    def lease(self, stage: str, n: int, secs: float = LEASE_SECS) -> list[int]:
+        """Up to n blocks, oldest first, hidden from other workers for `secs`."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                blocks = [r[0] for r in self._db.execute(
+                    "SELECT block FROM work WHERE stage=? AND leased_until<? AND tries<? "
+                    "ORDER BY enqueued_at, block LIMIT ?", (stage, now, MAX_TRIES, n))]
+                self._db.executemany(
+                    "UPDATE work SET leased_until=?, tries=tries+1 WHERE stage=? AND block=?",
+                    [(now + secs, stage, b) for b in blocks])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        OPS.inc(len(blocks), stage=stage, op="lease")
+        return blocks
+
+    def ack(self, stage: str, blocks) -> None:
+        blocks = [(stage, int(b)) for b in blocks]
+        with self._lock:
+            self._db.executemany("DELETE FROM work WHERE stage=? AND block=?", blocks)
+        OPS.inc(len(blocks), stage=stage, op="ack")
+
+    def blocks(self, stage: str) -> set[int]:
+        """Everything queued for a stage, leased or not (the sweep skips these)."""
+        with self._lock:
+            return {r[0] for r in self._db.execute(
+                "SELECT block FROM work WHERE stage=? AND tries<?", (stage, MAX_TRIES))}
+
+    def depth(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT stage, COUNT(*) FROM work GROUP BY stage"))
+
+
+_queue: WorkQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> WorkQueue:
+    """Process-wide queue on DB_PATH."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WorkQueue()
+        return _queue
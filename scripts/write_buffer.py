@@ -0,0 +1,224 @@
+# --------------------------------------------------------------
+# write_buffer.py – batched DynamoDB writes for watchers + loopers
+#   • put() rows are sent as BatchWriteItem, 25 per call;
+#     UnprocessedItems are retried with jittered backoff
+#   • update() SETs / REMOVEs for the same key are merged, so a row touched
+#     twice in a pass costs one UpdateItem (a SET on a row that is
+#     still waiting to be put is folded into the put instead)
+#   • flushes when WRITE_BUFFER_MAX_ITEMS keys are pending or the
+#     oldest is WRITE_BUFFER_MAX_SECS old, and on flush() / exit
+#     of a `with` block. There is no timer: the age is only checked
+#     on put() / update(), so callers flush() once a pass (or an
+#     idle poll) is over – an idle buffer otherwise keeps its rows
+#   • a flush that fails puts whatever it hadn't written back in the
+#     buffer, so the next flush() retries it
+#   • then= / after() callbacks run, in the order they were added,
+#     once the writes they cover have landed – then= covers its own
+#     row, after() every row buffered before it. A callback whose rows
+#     failed is skipped: that is where callers announce, checkpoint
+#     and ack, so none of those may move past a lost write
+#   • UpdateItems go through the table's client (thread-safe, unlike
+#     the resource Table; it serializes plain values like the Table
+#     does) from UPDATE_THREADS threads
+#
+# Env:
+#   WRITE_BUFFER_MAX_ITEMS  pending keys before a flush (default 25)
+#   WRITE_BUFFER_MAX_SECS   age of the oldest pending key before a flush (default 5)
+#   WRITE_BUFFER_RETRIES    UnprocessedItems rounds before giving up (default 6)
+# --------------------------------------------------------------
+from __future__ import annotations
+
+import logging, os, random, time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+log = logging.getLogger("write_buffer")
+
+BATCH       = 25                                     # BatchWriteItem hard limit
+MAX_ITEMS   = int(os.getenv("WRITE_BUFFER_MAX_ITEMS", BATCH))
+MAX_SECS    = float(os.getenv("WRITE_BUFFER_MAX_SECS", 5))
+RETRIES     = int(os.getenv("WRITE_BUFFER_RETRIES", 6))
+BACKOFF_CAP = 5.0
+UPDATE_THREADS = 8                                   # merged UpdateItems in flight
+
+WRITES  = metrics.REGISTRY.counter("write_buffer_writes_total", "Rows written by the buffer",
+                                   ("table", "op"))
+MERGED  = metrics.REGISTRY.counter("write_buffer_merged_total",
+                                   "Writes folded into an already-pending key", ("table",))
+UNPROC  = metrics.REGISTRY.counter("write_buffer_unprocessed_total",
+                                   "Items DynamoDB handed back unprocessed", ("table",))
+
+
+class _Pending:
+    __slots__ = ("key", "item", "sets", "removes", "failed")
+
+    def __init__(self, key: dict):
+        self.key = key
+        self.item: dict | None = None    # full row to put
+        self.sets: dict = {}             # attr → value to SET
+        self.removes: set = set()        # attrs to REMOVE
+        self.failed = False
+
+
+class WriteBuffer:
+    """
+    Buffers writes to one Table. `key_attrs` names its primary key
+    attributes so updates can be matched to pending puts.
+    """
+
+    def __init__(self, table, key_attrs: tuple[str, ...],
+                 max_items: int = MAX_ITEMS, max_secs: float = MAX_SECS):
+        self.table, self.key_attrs = table, tuple(key_attrs)
+        self.max_items, self.max_secs = max_items, max_secs
+        self._pending: dict[tuple, _Pending] = {}
+        self._since: float | None = None
+        self._then: list[tuple[tuple[_Pending, ...], object]] = []   # (rows covered, fn)
+        self._pool: ThreadPoolExecutor | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    # ── buffering ─────────────────────────────────────────
+    def _slot(self, key: dict) -> _Pending:
+        k = tuple(key[a] for a in self.key_attrs)
+        p = self._pending.get(k)
+        if p is None:
+            p = self._pending[k] = _Pending({a: key[a] for a in self.key_attrs})
+            if self._since is None:
+                self._since = time.monotonic()
+        else:
+            MERGED.inc(table=self.table.name)
+        return p
+
+    def put(self, item: dict, then=None) -> None:
+        """Replace the whole row (like put_item); earlier pending SETs are dropped."""
+        p = self._slot(item)
+        p.item, p.sets, p.removes = dict(item), {}, set()
+        if then:
+            self._then.append(((p,), then))
+        self._maybe_flush()
+
+    def update(self, key: dict, then=None, remove=(), **sets) -> None:
+        """SET / REMOVE attributes on a row (like update_item); merged per key until flushed."""
+        p = self._slot(key)
+        if p.item is not None:
+            p.item.update(sets)
+            for a in remove:
+                p.item.pop(a, None)
+        else:
+            p.sets.update(sets)
+            p.removes.difference_update(sets)
+            for a in remove:
+                p.sets.pop(a, None)
+            p.removes.update(remove)
+        if then:
+            self._then.append(((p,), then))
+        self._maybe_flush()
+
+    def after(self, fn) -> None:
+        """
+        Run fn once everything buffered so far has been written (now, if
+        nothing is); skipped if any of those writes failed.
+        """
+        if self._pending:
+            self._then.append((tuple(self._pending.values()), fn))
+        else:
+            fn()
+
+    def due(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.max_items
+            or time.monotonic() - self._since >= self.max_secs)
+
+    def _maybe_flush(self) -> None:
+        if self.due():
+            self.flush()
+
+    # ── writing ───────────────────────────────────────────
+    def flush(self) -> None:
+        """
+        Write everything pending, then run the callbacks in order. A put
+        batch that is still unprocessed after RETRIES rounds raises (no
+        callbacks run, and that batch, the ones after it and the updates
+        stay buffered); a failed update is logged and the callbacks that
+        cover it – its then=, any after() added behind it – are skipped.
+        """
+        if not self._pending:
+            return
+        pending, self._pending, self._since = list(self._pending.values()), {}, None
+        then, self._then = self._then, []
+        puts = [p for p in pending if p.item is not None]
+        sets = [p for p in pending if p.item is None and (p.sets or p.removes)]
+
+        for i in range(0, len(puts), BATCH):
+            try:
+                self._batch_put([p.item for p in puts[i:i + BATCH]])
+            except BaseException:
+                self._restore(puts[i:] + sets, then)
+                raise
+        self._updates(sets)
+
+        for rows, fn in then:
+            if not any(p.failed for p in rows):
+                fn()
+
+    def _restore(self, unwritten: list[_Pending], then: list) -> None:
+        """Buffer a failed flush's unwritten rows and callbacks again."""
+        self._pending = {tuple(p.key[a] for a in self.key_attrs): p for p in unwritten}
+        self._then = then
+        self._since = time.monotonic() if self._pending else None
+
+    def _batch_put(self, items: list[dict]) -> None:
+        name = self.table.name
+        request = {name: [{"PutRequest": {"Item": it}} for it in items]}
+        for attempt in range(RETRIES + 1):
+            resp = self.table.meta.client.batch_write_item(RequestItems=request)
+            left = resp.get("UnprocessedItems", {}).get(name, [])
+            WRITES.inc(len(request[name]) - len(left), table=name, op="put")
+            if not left:
+                return
+            UNPROC.inc(len(left), table=name)
+            if attempt == RETRIES:
+                break
+            request = {name: left}
+            time.sleep(random.uniform(0, min(BACKOFF_CAP, 0.05 * 2 ** attempt)))
+        raise RuntimeError(f"{name}: {len(left)} items still unprocessed after "
+                           f"{RETRIES} retries")
+
+    def _updates(self, pending: list[_Pending]) -> None:
+        if not pending:
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(UPDATE_THREADS, thread_name_prefix="write-buffer")
+        list(self._pool.map(self._update_one, pending))
+
+    def _update_one(self, p: _Pending) -> None:
+        names = {f"#a{i}": a for i, a in enumerate(p.sets)}
+        names.update((f"#r{i}", a) for i, a in enumerate(sorted(p.removes)))
+        values = {f":v{i}": v for i, v in enumerate(p.sets.values())}
+        expr = []
+        if p.sets:
+            expr.append("SET " + ", ".join(f"#a{i} = :v{i}" for i in range(len(p.sets))))
+        if p.removes:
+            expr.append("REMOVE " + ", ".join(f"#r{i}" for i in range(len(p.removes))))
+        kw = {"ExpressionAttributeValues": values} if values else {}
+        try:
+            self.table.meta.client.update_item(
+                TableName=self.table.name,
+                Key=p.key,
+                UpdateExpression=" ".join(expr),
+                ExpressionAttributeNames=names,
+                **kw,
+            )
+        except Exception as exc:
+            log.error("update %s on %s failed: %s", p.key, self.table.name, exc)
+            p.failed = True
+            return
+        WRITES.inc(table=self.table.name, op="update")
@@ -0,0 +1,9 @@
+# scripts/ modules import their siblings by bare name, as when run from there;
+# the API's helpers (block_cache.py, bulk_writes.py, …) live at the repo root
+import sys
+from pathlib import Path
+
+ROOT    = Path(__file__).resolve().parent.parent
+SCRIPTS = ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,68 @@
+# BlockCache: select() paging and the content digests behind the ETags
+import pytest
+
+from block_cache import BlockCache
+
+
+class _Table:
+    """scan() over fixed rows, `page` at a time."""
+
+    def __init__(self, rows, page=3):
+        self.rows, self.page = rows, page
+
+    def scan(self, ExclusiveStartKey=None):
+        start = ExclusiveStartKey["block"] + 1 if ExclusiveStartKey else 0
+        rows = [r for r in self.rows if r["block"] >= start][:self.page]
+        more = rows and rows[-1]["block"] < self.rows[-1]["block"]
+        return {"Items": rows, **({"LastEvaluatedKey": {"block": rows[-1]["block"]}} if more else {})}
+
+
+@pytest.fixture
+def cache():
+    rows = [{"block": b, "status": "reserved" if b % 3 == 0 else "available"}
+            for b in range(1, 11)]
+    c = BlockCache(_Table(rows))
+    c.ensure_loaded()
+    return c
+
+
+def _pages(cache, **kw):
+    pages, after = [], None
+    while True:
+        blocks, after = cache.select(after=after, **kw)
+        pages.append(blocks)
+        if after is None:
+            return pages
+
+
+def test_select_pages_through_everything_once(cache):
+    assert _pages(cache, limit=4) == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert _pages(cache, lo=2, hi=8, statuses={"reserved"}, limit=1) == [[3], [6]]
+
+
+def test_exactly_full_last_page_has_no_cursor(cache):
+    assert cache.select(limit=5) == ([1, 2, 3, 4, 5], 5)
+    assert cache.select(after=5, limit=5) == ([6, 7, 8, 9, 10], None)
+    assert _pages(cache, limit=10) == [list(range(1, 11))]
+    # the rows past a full page don't match: still the last page
+    assert cache.select(statuses={"reserved"}, limit=3) == ([3, 6, 9], None)
+    assert cache.select(lo=11) == ([], None)
+
+
+def test_digest_follows_content(cache):
+    blocks, tag = cache.listing()
+    assert blocks == list(range(1, 11)) and tag == cache.digest(blocks)
+    assert cache.listing()[1] == tag
+
+    cache.merge(4, {"status": "available"})                 # no change in content
+    assert cache.listing()[1] == tag
+    cache.merge(4, {"status": "reserved"})
+    assert cache.listing()[1] != tag
+    assert cache.digest([1, 2]) != cache.digest([1, 2], salt=b"available")
+
+
+def test_digest_agrees_across_processes(cache):
+    other = BlockCache(_Table([dict(cache.get(b)) for b in range(1, 11)], page=10))
+    other.ensure_loaded()
+    assert other.listing()[1] == cache.listing()[1]
+    assert other.entry(7) == cache.entry(7)
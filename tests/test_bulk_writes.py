@@ -0,0 +1,80 @@
+# bulk_writes.transact_updates: every op gets a result, however the transaction ends
+import pytest
+
+pytest.importorskip("boto3")
+
+import storage
+from bulk_writes import transact_updates
+
+
+def _op(blk, cond="#s = :free"):
+    return {"block": blk, "update": "SET #s = :held", "names": {"#s": "status"},
+            "values": {":held": "held", ":free": "free"}, "cond": cond}
+
+
+class _Client:
+    """transact_write_items answers from a script: an exception, or None for success."""
+    exceptions = storage.SqliteClient.exceptions
+
+    def __init__(self, *answers):
+        self.answers, self.calls = list(answers), []
+
+    def transact_write_items(self, TransactItems):
+        self.calls.append([it["Update"]["Key"]["block"] for it in TransactItems])
+        answer = self.answers.pop(0) if self.answers else None
+        if answer is not None:
+            raise answer
+
+
+def _cancelled(*codes):
+    extra = {"CancellationReasons": [{"Code": c} for c in codes]} if codes else {}
+    return storage._error("TransactionCanceledException", "cancelled",
+                          "TransactWriteItems", **extra)
+
+
+def test_conflicts_are_mapped_and_the_rest_retried(tmp_path):
+    db = storage.SqliteResource(tmp_path / "tables.sqlite")
+    blocks = db.Table("mintBlocks")
+    for b, status in ((1, "free"), (2, "held"), (3, "free")):
+        blocks.put_item(Item={"block": b, "status": status})
+    out = transact_updates(db.meta.client, "mintBlocks", [_op(1), _op(2), _op(3)],
+                           sleep=lambda s: None)
+    assert out == {1: "ok", 2: "conflict", 3: "ok"}
+    assert [blocks.get_item(Key={"block": b})["Item"]["status"] for b in (1, 2, 3)] == \
+        ["held", "held", "held"]
+
+
+@pytest.mark.parametrize("codes", [(), ("None",), ("None", "None", "ConditionalCheckFailed")])
+def test_reasons_that_dont_line_up_retry_the_whole_chunk(codes):
+    client = _Client(_cancelled(*codes), None)
+    out = transact_updates(client, "mintBlocks", [_op(1), _op(2)], sleep=lambda s: None)
+    assert out == {1: "ok", 2: "ok"}
+    assert client.calls == [[1, 2], [1, 2]]
+
+
+def test_every_op_gets_a_result_when_retries_run_out():
+    client = _Client(*[_cancelled()] * 10)
+    slept = []
+    out = transact_updates(client, "mintBlocks", [_op(1), _op(2)], sleep=slept.append)
+    assert out == {1: "error:TransactionCanceled", 2: "error:TransactionCanceled"}
+    assert len(client.calls) == 4 and slept == [0.1, 0.2, 0.4, 0.8]
+
+
+def test_throttled_op_keeps_its_error_if_never_written():
+    client = _Client(*[_cancelled("None", "ThrottlingError")] * 4)
+    out = transact_updates(client, "mintBlocks", [_op(1), _op(2)], sleep=lambda s: None)
+    assert out == {1: "error:TransactionCanceled", 2: "error:ThrottlingError"}
+
+
+def test_other_client_errors_fail_the_chunk():
+    client = _Client(storage._error("ValidationException", "bad", "TransactWriteItems"))
+    out = transact_updates(client, "mintBlocks", [_op(1), _op(2, cond=None)])
+    assert out == {1: "error:ValidationException", 2: "error:ValidationException"}
+
+
+def test_chunks_of_transact_max(monkeypatch):
+    import bulk_writes
+    monkeypatch.setattr(bulk_writes, "TRANSACT_MAX", 2)
+    client = _Client()
+    out = transact_updates(client, "mintBlocks", [_op(b) for b in range(5)])
+    assert client.calls == [[0, 1], [2, 3], [4]] and set(out.values()) == {"ok"}
@@ -0,0 +1,53 @@
+# HoldScheduler: expiries fire once, earliest first, even when scheduled out of order
+import threading
+import time
+
+from hold_scheduler import HoldScheduler
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def test_fires_in_deadline_order_once():
+    fired, done = [], threading.Event()
+
+    def on_expire(block, until):
+        fired.append(block)
+        if len(fired) == 3:
+            done.set()
+
+    hs = HoldScheduler(on_expire)
+    threading.Thread(target=hs.run, daemon=True).start()
+    t = _now_ms()
+    hs.schedule(3, t + 300)
+    hs.schedule(1, t + 50)                      # new head wakes the sleeper early
+    hs.schedule(1, t + 50)                      # duplicate: ignored
+    hs.schedule(2, t + 150)
+    assert done.wait(5)
+    time.sleep(0.1)
+    assert fired == [1, 2, 3] and len(hs) == 0
+
+
+def test_seed_only_timed_reservations():
+    hs = HoldScheduler(lambda block, until: None)
+    n = hs.seed([{"block": 1, "status": "reserved", "reserved_until": 10},
+                 {"block": 2, "status": "reserved"},
+                 {"block": 3, "status": "available", "reserved_until": 10}])
+    assert n == 1 and len(hs) == 1
+
+
+def test_a_failing_expiry_does_not_stop_the_loop():
+    fired, done = [], threading.Event()
+
+    def on_expire(block, until):
+        fired.append(block)
+        if block == 1:
+            raise RuntimeError("write failed")
+        done.set()
+
+    hs = HoldScheduler(on_expire)
+    threading.Thread(target=hs.run, daemon=True).start()
+    hs.schedule(1, _now_ms())
+    hs.schedule(2, _now_ms() + 20)
+    assert done.wait(5) and fired == [1, 2]
@@ -0,0 +1,128 @@
+# SQLite backend of storage.py: the DynamoDB behaviour the callers rely on
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from boto3.dynamodb.conditions import Attr, Key
+
+import storage
+
+
+@pytest.fixture
+def db(tmp_path):
+    return storage.SqliteResource(tmp_path / "tables.sqlite")
+
+
+@pytest.fixture
+def blocks(db):
+    return db.Table("mintBlocks")
+
+
+def _code(exc) -> str:
+    return exc.value.response["Error"]["Code"]
+
+
+def test_conditional_put(blocks):
+    blocks.put_item(Item={"block": 1, "status": "free"},
+                    ConditionExpression="attribute_not_exists(block)")
+    with pytest.raises(blocks.meta.client.exceptions.ConditionalCheckFailedException):
+        blocks.put_item(Item={"block": 1, "status": "taken"},
+                        ConditionExpression="attribute_not_exists(block)")
+    assert blocks.get_item(Key={"block": 1})["Item"] == {"block": Decimal(1), "status": "free"}
+
+
+def test_conditional_update(blocks):
+    blocks.put_item(Item={"block": 2, "status": "free", "holds": 0})
+    out = blocks.update_item(
+        Key={"block": 2},
+        UpdateExpression="SET #s = :held ADD holds :one",
+        ConditionExpression=Attr("status").eq("free"),
+        ExpressionAttributeNames={"#s": "status"},
+        ExpressionAttributeValues={":held": "held", ":one": 1},
+        ReturnValues="ALL_NEW",
+    )
+    assert out["Attributes"] == {"block": 2, "status": "held", "holds": 1}
+    with pytest.raises(storage.ConditionalCheckFailedException):
+        blocks.update_item(Key={"block": 2}, UpdateExpression="SET #s = :v",
+                           ConditionExpression="#s = :free",
+                           ExpressionAttributeNames={"#s": "status"},
+                           ExpressionAttributeValues={":v": "x", ":free": "free"})
+    assert blocks.get_item(Key={"block": 2})["Item"]["status"] == "held"
+
+
+def test_key_type_mismatch_is_rejected(db, blocks):
+    with pytest.raises(storage.ClientError) as exc:
+        blocks.get_item(Key={"block": "3"})
+    assert _code(exc) == "ValidationException"
+    with pytest.raises(storage.ClientError) as exc:
+        db.Table("dynamicIndex1").put_item(Item={"block_number": "3"})
+    assert _code(exc) == "ValidationException"
+
+
+def test_transact_cancel_writes_nothing(db, blocks):
+    blocks.put_item(Item={"block": 4, "status": "free"})
+    blocks.put_item(Item={"block": 5, "status": "held"})
+    update = lambda blk: {"Update": {
+        "TableName": "mintBlocks", "Key": {"block": {"N": str(blk)}},
+        "UpdateExpression": "SET #s = :held",
+        "ConditionExpression": "#s = :free",
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ExpressionAttributeValues": {":held": {"S": "held"}, ":free": {"S": "free"}},
+    }}
+    with pytest.raises(storage.TransactionCanceledException) as exc:
+        db.meta.client.transact_write_items(TransactItems=[update(4), update(5)])
+    assert [r["Code"] for r in exc.value.response["CancellationReasons"]] == \
+        ["None", "ConditionalCheckFailed"]
+    assert blocks.get_item(Key={"block": 4})["Item"]["status"] == "free"
+
+    db.meta.client.transact_write_items(TransactItems=[update(4)])
+    assert blocks.get_item(Key={"block": 4})["Item"]["status"] == "held"
+
+
+def test_gsi_query_is_sparse_and_ordered(blocks):
+    for b in (9, 7, 8):
+        blocks.put_item(Item={"block": b, "pending_confirm": "y"})
+    blocks.put_item(Item={"block": 6})                   # not in the index
+    blocks.put_item(Item={"block": 10, "pending_confirm": "n"})
+    resp = blocks.query(IndexName="pending_confirm-index",
+                        KeyConditionExpression=Key("pending_confirm").eq("y"))
+    assert [it["block"] for it in resp["Items"]] == [7, 8, 9]
+
+    resp = blocks.query(IndexName="pending_confirm-index", Limit=2,
+                        KeyConditionExpression=Key("pending_confirm").eq("y") & Key("block").gt(7))
+    assert [it["block"] for it in resp["Items"]] == [8, 9]
+    with pytest.raises(storage.ClientError):
+        blocks.query(IndexName="nope", KeyConditionExpression=Key("x").eq(1))
+
+
+def _scan_all(table, **kw):
+    pages, kw = [], dict(kw)
+    while True:
+        resp = table.scan(**kw)
+        pages.append([int(it["block"]) for it in resp["Items"]])
+        if "LastEvaluatedKey" not in resp:
+            return pages
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def test_scan_pagination(blocks):
+    for b in range(1, 11):
+        blocks.put_item(Item={"block": b, "odd": b % 2 == 1})
+    pages = _scan_all(blocks, Limit=4)
+    assert pages == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+
+    # Limit counts rows read, before the filter – like DynamoDB
+    resp = blocks.scan(Limit=4, FilterExpression=Attr("odd").eq(True))
+    assert [it["block"] for it in resp["Items"]] == [1, 3]
+    assert resp["ScannedCount"] == 4 and resp["LastEvaluatedKey"] == {"block": 4}
+
+
+def test_scan_segments_cover_the_table_once(blocks):
+    for b in range(1, 21):
+        blocks.put_item(Item={"block": b})
+    seen = [b for seg in range(3)
+            for page in _scan_all(blocks, Limit=3, Segment=seg, TotalSegments=3)
+            for b in page]
+    assert sorted(seen) == list(range(1, 21))
@@ -0,0 +1,83 @@
+# widget_js: Chromium parity (recorded fixture) and the QuickJS shim itself
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("quickjs")
+
+import widget_js
+import widget_pool
+from conftest import SCRIPTS
+
+PARITY = SCRIPTS / "fixtures" / "widget" / "sample.json"       # `widget_js.py record`
+SHIM   = os.path.join(os.path.dirname(__file__), "fixtures", "widget_shim.json")
+
+
+def _shim(tmp_path, edit) -> str:
+    """A copy of the shim fixture after edit(fixture)."""
+    with open(SHIM) as fh:
+        fixture = json.load(fh)
+    edit(fixture)
+    path = tmp_path / "edited.json"
+    path.write_text(json.dumps(fixture))
+    return str(path)
+
+
+def _offline_pool(fixture_path: str) -> widget_js.JsWidgetPool:
+    with open(fixture_path) as fh:
+        fixture = json.load(fh)
+    res = fixture["resources"]
+    return widget_js.JsWidgetPool(fixture["url"], size=1,
+                                  fetcher=lambda u: (res[u]["status"], res[u]["body"]))
+
+
+@pytest.mark.skipif(not PARITY.exists(), reason="no Chromium-recorded fixture yet: "
+                    "python widget_js.py record fixtures/widget/sample.json <block>…")
+def test_chromium_parity():
+    assert widget_js.verify(str(PARITY))
+
+
+def test_quickjs_backend_stays_off(monkeypatch):
+    monkeypatch.setenv("WIDGET_BACKEND", "quickjs")
+    monkeypatch.setattr(widget_pool, "_pool", None)
+    with pytest.raises(ValueError, match="parity"):
+        widget_pool.get_pool()
+
+
+def test_shim_fixture_verifies():
+    assert widget_js.verify(SHIM)
+
+
+def test_wrong_output_fails(tmp_path):
+    def edit(fx):
+        case = next(c for c in fx["cases"] if c["output"])
+        case["output"] = case["output"].replace(str(case["block"]), "0")
+    assert not widget_js.verify(_shim(tmp_path, edit))
+
+
+def test_wrong_error_flag_fails(tmp_path):
+    def edit(fx):
+        next(c for c in fx["cases"] if c["error"])["error"] = "PAGE_LOAD_ERROR"
+    assert not widget_js.verify(_shim(tmp_path, edit))
+
+
+def test_missing_resource_fails(tmp_path):
+    def edit(fx):
+        fx["resources"] = {u: r for u, r in fx["resources"].items() if "/preview/" not in u}
+    assert not widget_js.verify(_shim(tmp_path, edit))
+
+
+def test_runaway_script_is_interrupted(tmp_path, monkeypatch):
+    monkeypatch.setattr(widget_js, "CPU_SECS", 0.2)
+
+    def edit(fx):
+        url = next(u for u in fx["resources"] if "/content/" in u)
+        fx["resources"][url]["body"] += "\nalButton.onclick = () => { while (true) {} };"
+    js = _offline_pool(_shim(tmp_path, edit))
+    t0 = time.monotonic()
+    with pytest.raises(widget_js.WidgetError, match="INTERACTION_ERROR"):
+        js.resolve("al", 840000)
+    assert time.monotonic() - t0 < 5
+    js.close()
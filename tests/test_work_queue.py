@@ -0,0 +1,44 @@
+# WorkQueue: leases hide blocks until they run out; ack removes them
+import pytest
+
+import work_queue
+from work_queue import WorkQueue
+
+
+@pytest.fixture
+def q(tmp_path):
+    return WorkQueue(tmp_path / "work_queue.sqlite")
+
+
+def test_lease_hides_until_expiry(q, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(work_queue.time, "time", lambda: now[0])
+    q.put("auth", [3, 1, 2])
+    q.put("auth", [1])                                # idempotent
+    assert q.lease("auth", 2, secs=60) == [1, 2]      # oldest first, then by block
+    assert q.lease("auth", 5, secs=60) == [3]
+    assert q.lease("auth", 5) == []
+    assert q.blocks("auth") == {1, 2, 3}
+
+    q.ack("auth", [1])
+    now[0] += 61                                      # the other leases ran out
+    assert q.lease("auth", 5, secs=60) == [2, 3]
+    assert q.depth() == {"auth": 2}
+
+
+def test_stages_are_separate(q):
+    q.put("auth", [1])
+    q.put("index", [1])
+    q.ack("auth", [1])
+    assert q.lease("index", 5) == [1] and q.depth() == {"index": 1}
+
+
+def test_parked_after_max_tries(q, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(work_queue.time, "time", lambda: now[0])
+    monkeypatch.setattr(work_queue, "MAX_TRIES", 2)
+    q.put("auth", [7])
+    for _ in range(2):
+        assert q.lease("auth", 1, secs=1) == [7]
+        now[0] += 2
+    assert q.lease("auth", 1) == [] and q.blocks("auth") == set()
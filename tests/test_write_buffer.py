@@ -0,0 +1,83 @@
+# WriteBuffer: callbacks only after the rows they cover landed, nothing lost on failure
+import pytest
+
+pytest.importorskip("boto3")
+
+import storage
+import write_buffer
+from write_buffer import WriteBuffer
+
+
+@pytest.fixture
+def db(tmp_path):
+    return storage.SqliteResource(tmp_path / "tables.sqlite")
+
+
+@pytest.fixture
+def blocks(db):
+    return db.Table("mintBlocks")
+
+
+def _row(blocks, blk):
+    return blocks.get_item(Key={"block": blk}).get("Item")
+
+
+def test_callbacks_run_in_order_after_the_writes(blocks):
+    buf, ran = WriteBuffer(blocks, ("block",), max_items=100, max_secs=60), []
+    buf.put({"block": 1, "status": "free"}, then=lambda: ran.append(("put", _row(blocks, 1))))
+    buf.update({"block": 2}, then=lambda: ran.append("u2"), status="held")
+    buf.update({"block": 1}, then=lambda: ran.append("u1"), holds=3)   # merged into the put
+    buf.after(lambda: ran.append("after"))
+    assert ran == [] and len(buf) == 2
+    buf.flush()
+    assert ran == [("put", {"block": 1, "status": "free", "holds": 3}), "u2", "u1", "after"]
+    assert _row(blocks, 2) == {"block": 2, "status": "held"}
+
+    buf.after(lambda: ran.append("now"))                                # nothing pending
+    assert ran[-1] == "now"
+
+
+def test_unprocessed_batch_is_restored(db, blocks, monkeypatch):
+    monkeypatch.setattr(write_buffer, "RETRIES", 1)
+    monkeypatch.setattr(write_buffer.time, "sleep", lambda s: None)
+    real = db.meta.client.batch_write_item
+    db.meta.client.batch_write_item = lambda RequestItems: {"UnprocessedItems": RequestItems}
+
+    buf, ran = WriteBuffer(blocks, ("block",), max_items=100, max_secs=60), []
+    buf.put({"block": 1, "status": "free"}, then=lambda: ran.append("p1"))
+    buf.update({"block": 2}, then=lambda: ran.append("u2"), status="held")
+    buf.after(lambda: ran.append("after"))
+    with pytest.raises(RuntimeError):
+        buf.flush()
+    assert ran == [] and len(buf) == 2 and buf.due() is False
+    assert _row(blocks, 1) is None and _row(blocks, 2) is None
+
+    db.meta.client.batch_write_item = real
+    buf.flush()
+    assert ran == ["p1", "u2", "after"]
+    assert _row(blocks, 1)["status"] == "free" and _row(blocks, 2)["status"] == "held"
+
+
+def test_failed_update_skips_only_the_callbacks_covering_it(db, blocks):
+    real = db.meta.client.update_item
+
+    def flaky(**kw):
+        if kw["Key"]["block"] == 3:
+            raise storage.ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}},
+                                      "UpdateItem")
+        return real(**kw)
+
+    db.meta.client.update_item = flaky
+    buf, ran = WriteBuffer(blocks, ("block",), max_items=100, max_secs=60), []
+    buf.update({"block": 4}, then=lambda: ran.append("u4"), status="held")
+    buf.update({"block": 3}, then=lambda: ran.append("u3"), status="held")
+    buf.after(lambda: ran.append("after 3, 4"))
+    buf.flush()
+    assert ran == ["u4"]
+    assert _row(blocks, 4)["status"] == "held" and _row(blocks, 3) is None
+    assert len(buf) == 0                                                # logged, not retried
+
+    buf.update({"block": 5}, then=lambda: ran.append("u5"), status="held")
+    buf.after(lambda: ran.append("after 5"))
+    buf.flush()
+    assert ran == ["u4", "u5", "after 5"]
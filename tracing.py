@@ -0,0 +1,106 @@
+# ---------------------------------------------------
+# tracing.py – per-block latency traces, API side
+#   • traces arrive inside announced diffs (scripts/block_trace.py:
+#     mined → seen → fetched → written → sent)
+#   • hops added here: received (announce endpoint), published
+#     (off the bus, per worker), emitted (handed to the sockets),
+#     acked (first client `trace_ack`)
+#   • every new hop reports its gap from the previous one and its
+#     age since `mined` through observe(hop, gap, age)
+#   • last `keep` traces kept for /api/traces; optional JSONL dump
+# ---------------------------------------------------
+from __future__ import annotations
+
+import json, threading, time
+from collections import OrderedDict
+
+
+class Tracer:
+    """
+    Trace ids are unique per announced diff; every worker keeps its own
+    copy of each trace and adds its own published / emitted / acked hops.
+    """
+
+    def __init__(self, keep: int = 1_000, dump_path: str | None = None,
+                 observe=None):
+        self.keep      = keep
+        self.dump_path = dump_path
+        self._observe  = observe or (lambda hop, gap, age: None)
+        self._lock     = threading.Lock()
+        self._traces: OrderedDict[str, dict] = OrderedDict()
+
+    @staticmethod
+    def valid(tr) -> bool:
+        """Well-formed enough to trust: an id and [[name, unix secs], …] hops."""
+        if not (isinstance(tr, dict) and isinstance(tr.get("id"), str)
+                and isinstance(tr.get("hops"), list) and tr["hops"]):
+            return False
+        return all(isinstance(h, list) and len(h) == 2 and isinstance(h[0], str)
+                   and isinstance(h[1], (int, float)) for h in tr["hops"])
+
+    def _report(self, hops: list, first: int) -> None:
+        """observe() every hop from index `first` on."""
+        t0 = hops[0][1]
+        for i in range(max(first, 1), len(hops)):
+            name, t = hops[i]
+            self._observe(name, max(0.0, t - hops[i - 1][1]), max(0.0, t - t0))
+
+    def _hop(self, tr: dict, hop: str) -> dict:
+        """Append `hop` to our copy of tr (stored if new); caller holds the lock."""
+        own = self._traces.get(tr["id"])
+        if own is None:
+            own = {**tr, "hops": [list(h) for h in tr["hops"]]}
+            self._traces[tr["id"]] = own
+            while len(self._traces) > self.keep:
+                self._traces.popitem(last=False)
+        own["hops"].append([hop, round(time.time(), 3)])
+        return own
+
+    def start(self, tr: dict, hop: str = "received") -> dict:
+        """A trace entering the API: the watcher's hops are reported here, once."""
+        with self._lock:
+            own = self._hop(tr, hop)
+            hops = [list(h) for h in own["hops"]]
+        self._report(hops, 1)
+        return own
+
+    def record(self, tr: dict, hop: str) -> None:
+        with self._lock:
+            own = self._hop(tr, hop)
+            hops = [list(h) for h in own["hops"]]
+        self._report(hops, len(hops) - 1)
+        if hop == "emitted":
+            self._dump(own)
+
+    def ack(self, trace_id: str) -> bool:
+        """First client ack for a trace; later ones (other sockets) are ignored."""
+        with self._lock:
+            own = self._traces.get(trace_id)
+            if own is None or any(h[0] == "acked" for h in own["hops"]):
+                return False
+            own["hops"].append(["acked", round(time.time(), 3)])
+            hops = [list(h) for h in own["hops"]]
+        self._report(hops, len(hops) - 1)
+        self._dump(own)
+        return True
+
+    def _dump(self, tr: dict) -> None:
+        """One JSONL line per emitted / acked trace; the last line per id is the full one."""
+        if not self.dump_path:
+            return
+        with self._lock:
+            line = json.dumps(tr, separators=(",", ":"))
+        with open(self.dump_path, "a") as fh:
+            fh.write(line + "\n")
+
+    def get(self, trace_id: str) -> dict | None:
+        with self._lock:
+            tr = self._traces.get(trace_id)
+            return json.loads(json.dumps(tr)) if tr else None
+
+    def find(self, block: int | None = None, limit: int = 100) -> list[dict]:
+        """Newest first, optionally for one block."""
+        with self._lock:
+            out = [t for t in reversed(self._traces.values())
+                   if block is None or t.get("block") == block][:limit]
+            return json.loads(json.dumps(out))